@@ -0,0 +1,379 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+try:
+    from .telemetry import get_logger
+except ImportError:
+    from telemetry import get_logger
+
+log = get_logger("analysis_jobs")
+
+# Job lifecycle: queued -> running -> done | failed (running jobs that fail
+# with attempts left go back to queued after a backoff, and their events are
+# cleared so the next attempt's replace them)
+FINISHED = ("done", "failed")
+
+
+class QueueFull(Exception):
+    """Raised by enqueue when the queue already holds max_queued waiting jobs."""
+
+
+class MemoryJobStore:
+    """In-process job queue and event log. Jobs are lost on restart."""
+
+    def __init__(self, max_queued=100, lease=600):
+        self.max_queued = max_queued
+        self.lease = lease
+        self._jobs = {}  # job_id -> dict
+        self._events = {}  # job_id -> [(seq, event)]
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def enqueue(self, payload, job_id=None):
+        job_id = job_id or uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            if sum(job["status"] == "queued" for job in self._jobs.values()) >= self.max_queued:
+                raise QueueFull(f"{self.max_queued} jobs are already waiting")
+            self._jobs[job_id] = {
+                "id": job_id, "status": "queued", "payload": payload, "attempts": 0, "error": None,
+                "created_at": now, "updated_at": now, "run_after": now, "worker": None,
+            }
+            self._events[job_id] = []
+        return job_id
+
+    def claim(self, worker):
+        """Takes the oldest runnable job. Returns (job_id, payload, attempts) or None."""
+        now = time.time()
+        with self._lock:
+            runnable = [
+                job for job in self._jobs.values()
+                if (job["status"] == "queued" and job["run_after"] <= now)
+                or (job["status"] == "running" and job["updated_at"] < now - self.lease)
+            ]
+            if not runnable:
+                return None
+            job = min(runnable, key=lambda j: j["created_at"])
+            job.update(status="running", worker=worker, updated_at=now, attempts=job["attempts"] + 1)
+            return job["id"], job["payload"], job["attempts"]
+
+    def add_event(self, job_id, event):
+        with self._lock:
+            self._seq += 1
+            self._events[job_id].append((self._seq, event))
+            self._jobs[job_id]["updated_at"] = time.time()
+            return self._seq
+
+    def finish(self, job_id):
+        self._set(job_id, status="done", error=None, worker=None)
+
+    def retry(self, job_id, error, delay=0):
+        with self._lock:
+            self._events[job_id] = []
+            self._jobs[job_id].update(status="queued", error=error, worker=None, run_after=time.time() + delay,
+                                      updated_at=time.time())
+
+    def fail(self, job_id, error):
+        self._set(job_id, status="failed", error=error, worker=None)
+
+    def _set(self, job_id, **fields):
+        with self._lock:
+            self._jobs[job_id].update(fields, updated_at=time.time())
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return {k: job[k] for k in ("id", "status", "attempts", "error", "created_at", "updated_at")}
+
+    def events(self, job_id, after=0):
+        """Events of a job with a sequence number greater than after, as [(seq, event)]."""
+        with self._lock:
+            return [(seq, event) for seq, event in self._events.get(job_id, ()) if seq > after]
+
+    def purge(self, max_age):
+        """Drops finished jobs last updated more than max_age seconds ago. Returns how many."""
+        cutoff = time.time() - max_age
+        with self._lock:
+            old = [job_id for job_id, job in self._jobs.items()
+                   if job["status"] in FINISHED and job["updated_at"] < cutoff]
+            for job_id in old:
+                del self._jobs[job_id]
+                del self._events[job_id]
+            return len(old)
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+            return {"backend": "memory", **counts}
+
+
+class SQLiteJobStore:
+    """
+    Job queue and event log in SQLite. Jobs survive restarts, and several
+    processes (API and standalone workers) can share one database.
+
+    A running job whose worker stops updating it for lease seconds is
+    considered abandoned and can be claimed again.
+    """
+
+    def __init__(self, path, max_queued=100, lease=600):
+        self.max_queued = max_queued
+        self.lease = lease
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS analysis_jobs (
+                id TEXT PRIMARY KEY, status TEXT NOT NULL, payload TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0, error TEXT, worker TEXT,
+                created_at REAL NOT NULL, updated_at REAL NOT NULL, run_after REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS analysis_jobs_status ON analysis_jobs (status, created_at);
+            CREATE TABLE IF NOT EXISTS analysis_job_events (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT, job_id TEXT NOT NULL, event TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS analysis_job_events_job ON analysis_job_events (job_id, seq);
+            """
+        )
+
+    def enqueue(self, payload, job_id=None):
+        job_id = job_id or uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                queued = self._conn.execute(
+                    "SELECT COUNT(*) FROM analysis_jobs WHERE status = 'queued'"
+                ).fetchone()[0]
+                if queued >= self.max_queued:
+                    raise QueueFull(f"{self.max_queued} jobs are already waiting")
+                self._conn.execute(
+                    "INSERT INTO analysis_jobs (id, status, payload, created_at, updated_at, run_after)"
+                    " VALUES (?, 'queued', ?, ?, ?, ?)",
+                    (job_id, json.dumps(payload), now, now, now),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return job_id
+
+    def claim(self, worker):
+        """Takes the oldest runnable job. Returns (job_id, payload, attempts) or None."""
+        now = time.time()
+        with self._lock:
+            # BEGIN IMMEDIATE takes the write lock, so two processes never claim the same job
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id, payload, attempts FROM analysis_jobs"
+                    " WHERE (status = 'queued' AND run_after <= ?) OR (status = 'running' AND updated_at < ?)"
+                    " ORDER BY created_at LIMIT 1",
+                    (now, now - self.lease),
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE analysis_jobs SET status = 'running', worker = ?, updated_at = ?,"
+                        " attempts = attempts + 1 WHERE id = ?",
+                        (worker, now, row[0]),
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return row[0], json.loads(row[1]), row[2] + 1
+
+    def add_event(self, job_id, event):
+        with self._lock:
+            seq = self._conn.execute(
+                "INSERT INTO analysis_job_events (job_id, event) VALUES (?, ?)", (job_id, json.dumps(event))
+            ).lastrowid
+            self._conn.execute("UPDATE analysis_jobs SET updated_at = ? WHERE id = ?", (time.time(), job_id))
+            return seq
+
+    def finish(self, job_id):
+        self._set(job_id, status="done", error=None, worker=None)
+
+    def retry(self, job_id, error, delay=0):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute("DELETE FROM analysis_job_events WHERE job_id = ?", (job_id,))
+                self._conn.execute(
+                    "UPDATE analysis_jobs SET status = 'queued', error = ?, worker = NULL, run_after = ?,"
+                    " updated_at = ? WHERE id = ?",
+                    (error, now + delay, now, job_id),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def fail(self, job_id, error):
+        self._set(job_id, status="failed", error=error, worker=None)
+
+    def _set(self, job_id, **fields):
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE analysis_jobs SET {columns} WHERE id = ?", [*fields.values(), job_id])
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status, attempts, error, created_at, updated_at FROM analysis_jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("id", "status", "attempts", "error", "created_at", "updated_at"), row))
+
+    def events(self, job_id, after=0):
+        """Events of a job with a sequence number greater than after, as [(seq, event)]."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, event FROM analysis_job_events WHERE job_id = ? AND seq > ? ORDER BY seq",
+                (job_id, after),
+            ).fetchall()
+        return [(seq, json.loads(event)) for seq, event in rows]
+
+    def purge(self, max_age):
+        """Drops finished jobs last updated more than max_age seconds ago. Returns how many."""
+        cutoff = time.time() - max_age
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    "DELETE FROM analysis_job_events WHERE job_id IN (SELECT id FROM analysis_jobs"
+                    " WHERE status IN ('done', 'failed') AND updated_at < ?)",
+                    (cutoff,),
+                )
+                removed = self._conn.execute(
+                    "DELETE FROM analysis_jobs WHERE status IN ('done', 'failed') AND updated_at < ?", (cutoff,)
+                ).rowcount
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return removed
+
+    def stats(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM analysis_jobs GROUP BY status").fetchall()
+        return {"backend": "sqlite", **dict(rows)}
+
+
+def make_job_store(backend="memory", path=None, max_queued=100, lease=600):
+    """Builds a job store by name: 'memory' or 'sqlite'."""
+    if backend == "memory":
+        return MemoryJobStore(max_queued=max_queued, lease=lease)
+    if backend == "sqlite":
+        path = path or os.path.join(os.path.dirname(__file__), "analysis_jobs.db")
+        return SQLiteJobStore(path, max_queued=max_queued, lease=lease)
+    raise ValueError(f"Unknown job store backend: {backend}")
+
+
+class WorkerPool:
+    """
+    Runs queued jobs on a fixed number of asyncio workers, one job per worker
+    at a time. handler(payload, emit) does the work and awaits emit(event) for
+    every event clients should see; each event is tagged with its 'attempt'.
+    A handler that raises is retried with exponential backoff until
+    max_attempts, then the job is marked failed.
+    cleanup(payload), if given, runs once a job is done or has failed for good.
+    Store calls run in threads, as the SQLite store can block on the database.
+    """
+
+    def __init__(self, store, handler, workers=2, max_attempts=3, retry_backoff=5.0,
+                 poll_interval=0.5, retention=24 * 3600, cleanup=None):
+        self.store = store
+        self.handler = handler
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.cleanup = cleanup
+        self.name = f"{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._tasks = []
+        self._busy = 0
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._work(f"{self.name}-{n}")) for n in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _work(self, worker):
+        last_purge = 0.0
+        while True:
+            if time.time() - last_purge > 3600:
+                await asyncio.to_thread(self.store.purge, self.retention)
+                last_purge = time.time()
+            job = await asyncio.to_thread(self.store.claim, worker)
+            if job is None:
+                await asyncio.sleep(self.poll_interval)
+                continue
+            await self._run(*job)
+
+    async def _run(self, job_id, payload, attempts):
+        self._busy += 1
+
+        async def emit(event):
+            await asyncio.to_thread(self.store.add_event, job_id, {**event, "attempt": attempts})
+
+        try:
+            await self.handler(payload, emit)
+        except asyncio.CancelledError:
+            # Shutting down: hand the job back so the next worker picks it up. Called
+            # directly, as awaiting in a cancelled task could be cut short
+            self.store.retry(job_id, "worker stopped")
+            raise
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            log.warning("analysis_job_failed", job_id=job_id, attempt=attempts, error=error)
+            if attempts < self.max_attempts:
+                self.retried += 1
+                await asyncio.to_thread(self.store.retry, job_id, error,
+                                        delay=self.retry_backoff * 2 ** (attempts - 1))
+                return
+            self.failed += 1
+            await asyncio.to_thread(self.store.fail, job_id, error)
+            await emit({"step": "done", "status": "error", "data": error})
+        else:
+            self.completed += 1
+            await asyncio.to_thread(self.store.finish, job_id)
+        finally:
+            self._busy -= 1
+        if self.cleanup:
+            await asyncio.to_thread(self.cleanup, payload)
+
+    def stats(self):
+        return {
+            "workers": len(self._tasks),
+            "busy": self._busy,
+            "completed": self.completed,
+            "failed": self.failed,
+            "retried": self.retried,
+            "queue": self.store.stats(),
+        }
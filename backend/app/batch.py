@@ -0,0 +1,191 @@
+"""
+Bulk resume analysis, shared by POST /analyze-batch and the command line:
+
+    cd backend && python -m app.batch resumes/ more.zip -o results.jsonl
+
+Results are appended to the output file as each document finishes. Running
+the same command again skips documents already in it, so an interrupted
+run picks up where it stopped.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import zipfile
+
+from .services import (
+    extract_resume_text_async,
+    resume_id_for,
+    analysis_events,
+    is_cacheable,
+    gemini_limiter,
+    PDF_MAX_BYTES,
+    BATCH_CONCURRENCY,
+    BATCH_MAX_DOCS,
+)
+
+
+def collect_pdfs(paths, workdir, max_docs=None):
+    """
+    Expands PDF files, directories (searched recursively) and zip archives
+    into [(name, path)]. Zip members are unpacked into workdir; members
+    larger than PDF_MAX_BYTES are skipped. Stops after max_docs documents.
+    """
+    max_docs = max_docs or BATCH_MAX_DOCS
+    documents = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in sorted(os.walk(path)):
+                documents += [(os.path.join(root, f), os.path.join(root, f))
+                              for f in sorted(files) if f.lower().endswith(".pdf")]
+        elif zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path) as archive:
+                for member in archive.infolist():
+                    if member.is_dir() or not member.filename.lower().endswith(".pdf"):
+                        continue
+                    if member.file_size > PDF_MAX_BYTES:
+                        print(f"Skipping {member.filename}: larger than {PDF_MAX_BYTES} bytes", file=sys.stderr)
+                        continue
+                    # Members get generated names so archive paths can't escape workdir
+                    fd, target = tempfile.mkstemp(suffix=".pdf", dir=workdir)
+                    with archive.open(member) as src, os.fdopen(fd, "wb") as dst:
+                        dst.write(src.read())
+                    documents.append((member.filename, target))
+                    if len(documents) >= max_docs:
+                        break
+        else:
+            documents.append((os.path.basename(path), path))
+        if len(documents) >= max_docs:
+            break
+    return documents[:max_docs]
+
+
+def load_checkpoint(path):
+    """Successful records already in a results file, by resume_id."""
+    done = {}
+    if not path or not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # line cut short by an interrupted run
+            if record.get("status") == "ok":
+                done[record["resume_id"]] = record
+    return done
+
+
+def _file_id(path):
+    with open(path, "rb") as f:
+        return resume_id_for(f.read())
+
+
+async def analyze_document(name, path, done=None):
+    """Extracts and analyzes one PDF. Returns its result record; errors are recorded, not raised."""
+    started = time.perf_counter()
+    record = {"name": name}
+    try:
+        record["resume_id"] = resume_id = await asyncio.to_thread(_file_id, path)
+        if done and resume_id in done:
+            return {**done[resume_id], "name": name, "resumed": True}
+        text = await extract_resume_text_async(path, resume_id)
+        async for event in analysis_events(text, resume_id):
+            results = event.get("data")
+        results.pop("resume_id")
+        # Fallback answers (no key, Gemini down) are errors, so a rerun analyzes the document again
+        failed = [step for step, result in results.items() if not is_cacheable(result or "")]
+        if failed:
+            record.update(status="error", error=f"No analysis for {', '.join(failed)}", results=results)
+        else:
+            record.update(status="ok", results=results)
+    except Exception as e:
+        record.update(status="error", error=str(e) or type(e).__name__)
+    record["seconds"] = round(time.perf_counter() - started, 2)
+    return record
+
+
+async def run_batch(documents, checkpoint=None, concurrency=None):
+    """
+    Analyzes [(name, path)] documents, yielding each record as soon as it is
+    done and finally {"summary": {...}} with throughput figures.
+    Successful records are appended to the checkpoint file; documents already
+    in it are not analyzed again and come back with "resumed": true.
+    Gemini calls from all documents share the process-wide gemini_limiter.
+    """
+    done = load_checkpoint(checkpoint)
+    semaphore = asyncio.Semaphore(concurrency or BATCH_CONCURRENCY)
+    finished = asyncio.Queue()
+    usage_before = gemini_limiter.stats()
+    started = time.perf_counter()
+
+    async def process(name, path):
+        async with semaphore:
+            finished.put_nowait(await analyze_document(name, path, done))
+
+    tasks = [asyncio.create_task(process(name, path)) for name, path in documents]
+    counts = {"ok": 0, "error": 0, "resumed": 0}
+    out = open(checkpoint, "a", encoding="utf-8") if checkpoint else None
+    try:
+        for _ in tasks:
+            record = await finished.get()
+            if record.get("resumed"):
+                counts["resumed"] += 1
+            else:
+                counts[record["status"]] += 1
+                if out and record["status"] == "ok":
+                    out.write(json.dumps(record) + "\n")
+                    out.flush()
+            yield record
+    finally:
+        for task in tasks:
+            task.cancel()
+        if out:
+            out.close()
+
+    minutes = (time.perf_counter() - started) / 60
+    usage = gemini_limiter.stats()
+    tokens = usage["tokens_used"] - usage_before["tokens_used"]
+    processed = counts["ok"] + counts["error"]
+    yield {"summary": {
+        "documents": len(documents),
+        "ok": counts["ok"],
+        "failed": counts["error"],
+        "resumed": counts["resumed"],
+        "seconds": round(minutes * 60, 1),
+        "docs_per_min": round(processed / minutes, 1) if minutes else 0.0,
+        "gemini_requests": usage["requests"] - usage_before["requests"],
+        "tokens": tokens,
+        "tokens_per_min": round(tokens / minutes) if minutes else 0,
+    }}
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze a batch of PDF resumes.")
+    parser.add_argument("paths", nargs="+", help="PDF files, directories or zip archives")
+    parser.add_argument("-o", "--output", default="batch_results.jsonl",
+                        help="JSONL results file, also used to resume an interrupted run")
+    parser.add_argument("-c", "--concurrency", type=int, default=None, help="documents analyzed at once")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        documents = collect_pdfs(args.paths, workdir)
+        print(f"Analyzing {len(documents)} documents", file=sys.stderr)
+        async for record in run_batch(documents, checkpoint=args.output, concurrency=args.concurrency):
+            if "summary" in record:
+                print(json.dumps(record["summary"], indent=2))
+            elif record.get("resumed"):
+                print(f"[skip] {record['name']} (already in {args.output})", file=sys.stderr)
+            else:
+                detail = record.get("error") or f"{record['seconds']}s"
+                print(f"[{record['status']}] {record['name']} ({detail})", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
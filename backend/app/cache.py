@@ -0,0 +1,285 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+def sha256_hex(data):
+    """SHA-256 of bytes or str, as hex."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def text_fingerprint(text):
+    """Hash of text with whitespace normalized, so re-extracted copies of the same document match."""
+    return sha256_hex(re.sub(r"\s+", " ", text).strip())
+
+
+class MemoryCache:
+    """In-process LRU cache with per-entry TTL and a total size budget (bytes of JSON)."""
+
+    def __init__(self, ttl=7 * 24 * 3600, max_bytes=64 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()  # key -> (expires_at, size, value)
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.time():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, key, value):
+        size = len(json.dumps(value))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (time.time() + self.ttl, size, value)
+            self._size += size
+            while self._size > self.max_bytes:
+                self._drop(next(iter(self._data)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        self._size -= self._data.pop(key)[1]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": "memory",
+                "entries": len(self._data),
+                "bytes": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+class SQLiteCache:
+    """On-disk cache that survives restarts. Evicts least recently used rows past max_bytes."""
+
+    def __init__(self, path, ttl=7 * 24 * 3600, max_bytes=256 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+            " expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed_at)")
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] < now:
+                if row is not None:
+                    self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return json.loads(row[0])
+
+    def set(self, key, value):
+        payload = json.dumps(value)
+        if len(payload) > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload), now + self.ttl, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM cache WHERE expires_at < ?", (now,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+        for key, size in self._conn.execute("SELECT key, size FROM cache ORDER BY accessed_at").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "backend": "sqlite",
+                "entries": entries,
+                "bytes": size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+class NullCache:
+    """Cache backend that stores nothing; used when caching is disabled."""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def stats(self):
+        return {"backend": "none"}
+
+
+class SingleFlightCache:
+    """
+    TTL cache for expensive loads (e.g. scraper runs) with request coalescing.
+
+    - Fresh entries (younger than ttl) are returned directly.
+    - Stale entries (up to ttl + stale_ttl) are returned immediately while one
+      background refresh runs.
+    - Concurrent misses for the same key share a single load (single-flight).
+    Failed loads are not cached; a failed refresh keeps serving the stale value.
+    """
+
+    def __init__(self, ttl=30 * 60, stale_ttl=6 * 3600, max_entries=1024, refresh_workers=2):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._data = OrderedDict()  # key -> (loaded_at, value)
+        self._in_flight = {}  # key -> Future
+        self._lock = threading.Lock()
+        self._refresher = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix="cache-refresh")
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.loads = 0
+        self.load_errors = 0
+
+    def get(self, key, loader):
+        """Returns the value for key, calling loader() at most once per key at a time."""
+        with self._lock:
+            entry = self._data.get(key)
+            age = time.time() - entry[0] if entry else None
+            if entry and age < self.ttl:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry and age < self.ttl + self.stale_ttl:
+                self._data.move_to_end(key)
+                self.stale_hits += 1
+                if key not in self._in_flight:
+                    self.refreshes += 1
+                    future = self._in_flight[key] = Future()
+                    self._refresher.submit(self._load, key, loader, future)
+                return entry[1]
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                owner = False
+            else:
+                future = self._in_flight[key] = Future()
+                self.misses += 1
+                owner = True
+        if owner:
+            self._load(key, loader, future)
+        return future.result()
+
+    def peek(self, key):
+        """Returns the value for key if it is fresh, else None; never loads."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry and time.time() - entry[0] < self.ttl:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            return None
+
+    def put(self, key, value):
+        """Stores a value that was loaded outside get(), e.g. by a streaming search."""
+        with self._lock:
+            self.loads += 1
+            self._data[key] = (time.time(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def _load(self, key, loader, future):
+        try:
+            value = loader()
+        except BaseException as e:
+            with self._lock:
+                self.load_errors += 1
+                self._in_flight.pop(key, None)
+            future.set_exception(e)
+            return
+        with self._lock:
+            self.loads += 1
+            self._data[key] = (time.time(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+            self._in_flight.pop(key, None)
+        future.set_result(value)
+
+    def stats(self):
+        with self._lock:
+            served = self.hits + self.stale_hits + self.coalesced
+            requests = served + self.misses
+            return {
+                "entries": len(self._data),
+                "in_flight": len(self._in_flight),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "refreshes": self.refreshes,
+                "hit_rate": round(served / requests, 3) if requests else 0.0,
+                "loads": self.loads,
+                "load_errors": self.load_errors,
+                # Loads avoided compared to running one per request
+                "loads_saved": requests - self.misses - self.refreshes,
+            }
+
+
+def make_cache(backend="memory", path=None, ttl=7 * 24 * 3600, max_bytes=64 * 1024 * 1024):
+    """Builds a cache backend by name: 'memory', 'sqlite' or 'none'."""
+    if backend == "memory":
+        return MemoryCache(ttl=ttl, max_bytes=max_bytes)
+    if backend == "sqlite":
+        path = path or os.path.join(os.path.dirname(__file__), "analysis_cache.db")
+        return SQLiteCache(path, ttl=ttl, max_bytes=max_bytes)
+    if backend == "none":
+        return NullCache()
+    raise ValueError(f"Unknown cache backend: {backend}")
@@ -0,0 +1,147 @@
+import re
+from collections import Counter
+
+PAGE_BREAK = "\f"
+
+# Resume sections by how much of the token budget they deserve; 0 = dropped first
+SECTION_WEIGHTS = {
+    "summary": 2, "profile": 2, "about": 2, "objective": 1,
+    "experience": 4, "work experience": 4, "employment": 4, "professional experience": 4,
+    "skills": 3, "technical skills": 3, "projects": 3,
+    "education": 2, "certifications": 2, "certificates": 2, "publications": 1,
+    "awards": 1, "achievements": 1, "volunteering": 1, "languages": 1,
+    "references": 0, "hobbies": 0, "interests": 0,
+}
+DEFAULT_SECTION_WEIGHT = 1
+
+_SPACES_RE = re.compile(r"[ \t ]+")
+_HEADING_RE = re.compile(r"^[A-Za-z][A-Za-z &/]{2,40}:?$")
+_PAGE_NUMBER_RE = re.compile(r"^(page\s*)?\d+(\s*(/|of)\s*\d+)?$", re.IGNORECASE)
+
+
+def estimate_tokens(text):
+    """Rough token estimate (~4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+def _page_lines(page):
+    lines = (_SPACES_RE.sub(" ", line).strip() for line in page.splitlines())
+    return [line for line in lines if line]
+
+
+def _is_page_number(line):
+    return bool(_PAGE_NUMBER_RE.match(line))
+
+
+def _repeated_edges(pages):
+    """Lines at the top/bottom of pages that recur on most pages."""
+    if len(pages) < 2:
+        return set()
+    counts = Counter()
+    for lines in pages:
+        # Section headings at the top of a page are content, not running headers
+        edges = [line for line in lines[:2] + lines[-2:] if not _heading(line)]
+        counts.update(set(edges))
+    return {line for line, n in counts.items() if n >= max(2, len(pages) // 2 + 1)}
+
+
+def normalize_resume(text):
+    """
+    Collapses whitespace, strips page headers/footers that repeat across
+    pages, and drops duplicate lines. Returns the cleaned text.
+    """
+    pages = [_page_lines(page) for page in text.split(PAGE_BREAK)]
+    edges = _repeated_edges(pages)
+    seen = set()
+    kept = []
+    for lines in pages:
+        for line in lines:
+            if line in edges or _is_page_number(line):
+                continue
+            key = line.casefold()
+            if kept and kept[-1].casefold() == key:
+                continue
+            # Short lines (single skills, dates) can legitimately repeat elsewhere
+            if len(line) >= 20:
+                if key in seen:
+                    continue
+                seen.add(key)
+            kept.append(line)
+    return "\n".join(kept)
+
+
+def _heading(line):
+    if not _HEADING_RE.match(line):
+        return None
+    name = line.rstrip(":").strip().casefold()
+    if name in SECTION_WEIGHTS or (line.isupper() and len(line.split()) <= 4):
+        return name
+    return None
+
+
+def split_sections(text):
+    """Splits resume text into [(heading, lines)]; text before the first heading has heading None."""
+    sections = [(None, [])]
+    for line in text.splitlines():
+        name = _heading(line)
+        if name:
+            sections.append((name, [line]))
+        else:
+            sections[-1][1].append(line)
+    return [(name, lines) for name, lines in sections if lines]
+
+
+def _truncate_lines(lines, max_chars):
+    kept, used = [], 0
+    for line in lines:
+        if used + len(line) + 1 > max_chars:
+            break
+        kept.append(line)
+        used += len(line) + 1
+    return kept
+
+
+def compact_to_budget(text, max_tokens):
+    """
+    Shrinks text to about max_tokens, section by section. Low-value sections
+    (references, hobbies) go first; the rest share the budget by weight, and
+    each section keeps its opening lines.
+    """
+    budget = max_tokens * 4
+    # Also at exactly the budget, where prepare_resume already compacts: a zero weight can't share it
+    sections = [s for s in split_sections(text) if SECTION_WEIGHTS.get(s[0], DEFAULT_SECTION_WEIGHT) > 0]
+
+    # Water-filling: sections smaller than their share give the remainder to the others
+    sizes = {i: sum(len(line) + 1 for line in lines) for i, (_, lines) in enumerate(sections)}
+    weights = {i: (3 if name is None else SECTION_WEIGHTS.get(name, DEFAULT_SECTION_WEIGHT))
+               for i, (name, _) in enumerate(sections)}
+    allowance = {}
+    remaining = budget
+    for i in sorted(sizes, key=lambda i: sizes[i] / weights[i]):
+        share = remaining * weights[i] / sum(weights[j] for j in sizes if j not in allowance)
+        allowance[i] = min(sizes[i], int(share))
+        remaining -= allowance[i]
+
+    kept = []
+    for i, (_, lines) in enumerate(sections):
+        kept += _truncate_lines(lines, allowance[i])
+    return "\n".join(kept)
+
+
+def prepare_resume(text, max_tokens):
+    """
+    Normalizes a resume and, if it is still over max_tokens, compacts it.
+    Returns (text, stats) where stats reports token counts before and after.
+    """
+    original = estimate_tokens(text)
+    compacted = normalize_resume(text)
+    over_budget = estimate_tokens(compacted) > max_tokens
+    if over_budget:
+        compacted = compact_to_budget(compacted, max_tokens)
+    final = estimate_tokens(compacted)
+    return compacted, {
+        "original_tokens": original,
+        "compacted_tokens": final,
+        "tokens_saved": max(original - final, 0),
+        "budget_applied": over_budget,
+    }
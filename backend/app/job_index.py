@@ -0,0 +1,183 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+
+TOKEN_RE = re.compile(r"\w[\w+#]*(?:\.\w+)*")
+
+# Raw job dicts from different scrapers name the same thing differently
+FIELD_ALIASES = {
+    "title": ("title", "jobTitle", "position"),
+    "company": ("companyName", "company", "employer"),
+    "location": ("location", "jobLocation", "place"),
+    "skills": ("skills", "tagsAndSkills", "keySkills"),
+}
+
+
+def _field(job, name):
+    for key in FIELD_ALIASES[name]:
+        value = job.get(key)
+        if value:
+            return " ".join(map(str, value)) if isinstance(value, list) else str(value)
+    return ""
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.casefold())
+
+
+def job_key(job):
+    """Stable id of a posting: scraper id, else its link without tracking parameters."""
+    for field in ("id", "jobId"):
+        if job.get(field):
+            return f"id:{job[field]}"
+    for field in ("link", "url", "jobUrl", "applyUrl"):
+        if job.get(field):
+            return str(job[field]).split("?")[0]
+    return "|".join(_field(job, f) for f in ("title", "company", "location"))
+
+
+class JobIndex:
+    """
+    Local SQLite store of every job the scrapers return, with an inverted
+    index over title, company, location and skills.
+
+    Ingestion is idempotent: a posting seen again only refreshes its
+    last_seen time (and its postings if its content changed).
+    """
+
+    def __init__(self, path, max_age=14 * 24 * 3600, purge_interval=3600):
+        self.max_age = max_age
+        self.purge_interval = purge_interval
+        self._purged_at = 0.0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY, source TEXT NOT NULL, data TEXT NOT NULL,
+                first_seen REAL NOT NULL, last_seen REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_last_seen ON jobs (last_seen);
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL, job_id TEXT NOT NULL, PRIMARY KEY (term, job_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS postings_job ON postings (job_id);
+            """
+        )
+        self.ingested = 0
+        self.updated = 0
+        self.queries = 0
+
+    @staticmethod
+    def _terms(job):
+        """Field-qualified index terms, e.g. 'title:python', 'location:istanbul'."""
+        terms = set()
+        for name in FIELD_ALIASES:
+            terms.update(f"{name}:{token}" for token in tokenize(_field(job, name)))
+        return terms
+
+    def ingest(self, jobs, source="linkedin"):
+        """Adds or refreshes postings. Returns the number of new jobs."""
+        now = time.time()
+        added = 0
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for job in jobs:
+                    key = job_key(job)
+                    data = json.dumps(job, sort_keys=True)
+                    row = self._conn.execute("SELECT data FROM jobs WHERE id = ?", (key,)).fetchone()
+                    if row is None:
+                        self._conn.execute(
+                            "INSERT INTO jobs (id, source, data, first_seen, last_seen) VALUES (?, ?, ?, ?, ?)",
+                            (key, source, data, now, now),
+                        )
+                        added += 1
+                    else:
+                        self._conn.execute(
+                            "UPDATE jobs SET data = ?, last_seen = ? WHERE id = ?", (data, now, key)
+                        )
+                        if row[0] == data:
+                            continue
+                        self.updated += 1
+                        self._conn.execute("DELETE FROM postings WHERE job_id = ?", (key,))
+                    self._conn.executemany(
+                        "INSERT OR IGNORE INTO postings (term, job_id) VALUES (?, ?)",
+                        [(term, key) for term in self._terms(job)],
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self.ingested += added
+            if now - self._purged_at > self.purge_interval:
+                self._purge_locked(now)
+        return added
+
+    def _purge_locked(self, now):
+        cutoff = now - self.max_age
+        self._conn.execute(
+            "DELETE FROM postings WHERE job_id IN (SELECT id FROM jobs WHERE last_seen < ?)", (cutoff,)
+        )
+        removed = self._conn.execute("DELETE FROM jobs WHERE last_seen < ?", (cutoff,)).rowcount
+        self._purged_at = now
+        return removed
+
+    def purge(self):
+        """Drops postings not seen for max_age seconds. Returns how many were removed."""
+        with self._lock:
+            return self._purge_locked(time.time())
+
+    def search(self, query, location="", limit=10, max_age=None):
+        """
+        Jobs whose title or skills contain every query term and whose location
+        contains every location term, most recently seen first.
+        max_age limits results to jobs seen within that many seconds.
+        """
+        terms = [[f"title:{t}", f"skills:{t}"] for t in tokenize(query)]
+        terms += [[f"location:{t}"] for t in tokenize(location)]
+        if not terms:
+            return []
+        # One subquery per required term; a term matches through any of its fields
+        clauses = " AND ".join(
+            f"id IN (SELECT job_id FROM postings WHERE term IN ({','.join('?' * len(alts))}))" for alts in terms
+        )
+        params = [t for alts in terms for t in alts]
+        cutoff = time.time() - max_age if max_age else 0
+        with self._lock:
+            self.queries += 1
+            rows = self._conn.execute(
+                f"SELECT data FROM jobs WHERE last_seen >= ? AND {clauses} ORDER BY last_seen DESC LIMIT ?",
+                [cutoff, *params, limit],
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def get_many(self, keys):
+        """Stored postings by job_key, for the keys that are in the index."""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock:
+            # SQLite caps the number of bound parameters per statement
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT id, data FROM jobs WHERE id IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                found.update((key, json.loads(data)) for key, data in rows)
+        return found
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def stats(self):
+        with self._lock:
+            jobs = self._conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+            return {
+                "jobs": jobs,
+                "ingested": self.ingested,
+                "updated": self.updated,
+                "queries": self.queries,
+            }
@@ -0,0 +1,322 @@
+"""
+Job sources: each scraper (or fixture file) is a JobSource with its own
+timeout, concurrency limit and spend budget, and a normalizer that maps its
+raw items onto one job schema. Sources are looked up by name in a SourceRegistry.
+"""
+import json
+import re
+import sys
+import threading
+import time
+
+try:
+    from .rate_limit import ConcurrencyLimiter
+    from .resilience import CircuitBreaker, remaining
+except ImportError:
+    from rate_limit import ConcurrencyLimiter
+    from resilience import CircuitBreaker, remaining
+
+# The job schema every source is normalized to
+JOB_FIELDS = ("id", "source", "title", "companyName", "location", "link", "postedAt", "description", "skills")
+
+# Raw field names per schema field, tried in order
+DEFAULT_FIELDS = {
+    "id": ("id", "jobId"),
+    "title": ("title", "jobTitle", "position"),
+    "companyName": ("companyName", "company", "employer"),
+    "location": ("location", "jobLocation", "place"),
+    "link": ("link", "url", "jobUrl", "applyUrl"),
+    "postedAt": ("postedAt", "createdDate", "postedDate", "date"),
+    "description": ("description", "descriptionText", "jobDescription"),
+    "skills": ("skills", "tagsAndSkills", "keySkills"),
+}
+
+TOKEN_RE = re.compile(r"\w[\w+#]*(?:\.\w+)*")
+
+
+class BudgetExceeded(RuntimeError):
+    """Raised when a source has spent its budget for the current window."""
+
+
+class PartialResults(TimeoutError):
+    """
+    Raised by a fetch that timed out after some items arrived, once those are
+    yielded. `jobs` holds them when raised by JobSource.search().
+    """
+
+    def __init__(self, message, jobs=None):
+        super().__init__(message)
+        self.jobs = jobs or []
+
+
+def _first(raw, names):
+    for name in names:
+        value = raw.get(name)
+        if value:
+            return value
+    return ""
+
+
+def normalize_job(raw, source, fields=None):
+    """Maps a raw scraper item onto JOB_FIELDS. Already normalized jobs pass through unchanged."""
+    if raw.get("source") == source and str(raw.get("id", "")).startswith(f"{source}:"):
+        return raw
+    fields = {**DEFAULT_FIELDS, **(fields or {})}
+    job = {name: _first(raw, fields[name]) for name in JOB_FIELDS if name in fields}
+    if isinstance(job["skills"], str):
+        job["skills"] = [s.strip() for s in job["skills"].split(",") if s.strip()]
+    if isinstance(job["location"], list):
+        job["location"] = ", ".join(map(str, job["location"]))
+    job["id"] = f"{source}:{job['id']}" if job["id"] else ""
+    job["source"] = source
+    return {name: job[name] for name in JOB_FIELDS}
+
+
+class Job:
+    """
+    Compact posting kept in caches and sent to clients: the JOB_FIELDS only,
+    with the description cut to a preview (the full posting stays in the job
+    index). Reads like a read-only dict (get, [], keys), so ranking, job_key
+    and dict(job, ...) work on it unchanged.
+    """
+    __slots__ = JOB_FIELDS
+
+    def __init__(self, id="", source="", title="", companyName="", location="", link="", postedAt="",
+                 description="", skills=()):
+        self.id = id
+        # Repeated across thousands of postings; interning stores each value once
+        self.source = sys.intern(source)
+        self.title = title
+        self.companyName = sys.intern(companyName)
+        self.location = sys.intern(location)
+        self.link = link
+        self.postedAt = postedAt
+        self.description = description
+        self.skills = tuple(skills)
+
+    @classmethod
+    def from_dict(cls, job, preview_chars=300):
+        """Compact copy of a normalized job dict, with the description cut to preview_chars."""
+        if isinstance(job, cls):
+            return job
+        return cls(**{name: str(job.get(name) or "") for name in JOB_FIELDS if name not in ("description", "skills")},
+                   description=preview(str(job.get("description") or ""), preview_chars),
+                   skills=job.get("skills") or ())
+
+    def get(self, name, default=None):
+        return getattr(self, name, default) if name in JOB_FIELDS else default
+
+    def __getitem__(self, name):
+        if name not in JOB_FIELDS:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def keys(self):
+        return JOB_FIELDS
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in JOB_FIELDS}
+
+    def __repr__(self):
+        return f"Job({self.id!r}, {self.title!r})"
+
+
+def preview(text, limit):
+    """text cut to about `limit` characters at a word boundary."""
+    if len(text) <= limit:
+        return text
+    cut = text[:limit].rsplit(None, 1)[0]
+    return cut.rstrip(" ,.;:") + "…"
+
+
+def job_fingerprint(job):
+    """Title, company and city of a job, so one posting listed on several sites is merged."""
+    city = str(job.get("location", "")).split(",")[0]
+    return "|".join(" ".join(TOKEN_RE.findall(str(v).casefold())) for v in (job.get("title"), job.get("companyName"), city))
+
+
+class SpendBudget:
+    """Spend limit in USD per window (a day by default). limit=0 means unlimited."""
+
+    def __init__(self, limit=0.0, window=24 * 3600):
+        self.limit = limit
+        self.window = window
+        self._lock = threading.Lock()
+        self._window_start = time.time()
+        self.spent = 0.0
+        self.total = 0.0
+
+    def _roll(self):
+        if time.time() - self._window_start >= self.window:
+            self._window_start = time.time()
+            self.spent = 0.0
+
+    def allows(self):
+        with self._lock:
+            self._roll()
+            return not self.limit or self.spent < self.limit
+
+    def charge(self, usd):
+        with self._lock:
+            self._roll()
+            self.spent += usd
+            self.total += usd
+
+
+class JobSource:
+    """
+    One provider of job postings. `fetch(query, location, rows, timeout, cancel)`
+    yields raw items; stream() adds the concurrency limit, budget check,
+    normalization and stats around it.
+    """
+
+    def __init__(self, name, fetch=None, fields=None, timeout=120.0, concurrency=4, budget=0.0, cost_per_job=0.0,
+                 breaker=None):
+        self.name = name
+        self._fetch = fetch
+        self.fields = fields
+        self.timeout = timeout
+        self.limiter = ConcurrencyLimiter(max_in_flight=concurrency)
+        self.budget = SpendBudget(budget)
+        self.cost_per_job = cost_per_job
+        self.breaker = breaker or CircuitBreaker(name, failures=0)
+        self._lock = threading.Lock()
+        self.searches = 0
+        self.jobs = 0
+        self.errors = 0
+        self.over_budget = 0
+
+    def fetch(self, query, location, rows, timeout, cancel=None):
+        return self._fetch(query, location, rows, timeout=timeout, cancel=cancel)
+
+    def stream(self, query, location="", rows=10, cancel=None):
+        """
+        Yields normalized jobs as the source produces them. Raises BudgetExceeded,
+        CircuitOpen (while the source keeps failing) or the fetch error, and
+        PartialResults after the last job when the fetch timed out before
+        `rows` jobs arrived. The fetch timeout is capped by the request's deadline.
+        """
+        if not self.budget.allows():
+            with self._lock:
+                self.over_budget += 1
+            raise BudgetExceeded(f"{self.name} has spent its budget of ${self.budget.limit:.2f}")
+        timeout = remaining(self.timeout)
+        self.breaker.allow()
+        count = 0
+        try:
+            with self.limiter.slot():
+                for raw in self.fetch(query, location, rows, timeout, cancel):
+                    count += 1
+                    yield normalize_job(raw, self.name, self.fields)
+        except PartialResults:
+            # Slow, but the source answered
+            self.breaker.record(True)
+            raise
+        except Exception:
+            self.breaker.record(False)
+            with self._lock:
+                self.errors += 1
+            raise
+        else:
+            self.breaker.record(True)
+        finally:
+            self.budget.charge(count * self.cost_per_job)
+            with self._lock:
+                self.searches += 1
+                self.jobs += count
+
+    def search(self, query, location="", rows=10, cancel=None):
+        """All normalized jobs of one search. A PartialResults carries the jobs that did arrive."""
+        jobs = []
+        try:
+            for job in self.stream(query, location, rows, cancel):
+                jobs.append(job)
+        except PartialResults as e:
+            e.jobs = jobs
+            raise
+        return jobs
+
+    def stats(self):
+        with self._lock:
+            return {
+                "searches": self.searches,
+                "jobs": self.jobs,
+                "errors": self.errors,
+                "over_budget": self.over_budget,
+                "timeout": self.timeout,
+                "in_flight": self.limiter.stats()["in_flight"],
+                "circuit": self.breaker.state,
+                "spent_usd": round(self.budget.spent, 4),
+                "budget_usd": self.budget.limit or None,
+            }
+
+
+class FixtureJobSource(JobSource):
+    """
+    Serves jobs from a local JSON array or JSON-lines file, for tests and
+    offline development. A job matches when its title, skills or description
+    contain every query term and, if it has a location, every location term.
+    """
+
+    def __init__(self, name, path, **kwargs):
+        super().__init__(name, **kwargs)
+        self.path = path
+        self._jobs = None
+
+    def _load(self):
+        if self._jobs is None:
+            with open(self.path, encoding="utf-8") as f:
+                text = f.read().strip()
+            if text.startswith("["):
+                self._jobs = json.loads(text)
+            else:
+                self._jobs = [json.loads(line) for line in text.splitlines() if line.strip()]
+        return self._jobs
+
+    def fetch(self, query, location, rows, timeout, cancel=None):
+        terms = set(TOKEN_RE.findall(query.casefold()))
+        places = set(TOKEN_RE.findall(location.casefold()))
+        found = 0
+        for raw in self._load():
+            job = normalize_job(raw, self.name, self.fields)
+            text = f"{job['title']} {' '.join(job['skills'])} {job['description']}".casefold()
+            if not terms <= set(TOKEN_RE.findall(text)):
+                continue
+            if job["location"] and not places <= set(TOKEN_RE.findall(job["location"].casefold())):
+                continue
+            yield job
+            found += 1
+            if found >= rows or (cancel and cancel.is_set()):
+                return
+
+
+class SourceRegistry:
+    """Job sources by name, and which of them a search uses by default."""
+
+    def __init__(self):
+        self._sources = {}
+        self.enabled = []
+
+    def register(self, source, enabled=False):
+        self._sources[source.name] = source
+        if enabled and source.name not in self.enabled:
+            self.enabled.append(source.name)
+        return source
+
+    def get(self, name):
+        try:
+            return self._sources[name]
+        except KeyError:
+            raise KeyError(f"Unknown job source: {name}") from None
+
+    def resolve(self, names=None):
+        """Sources for a comma-separated string or list of names; the enabled ones when empty."""
+        if isinstance(names, str):
+            names = [n.strip() for n in names.split(",") if n.strip()]
+        return [self.get(name) for name in (names or self.enabled)]
+
+    def names(self):
+        return list(self._sources)
+
+    def stats(self):
+        return {name: dict(source.stats(), enabled=name in self.enabled) for name, source in self._sources.items()}
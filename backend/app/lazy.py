@@ -0,0 +1,96 @@
+"""
+Deferred imports and clients, so importing the app (and every MCP stdio
+session) doesn't pay for PyMuPDF, the Gemini SDK, the Apify client or
+numpy/scipy until a request needs them.
+"""
+import asyncio
+import importlib
+import threading
+import time
+
+# Every Lazy by name, for warm() and status()
+_registry = {}
+
+
+class Lazy:
+    """Value built by factory() on first get(), once, even when several threads ask at the same time."""
+
+    def __init__(self, name, factory):
+        self.name = name
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._value = None
+        self.load_seconds = None
+        self.error = None
+        _registry[name] = self
+
+    def get(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    started = time.perf_counter()
+                    try:
+                        self._value = self._factory()
+                    except Exception as e:
+                        self.error = str(e)
+                        raise
+                    self.error = None
+                    self.load_seconds = time.perf_counter() - started
+                    self._loaded = True
+        return self._value
+
+    async def get_async(self):
+        """get() without blocking the event loop while a first (slow) load runs."""
+        return self._value if self._loaded else await asyncio.to_thread(self.get)
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def set(self, value):
+        """Replaces the value, e.g. with a fake client in benchmarks."""
+        with self._lock:
+            self._value = value
+            self._loaded = True
+
+
+class LazyModule(Lazy):
+    """A module imported on first attribute access; on_load(module) runs once after the import."""
+
+    def __init__(self, name, on_load=None):
+        def load():
+            module = importlib.import_module(name)
+            if on_load:
+                on_load(module)
+            return module
+        super().__init__(name, load)
+
+    def __getattr__(self, attr):
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        return getattr(self.get(), attr)
+
+
+def warm(names=None):
+    """Loads the given (default: every) Lazy now. Returns {name: error or None}."""
+    errors = {}
+    for name in names or list(_registry):
+        try:
+            _registry[name].get()
+            errors[name] = None
+        except Exception as e:
+            errors[name] = str(e)
+    return errors
+
+
+def status():
+    """{name: {loaded, load_ms, error}} of every Lazy."""
+    return {
+        name: {
+            "loaded": lazy.loaded,
+            "load_ms": round(lazy.load_seconds * 1000, 1) if lazy.load_seconds is not None else None,
+            "error": lazy.error,
+        }
+        for name, lazy in _registry.items()
+    }
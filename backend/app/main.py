@@ -1,22 +1,101 @@
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse
 from typing import List, Optional
+import asyncio
 import json
+import orjson
+import os
+import re
+import shutil
+import tempfile
+import time
 from .services import (
     extract_text_from_pdf, 
+    extract_resume_text,
+    spool_upload,
+    PDFTooLarge,
+    PDF_MAX_BYTES,
     ask_gemini, 
     fetch_linkedin_jobs,
     analyze_summary,
     analyze_gaps,
     analyze_roadmap,
-    analyze_keywords
+    analyze_keywords,
+    run_analysis,
+    run_single_shot_analysis,
+    analysis_events,
+    ANALYSIS_STEPS,
+    analysis_job_store,
+    enqueue_analysis_job,
+    run_analysis_job,
+    cleanup_analysis_job,
+    QueueFull,
+    JOBS_WORKERS,
+    JOBS_MAX_ATTEMPTS,
+    BATCH_MAX_DOCS,
+    BATCH_MAX_BYTES,
+    BATCH_CHECKPOINT_DIR,
+    analysis_cache,
+    resume_texts,
+    job_search_cache,
+    fetch_jobs_for_keywords,
+    stream_jobs_for_keywords,
+    job_sources,
+    JOB_SEARCH_MAX_KEYWORDS,
+    JOB_RANK_CANDIDATES,
+    rank_jobs_for_resume,
+    job_details,
+    Job,
+    cached_resume_text,
+    job_index,
+    compaction_snapshot,
+    resume_contexts,
+    warm_up,
+    readiness,
+    PREWARM,
+    REQUEST_TIMEOUT,
+    gemini_policy
 )
 from .mcp_server import mcp
+from .analysis_jobs import WorkerPool
+from .batch import collect_pdfs, run_batch
+from .telemetry import TelemetryMiddleware, get_logger, histogram, observe_stream, render_metrics
+from .resilience import DeadlineMiddleware
 import pydantic
 
 app = FastAPI(title="AI Job Recommender API")
 
+# Workers for background analysis jobs. With JOBS_WORKERS=0 the API only
+# queues jobs and standalone workers (python -m app.worker) run them.
+job_workers = WorkerPool(
+    analysis_job_store,
+    run_analysis_job,
+    workers=JOBS_WORKERS,
+    max_attempts=JOBS_MAX_ATTEMPTS,
+    cleanup=cleanup_analysis_job,
+)
+
+@app.on_event("startup")
+async def start_job_workers():
+    job_workers.start()
+
+@app.on_event("startup")
+async def prewarm():
+    # In the background, so the server accepts requests right away; /ready reports when it's done
+    if PREWARM:
+        app.state.prewarm = asyncio.create_task(asyncio.to_thread(warm_up))
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    await job_workers.stop()
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no"
+}
+
 # Mount MCP Server
 # This exposes the MCP server at /mcp/sse and /mcp/messages
 app.mount("/mcp", mcp.sse_app())
@@ -29,6 +108,25 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(DeadlineMiddleware, default=REQUEST_TIMEOUT)
+# Outermost, so request timings and trace spans cover everything else
+app.add_middleware(TelemetryMiddleware)
+
+log = get_logger("api")
+sse_first_event_seconds = histogram(
+    "sse_first_event_seconds", "Time from request start to the first streamed event.", ("endpoint",)
+)
+sse_stream_seconds = histogram("sse_stream_seconds", "Duration of streamed responses.", ("endpoint",))
+
+class FastJSONResponse(JSONResponse):
+    """JSON encoded with orjson, for large job lists; Job objects are sent as their fields."""
+
+    def render(self, content):
+        return orjson.dumps(content, default=Job.to_dict)
+
+def observed(endpoint, body, started=None):
+    """Streams body while recording time to first event and total stream time for endpoint."""
+    return observe_stream(body, sse_first_event_seconds, sse_stream_seconds, started, endpoint=endpoint)
 
 class AnalysisResponse(pydantic.BaseModel):
     summary: str
@@ -37,88 +135,320 @@ class AnalysisResponse(pydantic.BaseModel):
     keywords: List[str]
 
 @app.post("/analyze-resume")
-async def analyze_resume_stream(file: UploadFile = File(...)):
+async def analyze_resume_stream(
+    file: UploadFile = File(...),
+    mode: str = Form("concurrent"),
+    deltas: bool = Form(True),
+    background: bool = Form(False)
+):
     """
     Streaming endpoint that sends SSE events as each analysis step completes.
     Each event contains the step name and result.
+    Independent steps run concurrently by default; pass mode=sequential to
+    run them one after another, or mode=single_shot to get every step from
+    one structured-output Gemini request.
+    With deltas (the default), 'delta' events carry partial text for the
+    summary, gaps and roadmap steps while they are generated; each step's
+    'complete' event still carries its full result. The stream opens with a
+    keywords 'preview' event from the local skills matcher, in time to start
+    a /fetch-jobs search before Gemini answers.
+    With background=true the analysis is queued instead and the response is
+    {"job_id": ...}; follow it with GET /analysis-jobs/{job_id}[/events].
     """
+    started = time.perf_counter()
     if file.content_type != "application/pdf":
         raise HTTPException(status_code=400, detail="Only PDF files are supported.")
+    if mode not in ("concurrent", "sequential", "single_shot"):
+        raise HTTPException(status_code=400, detail="mode must be 'concurrent', 'sequential' or 'single_shot'.")
     
-    content = await file.read()
-    resume_text = extract_text_from_pdf(content)
+    # Stream the upload to disk (size-capped) and extract off the event loop
+    try:
+        path, resume_id = await spool_upload(file)
+    except PDFTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    if background:
+        try:
+            job_id = await asyncio.to_thread(enqueue_analysis_job, path, resume_id, mode)
+        except QueueFull as e:
+            raise HTTPException(status_code=503, detail=f"Analysis queue is full: {e}", headers={"Retry-After": "30"})
+        return {"job_id": job_id, "status": "queued"}
+    try:
+        resume_text = await asyncio.to_thread(extract_resume_text, path, resume_id)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not read PDF: {str(e)}")
+    finally:
+        os.unlink(path)
     
-    def generate_analysis():
-        results = {}
-        
-        # Step 1: Summary
-        yield f"data: {json.dumps({'step': 'summary', 'status': 'processing'})}\n\n"
-        summary = analyze_summary(resume_text)
-        results['summary'] = summary
-        yield f"data: {json.dumps({'step': 'summary', 'status': 'complete', 'data': summary})}\n\n"
-        
-        # Step 2: Gaps
-        yield f"data: {json.dumps({'step': 'gaps', 'status': 'processing'})}\n\n"
-        gaps = analyze_gaps(resume_text)
-        results['gaps'] = gaps
-        yield f"data: {json.dumps({'step': 'gaps', 'status': 'complete', 'data': gaps})}\n\n"
-        
-        # Step 3: Roadmap  
-        yield f"data: {json.dumps({'step': 'roadmap', 'status': 'processing'})}\n\n"
-        roadmap = analyze_roadmap(resume_text)
-        results['roadmap'] = roadmap
-        yield f"data: {json.dumps({'step': 'roadmap', 'status': 'complete', 'data': roadmap})}\n\n"
-        
-        # Step 4: Keywords
-        yield f"data: {json.dumps({'step': 'keywords', 'status': 'processing'})}\n\n"
-        keywords = analyze_keywords(resume_text, summary)
-        results['keywords'] = keywords
-        yield f"data: {json.dumps({'step': 'keywords', 'status': 'complete', 'data': keywords})}\n\n"
-        
-        # Final complete event with all data
-        yield f"data: {json.dumps({'step': 'done', 'status': 'complete', 'data': results})}\n\n"
+    async def generate_analysis():
+        # Ends with a 'done' event carrying all results and the resume_id
+        async for event in analysis_events(resume_text, resume_id, mode, deltas):
+            yield f"data: {json.dumps(event)}\n\n"
     
-    return StreamingResponse(
-        generate_analysis(),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no"
-        }
-    )
+    return StreamingResponse(observed("analyze-resume", generate_analysis(), started),
+                             media_type="text/event-stream", headers=SSE_HEADERS)
+
+@app.post("/analyze-batch")
+async def analyze_batch(
+    files: List[UploadFile] = File(...),
+    batch_id: Optional[str] = Form(None),
+    concurrency: Optional[int] = Form(None)
+):
+    """
+    Analyzes many resumes (PDFs and/or zip archives of PDFs) and streams one
+    NDJSON line per document as it finishes, then a {"summary": ...} line.
+    Resubmitting with the same batch_id skips documents that already
+    succeeded; their stored results are sent with "resumed": true.
+    Uploads may total BATCH_MAX_BYTES (each PDF at most PDF_MAX_BYTES); files
+    past the first BATCH_MAX_DOCS documents are not read.
+    """
+    if batch_id is not None and not re.fullmatch(r"[A-Za-z0-9_-]{1,64}", batch_id):
+        raise HTTPException(status_code=400, detail="batch_id may only contain letters, digits, '-' and '_'.")
+    checkpoint = None
+    if batch_id:
+        os.makedirs(BATCH_CHECKPOINT_DIR, exist_ok=True)
+        checkpoint = os.path.join(BATCH_CHECKPOINT_DIR, f"{batch_id}.jsonl")
+    
+    workdir = tempfile.mkdtemp(prefix="batch-")
+    try:
+        documents = []
+        total = 0
+        for upload in files:
+            if len(documents) >= BATCH_MAX_DOCS:
+                break
+            is_zip = (upload.filename or "").lower().endswith(".zip")
+            left = BATCH_MAX_BYTES - total
+            try:
+                if left <= 0:
+                    raise PDFTooLarge()
+                path, _ = await spool_upload(upload, max_bytes=left if is_zip else min(PDF_MAX_BYTES, left))
+            except PDFTooLarge as e:
+                if is_zip or left < PDF_MAX_BYTES:
+                    raise HTTPException(status_code=413,
+                                        detail=f"The batch exceeds the {BATCH_MAX_BYTES // (1024 * 1024)} MB limit.")
+                raise HTTPException(status_code=413, detail=f"{upload.filename}: {e}")
+            total += os.path.getsize(path)
+            if is_zip:
+                documents += await asyncio.to_thread(
+                    collect_pdfs, [path], workdir, BATCH_MAX_DOCS - len(documents)
+                )
+                os.unlink(path)
+            else:
+                shutil.move(path, workdir)
+                documents.append((upload.filename, os.path.join(workdir, os.path.basename(path))))
+    except BaseException:
+        shutil.rmtree(workdir, ignore_errors=True)
+        raise
+    
+    async def generate_results():
+        try:
+            async for record in run_batch(documents, checkpoint=checkpoint, concurrency=concurrency):
+                yield json.dumps(record) + "\n"
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    
+    return StreamingResponse(observed("analyze-batch", generate_results()), media_type="application/x-ndjson",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/analysis-jobs/{job_id}")
+async def analysis_job_status(job_id: str):
+    """
+    Status of a background analysis job and the results of the steps that
+    have finished so far. Once status is 'done', results has every step.
+    """
+    job = await asyncio.to_thread(analysis_job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job id.")
+    results = {}
+    for _, event in await asyncio.to_thread(analysis_job_store.events, job_id):
+        if event['step'] == 'done' and event['status'] == 'complete':
+            results = event['data']
+        elif event['status'] == 'complete':
+            results[event['step']] = event['data']
+    return {**job, "results": results}
+
+@app.get("/analysis-jobs/{job_id}/events")
+async def analysis_job_events(job_id: str, after: int = 0, last_event_id: Optional[int] = Header(None)):
+    """
+    SSE stream of a background job: replays the events recorded so far, then
+    follows the job until its 'done' event. Every event has an id, so a
+    reconnecting client (Last-Event-ID header or ?after=) only gets what it missed.
+    """
+    if await asyncio.to_thread(analysis_job_store.get, job_id) is None:
+        raise HTTPException(status_code=404, detail="Unknown job id.")
+    cursor = last_event_id if last_event_id is not None else after
+
+    async def follow():
+        nonlocal cursor
+        while True:
+            for seq, event in await asyncio.to_thread(analysis_job_store.events, job_id, cursor):
+                cursor = seq
+                yield f"id: {seq}\ndata: {json.dumps(event)}\n\n"
+                if event['step'] == 'done':
+                    return
+            job = await asyncio.to_thread(analysis_job_store.get, job_id)
+            if job is None:
+                return
+            await asyncio.sleep(0.25)
+
+    return StreamingResponse(observed("analysis-job-events", follow()), media_type="text/event-stream",
+                             headers=SSE_HEADERS)
 
 @app.get("/fetch-jobs")
-async def get_jobs(keywords: str, location: str = "Türkiye"):
+async def get_jobs(
+    keywords: str,
+    location: str = "Türkiye",
+    max_keywords: Optional[int] = None,
+    resume_id: Optional[str] = None,
+    top_k: int = 10,
+    mode: str = "live",
+    sources: Optional[str] = None,
+    stream: bool = False
+):
+    """
+    Searches the job sources for the given comma-separated keywords: the
+    ones in JOB_SOURCES (LinkedIn by default), or a comma-separated `sources`
+    list. Jobs from every source are merged under 'linkedin', each with the
+    'sources' it was found on.
+    Whatever has arrived after JOB_SEARCH_DEADLINE seconds is returned;
+    keywords whose searches had not all finished are listed in 'timed_out'.
+    With the resume_id from /analyze-resume, a wider set of jobs is fetched
+    and the top_k most similar to the resume are returned, each with a 'score'.
+    mode=index answers from the local job index and only scrapes keywords
+    that have too few fresh matches there; mode=live (the default) always scrapes.
+    stream=true returns SSE instead: each job is sent as soon as the scraper
+    produces it (see stream_jobs_for_keywords), then a 'done' event, which
+    carries the top_k 'ranking' (job keys and scores) when resume_id is given.
+    """
+    if mode not in ("live", "index"):
+        raise HTTPException(status_code=400, detail="mode must be 'live' or 'index'.")
+    if not any(k.strip() for k in keywords.split(',')):
+        raise HTTPException(status_code=400, detail="keywords must name at least one search term.")
+    use_index = mode == "index"
+    try:
+        job_sources.resolve(sources)
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=f"{e.args[0]}. Available: {', '.join(job_sources.names())}.")
+    if stream:
+        return stream_jobs(keywords, location, max_keywords, resume_id, top_k, sources)
     try:
         # Split keywords by comma
         keyword_list = [k.strip() for k in keywords.split(',') if k.strip()]
-        
-        linkedin_jobs = []
+        resume_text = cached_resume_text(resume_id) if resume_id else None
         
         if len(keyword_list) >= 2:
-            # Take first 2 skills/keywords
-            target_skills = keyword_list[:2]
-            print(f"Executing split search for skills: {target_skills}")
-            
-            for skill in target_skills:
-                # Fetch 5 jobs for each skill
-                print(f"Fetching jobs for skill: {skill}")
-                jobs = fetch_linkedin_jobs(skill, location=location, rows=5)
-                linkedin_jobs.extend(jobs)
+            # Search the first few skills/keywords in parallel
+            target_skills = keyword_list[:max_keywords or JOB_SEARCH_MAX_KEYWORDS]
+            log.info("job_search_split", keywords=target_skills)
+            # Fetch 5 jobs for each skill, or a wider pool when ranking
+            rows = JOB_RANK_CANDIDATES if resume_text else 5
+            linkedin_jobs, timed_out = await fetch_jobs_for_keywords(
+                target_skills, location=location, rows=rows, use_index=use_index, sources=sources
+            )
                 
         else:
             # Fallback to normal search if less than 2 keywords
-            search_query = keyword_list[0] if keyword_list else keywords
-            print(f"Executing single search for: {search_query}")
-            linkedin_jobs = fetch_linkedin_jobs(search_query, location=location, rows=10)
+            search_query = keyword_list[0]
+            log.info("job_search_single", query=search_query)
+            rows = JOB_RANK_CANDIDATES if resume_text else 10
+            linkedin_jobs, timed_out = await fetch_jobs_for_keywords(
+                [search_query], location=location, rows=rows, use_index=use_index, sources=sources
+            )
+        
+        if resume_text:
+            linkedin_jobs = await asyncio.to_thread(rank_jobs_for_resume, resume_text, linkedin_jobs, top_k)
         
-        return {
-            "linkedin": linkedin_jobs
-        }
+        return FastJSONResponse({
+            "linkedin": linkedin_jobs,
+            "timed_out": timed_out
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def stream_jobs(keywords, location, max_keywords, resume_id, top_k, sources):
+    started = time.perf_counter()
+    keyword_list = [k.strip() for k in keywords.split(',') if k.strip()]
+    resume_text = cached_resume_text(resume_id) if resume_id else None
+    if len(keyword_list) >= 2:
+        keyword_list = keyword_list[:max_keywords or JOB_SEARCH_MAX_KEYWORDS]
+        rows = JOB_RANK_CANDIDATES if resume_text else 5
+    else:
+        rows = JOB_RANK_CANDIDATES if resume_text else 10
+    
+    async def generate_jobs():
+        jobs = {}
+        failed = []
+        async for event in stream_jobs_for_keywords(keyword_list, location=location, rows=rows, sources=sources):
+            if event['type'] == 'job':
+                jobs[event['key']] = event['job']
+            elif event['type'] == 'keyword_done' and event.get('error'):
+                failed.append({'keyword': event['keyword'], 'source': event['source'], 'error': event['error']})
+            yield sse_frame(event)
+        done = {'type': 'done', 'jobs': len(jobs), 'failed': failed}
+        if resume_text:
+            keys = list(jobs)
+            ranked = await asyncio.to_thread(
+                rank_jobs_for_resume, resume_text, [dict(jobs[k], key=k) for k in keys], top_k
+            )
+            done['ranking'] = [{'key': job['key'], 'score': job['score']} for job in ranked]
+        yield sse_frame(done)
+    
+    return StreamingResponse(observed("fetch-jobs", generate_jobs(), started),
+                             media_type="text/event-stream", headers=SSE_HEADERS)
+
+def sse_frame(event):
+    """One SSE event, encoded with orjson; Job objects are sent as their fields."""
+    return b"data: " + orjson.dumps(event, default=Job.to_dict) + b"\n\n"
+
+@app.get("/jobs/{job_id:path}")
+async def get_job_details(job_id: str):
+    """
+    The full posting of a job returned by /fetch-jobs, including its whole
+    description (job lists only carry a preview). job_id is the job's 'id',
+    or its 'link' for jobs without one.
+    """
+    job = await asyncio.to_thread(job_details, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job, or no longer in the job index.")
+    return FastJSONResponse(job)
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return {
+        "analysis": analysis_cache.stats(),
+        "resume_texts": resume_texts.stats(),
+        "jobs": job_search_cache.stats(),
+        "job_index": job_index.stats(),
+        "job_sources": job_sources.stats(),
+        "compaction": compaction_snapshot(),
+        "gemini_contexts": resume_contexts.stats(),
+        "analysis_jobs": await asyncio.to_thread(job_workers.stats)
+    }
+
+@app.get("/health")
+async def health():
+    """Liveness: the process is up and serving requests."""
+    return {"status": "ok"}
+
+@app.get("/ready")
+async def ready(warm: bool = False):
+    """
+    Readiness: 200 once the SDKs, clients and PDF workers are loaded, else 503.
+    warm=true loads whatever isn't loaded yet before answering. "gemini" shows
+    its circuit breaker and recent p95 latency (an open circuit doesn't make the API unready).
+    """
+    if warm:
+        await asyncio.to_thread(warm_up)
+    is_ready, components = readiness()
+    return FastJSONResponse(
+        {"ready": is_ready, "components": components, "gemini": gemini_policy.stats()},
+        status_code=200 if is_ready else 503,
+    )
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: request, Gemini, Apify, PDF and streaming timings, tokens and cost."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 @app.get("/")
 async def root():
     return {"message": "AI Job Recommender API is running"}
@@ -1,32 +1,143 @@
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import FastMCP, Context
 from typing import List
+import asyncio
+import functools
+import os
+import weakref
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse, unquote
 try:
     from .services import (
         extract_text_from_pdf, 
         ask_gemini, 
-        fetch_linkedin_jobs, 
+        fetch_jobs_for_keywords,
         analyze_summary,
         analyze_gaps,
         analyze_roadmap,
-        analyze_keywords
+        analyze_keywords,
+        extract_resume_text_async,
+        resume_id_for_file,
+        cached_resume_text,
+        PDF_MAX_BYTES,
+        run_analysis_step,
+        analysis_events,
+        ANALYSIS_STEPS,
+        rank_jobs_for_resume,
+        JOB_RANK_CANDIDATES,
+        warm_up,
+        PREWARM
     )
 except ImportError:
     from services import (
         extract_text_from_pdf, 
         ask_gemini, 
-        fetch_linkedin_jobs, 
+        fetch_jobs_for_keywords,
         analyze_summary,
         analyze_gaps,
         analyze_roadmap,
-        analyze_keywords
+        analyze_keywords,
+        extract_resume_text_async,
+        resume_id_for_file,
+        cached_resume_text,
+        PDF_MAX_BYTES,
+        run_analysis_step,
+        analysis_events,
+        ANALYSIS_STEPS,
+        rank_jobs_for_resume,
+        JOB_RANK_CANDIDATES,
+        warm_up,
+        PREWARM
     )
+try:
+    from .telemetry import traced, histogram
+    from .resilience import deadline_scope
+    from .skills import rank_keywords
+except ImportError:
+    from telemetry import traced, histogram
+    from resilience import deadline_scope
+    from skills import rank_keywords
 import json
 
+mcp_tool_seconds = histogram("mcp_tool_seconds", "MCP tool call time.", ("tool", "outcome"))
+
+# Tool calls one MCP session may run at once; further calls wait for a free slot,
+# so a single agent can't monopolize Gemini, Apify and the PDF pool
+MCP_SESSION_CONCURRENCY = int(os.getenv("MCP_SESSION_CONCURRENCY", "4"))
+# Deadline of one tool call in seconds (0: none); Gemini and Apify calls it makes are capped to the time left
+MCP_TOOL_TIMEOUT = float(os.getenv("MCP_TOOL_TIMEOUT", "0"))
+_session_slots = weakref.WeakKeyDictionary()
+
+def session_limited(fn):
+    """
+    Runs an async tool under its session's MCP_SESSION_CONCURRENCY limit and
+    within MCP_TOOL_TIMEOUT (the deadline starts once the call gets its slot).
+    Calls without a request context (e.g. direct calls in-process) are not limited.
+    If the client cancels the request or disconnects, the tool's task is
+    cancelled and the cancellation reaches every await inside it.
+    """
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        ctx = kwargs.get("ctx")
+        try:
+            session = ctx.session if ctx else None
+        except ValueError:
+            session = None
+        if session is None:
+            with deadline_scope(MCP_TOOL_TIMEOUT):
+                return await fn(*args, **kwargs)
+        slots = _session_slots.get(session)
+        if slots is None:
+            slots = _session_slots[session] = asyncio.Semaphore(MCP_SESSION_CONCURRENCY)
+        async with slots:
+            with deadline_scope(MCP_TOOL_TIMEOUT):
+                return await fn(*args, **kwargs)
+    return wrapper
+
+# Directories parse_pdf_file may read from (os.pathsep-separated); empty allows any local file
+MCP_PDF_ROOTS = [os.path.realpath(p) for p in os.getenv("MCP_PDF_ROOTS", "").split(os.pathsep) if p]
+
+RESUME_URI = "resume://"
+
+def _local_pdf_path(path):
+    """Real path of a local PDF given as a path or file:// URI. Raises ValueError if it can't be read."""
+    if path.startswith("file://"):
+        path = unquote(urlparse(path).path)
+    path = os.path.realpath(os.path.expanduser(path))
+    if MCP_PDF_ROOTS and not any(os.path.commonpath([root, path]) == root for root in MCP_PDF_ROOTS):
+        raise ValueError(f"{path} is outside MCP_PDF_ROOTS.")
+    if not os.path.isfile(path):
+        raise ValueError(f"No such file: {path}")
+    if os.path.getsize(path) > PDF_MAX_BYTES:
+        raise ValueError(f"PDF exceeds the {PDF_MAX_BYTES // (1024 * 1024)} MB limit.")
+    return path
+
+def resolve_resume_text(text):
+    """text itself, or the resume text a resume:// handle refers to."""
+    if not text.startswith(RESUME_URI):
+        return text
+    resume_text = cached_resume_text(text[len(RESUME_URI):])
+    if resume_text is None:
+        raise ValueError(f"Unknown or expired resume handle {text}; parse the PDF again.")
+    return resume_text
+
+@asynccontextmanager
+async def lifespan(server):
+    # Each stdio session is a fresh process; with PREWARM=1 the handshake is answered
+    # right away while the SDKs load in the background for the first tool call
+    warming = asyncio.create_task(asyncio.to_thread(warm_up)) if PREWARM else None
+    try:
+        yield {}
+    finally:
+        if warming:
+            warming.cancel()
+
 # Initialize FastMCP server
-mcp = FastMCP("Job Recommender MCP Server")
+mcp = FastMCP("Job Recommender MCP Server", lifespan=lifespan)
 
 @mcp.tool()
-def parse_pdf(pdf_bytes: bytes) -> str:
+@traced("mcp_tool", mcp_tool_seconds, tool="parse_pdf")
+@session_limited
+async def parse_pdf(pdf_bytes: bytes, ctx: Context = None) -> str:
     """
     Extracts text from a PDF file.
     Args:
@@ -34,45 +145,126 @@ def parse_pdf(pdf_bytes: bytes) -> str:
     Returns:
         The extracted text from the PDF.
     """
-    return extract_text_from_pdf(pdf_bytes)
+    # Parsed in the PDF process pool, off the event loop shared with the HTTP API
+    return await extract_resume_text_async(pdf_bytes)
 
 @mcp.tool()
-def analyze_resume_text(text: str, aspect: str) -> str:
+@traced("mcp_tool", mcp_tool_seconds, tool="parse_pdf_file")
+@session_limited
+async def parse_pdf_file(path: str, ctx: Context = None) -> dict:
+    """
+    Extracts text from a local PDF file, so the PDF never travels through MCP messages.
+    Args:
+        path: Path of the PDF file, or a file:// URI.
+    Returns:
+        'resume': a resume:// handle to pass as the resume text to the other tools
+        instead of the text itself, plus the text's length ('chars') and a short 'preview'.
+    """
+    path = _local_pdf_path(path)
+    # Hashed through a memory map and parsed from the path in the PDF pool: the
+    # file is never copied into this process or pickled to the worker
+    resume_id = await asyncio.to_thread(resume_id_for_file, path)
+    text = await extract_resume_text_async(path, resume_id)
+    if cached_resume_text(resume_id) is None:
+        # A handle nothing can resolve is worse than an error
+        raise ValueError(f"The resume text ({len(text)} chars) is too large to keep; use parse_pdf instead.")
+    return {"resume": f"{RESUME_URI}{resume_id}", "chars": len(text), "preview": text[:200]}
+
+@mcp.resource(RESUME_URI + "{resume_id}", mime_type="text/plain")
+def resume_resource(resume_id: str) -> str:
+    """Extracted text of a resume parsed by parse_pdf, parse_pdf_file or the HTTP API."""
+    return resolve_resume_text(RESUME_URI + resume_id)
+
+@mcp.tool()
+@traced("mcp_tool", mcp_tool_seconds, tool="extract_keywords")
+@session_limited
+async def extract_keywords(text: str, limit: int = 20, ctx: Context = None) -> List[dict]:
+    """
+    Finds the job titles and technologies a resume mentions, without calling Gemini:
+    instant and deterministic, so a job search can start before any analysis.
+    Titles the resume doesn't name are inferred from its technologies (mentions 0).
+    Args:
+        text: The text content of the resume, or a resume:// handle from parse_pdf_file.
+        limit: Maximum number of keywords to return.
+    Returns:
+        Keywords best first, each with 'keyword', 'kind' ('title' or 'technology'), 'score' and 'mentions'.
+    """
+    text = resolve_resume_text(text)
+    return [{"keyword": k.name, "kind": k.kind, "score": k.score, "mentions": k.mentions}
+            for k in rank_keywords(text)[:limit]]
+
+@mcp.tool()
+@traced("mcp_tool", mcp_tool_seconds, tool="analyze_resume_text")
+@session_limited
+async def analyze_resume_text(text: str, aspect: str, ctx: Context = None) -> str:
     """
     Analyzes a resume text for a specific aspect using Gemini.
     Args:
-        text: The text content of the resume.
+        text: The text content of the resume, or a resume:// handle from parse_pdf_file.
         aspect: The aspect to analyze. Can be 'summary', 'gaps', 'roadmap', or 'keywords'.
     Returns:
         The analysis result for the requested aspect.
     """
-    if aspect == 'summary':
-        return analyze_summary(text)
-
-    elif aspect == 'gaps':
-        return analyze_gaps(text)
-
-    elif aspect == 'roadmap':
-        return analyze_roadmap(text)
+    text = resolve_resume_text(text)
+    if aspect in ('summary', 'gaps', 'roadmap'):
+        # Shares the analysis cache with /analyze-resume
+        return await run_analysis_step(aspect, text)
     
     elif aspect == 'keywords':
         # Keywords service returns a list, but tool description says str. 
         # But we previously returned whatever ask_gemini returned (str).
         # We can return JSON string for consistency with MCP text-based nature.
-        keywords = analyze_keywords(text)
+        keywords = await run_analysis_step('keywords', text)
         return json.dumps(keywords)
 
     else:
         return f"Unknown aspect: {aspect}"
 
 @mcp.tool()
-def get_job_recommendations(keywords: str, location: str = "Türkiye") -> List[dict]:
+@traced("mcp_tool", mcp_tool_seconds, tool="analyze_resume_full")
+@session_limited
+async def analyze_resume_full(text: str, ctx: Context = None) -> dict:
+    """
+    Analyzes a resume text for every aspect in one call.
+    Summary, gaps and roadmap run concurrently and keywords starts once the
+    summary is ready, so this takes about as long as the slowest aspect.
+    Progress is reported as each aspect completes.
+    Args:
+        text: The text content of the resume, or a resume:// handle from parse_pdf_file.
+    Returns:
+        A dictionary with 'summary', 'gaps', 'roadmap' and 'keywords'.
+    """
+    text = resolve_resume_text(text)
+    results = {}
+    completed = 0
+    async for event in analysis_events(text, None):
+        if event['step'] == 'done':
+            results = event['data']
+        elif event['status'] == 'complete' and ctx is not None:
+            completed += 1
+            await ctx.report_progress(completed, len(ANALYSIS_STEPS))
+    results.pop('resume_id', None)
+    return results
+
+@mcp.tool()
+@traced("mcp_tool", mcp_tool_seconds, tool="get_job_recommendations")
+@session_limited
+async def get_job_recommendations(keywords: str, location: str = "Türkiye", resume_text: str = "",
+                                  sources: str = "", ctx: Context = None) -> List[dict]:
     """
-    Fetches job recommendations from LinkedIn based on keywords and location.
+    Fetches job recommendations from the job sources (LinkedIn by default) based on keywords and location.
     Args:
         keywords: Job search keywords.
         location: Location for the job search (default: "Türkiye").
+        resume_text: Optional resume text or resume:// handle. When given, a wider set of jobs is
+            fetched and the 10 most relevant to the resume are returned with a 'score'.
+        sources: Optional comma-separated job sources to search, e.g. "linkedin,naukri".
     Returns:
         A list of job dictionaries.
     """
-    return fetch_linkedin_jobs(keywords, location=location, rows=10)
+    resume_text = resolve_resume_text(resume_text)
+    rows = JOB_RANK_CANDIDATES if resume_text else 10
+    jobs, _ = await fetch_jobs_for_keywords([keywords], location=location, rows=rows, sources=sources or None)
+    if resume_text:
+        return await asyncio.to_thread(rank_jobs_for_resume, resume_text, jobs, 10)
+    return jobs
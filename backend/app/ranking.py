@@ -0,0 +1,110 @@
+import re
+import zlib
+
+try:
+    from .lazy import LazyModule
+except ImportError:
+    from lazy import LazyModule
+
+# Imported on first ranking; they are most of the app's import time otherwise
+np = LazyModule("numpy")
+sparse = LazyModule("scipy.sparse")
+
+# Hashed feature space for unigrams + bigrams; large enough that collisions are rare
+N_FEATURES = 2 ** 18
+# Keeps terms like "c++", "c#" and "node.js" whole
+TOKEN_RE = re.compile(r"[a-z0-9+#]+(?:\.[a-z0-9+#]+)*")
+# Only the start of long descriptions is used, bounding the cost per posting
+MAX_FIELD_CHARS = 4000
+
+# Fields of a job dict that describe it, with how much each counts
+JOB_TEXT_FIELDS = (
+    ("title", 3),
+    ("skills", 2),
+    ("companyName", 1),
+    ("description", 1),
+    ("descriptionText", 1),
+)
+
+_feature_ids = {}
+
+
+def _feature(term):
+    """Column index for a term. crc32 keeps it stable across processes, unlike hash()."""
+    idx = _feature_ids.get(term)
+    if idx is None:
+        idx = zlib.crc32(term.encode("utf-8")) % N_FEATURES
+        if len(_feature_ids) < 500_000:
+            _feature_ids[term] = idx
+    return idx
+
+
+def job_text(job):
+    """Weighted text used to represent a job posting."""
+    parts = []
+    for field, weight in JOB_TEXT_FIELDS:
+        value = job.get(field)
+        if isinstance(value, list):
+            value = " ".join(map(str, value))
+        if value:
+            parts += [str(value)[:MAX_FIELD_CHARS]] * weight
+    return " ".join(parts)
+
+
+def vectorize(texts):
+    """Sparse term-count matrix (len(texts) x N_FEATURES) over hashed unigrams and bigrams."""
+    tokens, lengths = [], []
+    for text in texts:
+        doc_tokens = TOKEN_RE.findall(text.lower())
+        tokens += doc_tokens
+        lengths.append(len(doc_tokens))
+    # Hash each distinct token once, then map the whole token stream in C
+    lookup = {t: _feature(t) for t in dict.fromkeys(tokens)}
+    unigrams = np.fromiter(map(lookup.__getitem__, tokens), dtype=np.int64, count=len(tokens))
+    rows = np.repeat(np.arange(len(texts)), lengths)
+    # Bigram features are derived from adjacent unigram ids within the same document
+    same_doc = rows[:-1] == rows[1:]
+    bigrams = (unigrams[:-1] * 1_000_003 + unigrams[1:] + 1)[same_doc] % N_FEATURES
+    cols = np.concatenate([unigrams, bigrams])
+    rows = np.concatenate([rows, rows[:-1][same_doc]])
+    data = np.ones(len(cols), dtype=np.float32)
+    matrix = sparse.csr_matrix((data, (rows, cols)), shape=(len(texts), N_FEATURES), dtype=np.float32)
+    matrix.sum_duplicates()
+    return matrix
+
+
+def _tfidf(counts, idf):
+    """Sublinear TF, IDF-weighted and L2-normalized rows."""
+    matrix = counts.copy()
+    matrix.data = np.log1p(matrix.data) * idf[matrix.indices]
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags(1.0 / norms) @ matrix
+
+
+def score_jobs(query_text, jobs):
+    """Cosine similarity of every job to the query, computed in one sparse matrix-vector product."""
+    if not jobs:
+        return np.zeros(0, dtype=np.float32)
+    counts = vectorize([job_text(job) for job in jobs])
+    # Document frequency over the candidate set: each stored (row, col) pair is one occurrence
+    df = np.bincount(counts.indices, minlength=N_FEATURES)
+    idf = (np.log((1 + len(jobs)) / (1 + df)) + 1).astype(np.float32)
+    job_matrix = _tfidf(counts, idf)
+    query = _tfidf(vectorize([query_text]), idf)
+    return np.asarray((job_matrix @ query.T).todense()).ravel()
+
+
+def rank_jobs(query_text, jobs, top_k=10, full=None):
+    """
+    Returns the top_k jobs most similar to query_text, best first, each with a 'score'.
+    full optionally gives, for each job, the complete posting to score on
+    (e.g. when `jobs` only carry description previews).
+    """
+    scores = score_jobs(query_text, full if full is not None else jobs)
+    if len(scores) > top_k:
+        top = np.argpartition(-scores, top_k)[:top_k]
+    else:
+        top = np.arange(len(scores))
+    top = top[np.argsort(-scores[top], kind="stable")]
+    return [dict(jobs[i], score=round(float(scores[i]), 4)) for i in top]
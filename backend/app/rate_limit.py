@@ -0,0 +1,177 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+
+class _Waiter:
+    """A queued caller. Sync callers wait on an Event, async callers on a Future."""
+
+    def __init__(self, tokens, loop=None):
+        self.tokens = tokens
+        self.granted = False
+        self._loop = loop
+        self._future = loop.create_future() if loop else None
+        self._event = None if loop else threading.Event()
+
+    def wake(self):
+        if self._loop:
+            self._loop.call_soon_threadsafe(self._set_future)
+        else:
+            self._event.set()
+
+    def _set_future(self):
+        if not self._future.done():
+            self._future.set_result(None)
+
+    def wait(self, timeout):
+        self._event.wait(timeout)
+        self._event.clear()
+
+    async def wait_async(self, timeout):
+        try:
+            await asyncio.wait_for(asyncio.shield(self._future), timeout)
+        except asyncio.TimeoutError:
+            pass
+        if self._future.done():
+            self._future = self._loop.create_future()
+
+
+class ConcurrencyLimiter:
+    """
+    Process-wide limiter for outbound LLM calls.
+
+    Caps the number of in-flight requests and, optionally, the tokens spent per
+    minute (token bucket). Callers are served strictly first-come-first-served,
+    so under load requests queue up instead of tripping provider 429s.
+    Works from both threads and event loops, so sync and async callers share
+    the same budget.
+    """
+
+    def __init__(self, max_in_flight=16, tokens_per_minute=0):
+        self.max_in_flight = max_in_flight
+        self.tokens_per_minute = tokens_per_minute
+        self._lock = threading.Lock()
+        self._queue = deque()
+        self._in_flight = 0
+        self._tokens = float(tokens_per_minute)
+        self._refilled_at = time.monotonic()
+        self.requests = 0
+        self.tokens_used = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        if self.tokens_per_minute:
+            rate = self.tokens_per_minute / 60.0
+            self._tokens = min(self.tokens_per_minute, self._tokens + (now - self._refilled_at) * rate)
+        self._refilled_at = now
+
+    def _try_grant(self, caller=None):
+        """
+        Grants the head of the queue if possible. Returns seconds until tokens suffice, or None.
+        A head waiting for tokens is woken (unless it is the caller, which gets the
+        delay returned), so a waiter that queued behind a full set of slots starts
+        polling for tokens once a slot frees up.
+        """
+        while self._queue and self._in_flight < self.max_in_flight:
+            waiter = self._queue[0]
+            if self.tokens_per_minute:
+                self._refill()
+                needed = min(waiter.tokens, self.tokens_per_minute)
+                if self._tokens < needed:
+                    if waiter is not caller:
+                        waiter.wake()
+                    return (needed - self._tokens) / (self.tokens_per_minute / 60.0)
+                self._tokens -= needed
+            self._queue.popleft()
+            self._in_flight += 1
+            waiter.granted = True
+            waiter.wake()
+        return None
+
+    def _enqueue(self, waiter):
+        with self._lock:
+            self._queue.append(waiter)
+            return self._try_grant(waiter)
+
+    def _poll(self, waiter):
+        with self._lock:
+            return None if waiter.granted else self._try_grant(waiter)
+
+    def _abandon(self, waiter):
+        with self._lock:
+            if waiter.granted:
+                self._release_locked(0)
+            else:
+                self._queue.remove(waiter)
+                self._try_grant()
+
+    def _release_locked(self, refund, tokens=0):
+        self._in_flight -= 1
+        self.requests += 1
+        self.tokens_used += max(tokens - refund, 0)
+        if self.tokens_per_minute and refund > 0:
+            self._refill()
+            self._tokens = min(self.tokens_per_minute, self._tokens + refund)
+        self._try_grant()
+
+    def release(self, refund=0, tokens=0):
+        """Frees an in-flight slot and returns unused tokens to the bucket."""
+        with self._lock:
+            self._release_locked(refund, tokens)
+
+    def acquire(self, tokens=0):
+        waiter = _Waiter(tokens)
+        delay = self._enqueue(waiter)
+        try:
+            while not waiter.granted:
+                waiter.wait(delay)
+                delay = self._poll(waiter)
+        except BaseException:
+            self._abandon(waiter)
+            raise
+
+    async def acquire_async(self, tokens=0):
+        waiter = _Waiter(tokens, asyncio.get_running_loop())
+        delay = self._enqueue(waiter)
+        try:
+            while not waiter.granted:
+                await waiter.wait_async(delay)
+                delay = self._poll(waiter)
+        except BaseException:
+            self._abandon(waiter)
+            raise
+
+    @contextmanager
+    def slot(self, tokens=0):
+        """Holds one in-flight slot (and `tokens` from the bucket) for the block."""
+        self.acquire(tokens)
+        usage = {"refund": 0}
+        try:
+            yield usage
+        finally:
+            self.release(usage["refund"], tokens)
+
+    @asynccontextmanager
+    async def slot_async(self, tokens=0):
+        await self.acquire_async(tokens)
+        usage = {"refund": 0}
+        try:
+            yield usage
+        finally:
+            self.release(usage["refund"], tokens)
+
+    def stats(self):
+        with self._lock:
+            self._refill()
+            return {
+                "in_flight": self._in_flight,
+                "queued": len(self._queue),
+                "max_in_flight": self.max_in_flight,
+                "tokens_per_minute": self.tokens_per_minute,
+                "tokens_available": int(self._tokens) if self.tokens_per_minute else None,
+                # Completed calls and the tokens they were charged (reservation minus refund)
+                "requests": self.requests,
+                "tokens_used": self.tokens_used,
+            }
@@ -0,0 +1,377 @@
+"""
+Tail-latency control for outbound calls (Gemini, Apify):
+
+- Deadlines: deadline_scope() sets a deadline for everything a request does.
+  It lives in a context variable, so it follows the request into awaited
+  code, tasks and asyncio.to_thread, and remaining() caps each call's timeout.
+- RetryPolicy: jittered exponential backoff on retryable errors, a circuit
+  breaker that fails fast while a provider keeps failing, and (async only)
+  hedging: a second request once the first runs past the provider's p95.
+- DeadlineMiddleware: an HTTP request's deadline from its X-Request-Timeout header.
+"""
+import asyncio
+import contextvars
+import random
+import threading
+import time
+from collections import deque
+from contextlib import AsyncExitStack, contextmanager, nullcontext
+
+try:
+    from .telemetry import counter, get_logger
+except ImportError:
+    from telemetry import counter, get_logger
+
+log = get_logger("resilience")
+
+outbound_retries_total = counter("outbound_retries_total", "Retried outbound calls.", ("provider",))
+outbound_hedges_total = counter(
+    "outbound_hedges_total", "Hedged outbound calls, by which request answered (hedge or original).",
+    ("provider", "winner"),
+)
+circuit_open_total = counter(
+    "circuit_open_total", "Calls failed fast because the provider's circuit was open.", ("provider",)
+)
+
+_deadline = contextvars.ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a request's deadline has passed before (or while) calling out."""
+
+
+class CircuitOpen(RuntimeError):
+    """Raised instead of calling a provider whose circuit breaker is open."""
+
+
+@contextmanager
+def deadline_scope(seconds):
+    """Runs the block with a deadline `seconds` from now (kept if an outer one is sooner). None or 0: no change."""
+    if not seconds:
+        yield
+        return
+    deadline = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(deadline if outer is None else min(outer, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining(timeout=None):
+    """
+    Seconds left for a call: `timeout` capped by the current deadline (None
+    when there is neither). Raises DeadlineExceeded once the deadline has passed.
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return timeout
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise DeadlineExceeded("request deadline exceeded")
+    return left if timeout is None else min(timeout, left)
+
+
+# Error types and status codes worth another try: rate limits, overload and timeouts
+RETRYABLE_TYPES = frozenset((
+    "TimeoutError", "ConnectionError", "ConnectTimeout", "ReadTimeout", "RemoteProtocolError",
+    "ResourceExhausted", "ServiceUnavailable", "InternalServerError", "DeadlineExceeded", "TooManyRequests",
+))
+RETRYABLE_STATUS = ("429", "500", "502", "503", "504")
+# Error types of a call that ran out of its timeout
+TIMEOUT_TYPES = frozenset(("ConnectTimeout", "ReadTimeout", "DeadlineExceeded"))
+
+
+def is_retryable(error):
+    if isinstance(error, (CircuitOpen, DeadlineExceeded)):
+        return False
+    if isinstance(error, (TimeoutError, ConnectionError)) or type(error).__name__ in RETRYABLE_TYPES:
+        return True
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    return str(status) in RETRYABLE_STATUS or str(error)[:3] in RETRYABLE_STATUS
+
+
+def is_timeout(error):
+    return isinstance(error, TimeoutError) or type(error).__name__ in TIMEOUT_TYPES
+
+
+class CircuitBreaker:
+    """
+    Opens after `failures` consecutive failures and fails calls fast for
+    `reset_after` seconds; then lets one trial call through (half-open),
+    closing again if it succeeds. failures=0 disables the breaker.
+    """
+
+    def __init__(self, name, failures=5, reset_after=30.0):
+        self.name = name
+        self.failures = failures
+        self.reset_after = reset_after
+        self._lock = threading.Lock()
+        self._consecutive = 0
+        self._opened_at = None
+        self._trial_at = None
+        self.opened = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self._opened_at >= self.reset_after else "open"
+
+    def allow(self):
+        """Raises CircuitOpen unless a call may go ahead."""
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return
+            # One trial at a time; a trial that never reported back (e.g. cancelled) expires
+            now = time.monotonic()
+            if state == "half_open" and (self._trial_at is None or now - self._trial_at >= self.reset_after):
+                self._trial_at = now
+                return
+        circuit_open_total.inc(provider=self.name)
+        raise CircuitOpen(f"{self.name} is unavailable (circuit open)")
+
+    def forget(self):
+        """Ends a call that says nothing about the provider's health, freeing a half-open trial."""
+        with self._lock:
+            self._trial_at = None
+
+    def record(self, ok):
+        with self._lock:
+            self._trial_at = None
+            if ok:
+                self._consecutive = 0
+                self._opened_at = None
+                return
+            self._consecutive += 1
+            state = self._state()
+            # A failed trial reopens the circuit; failures of calls started before it opened don't extend it
+            if self.failures and (state == "half_open" or (state == "closed" and self._consecutive >= self.failures)):
+                self._opened_at = time.monotonic()
+                self.opened += 1
+                log.warning("circuit_opened", provider=self.name, failures=self._consecutive)
+
+    def stats(self):
+        with self._lock:
+            return {"state": self._state(), "consecutive_failures": self._consecutive, "opened": self.opened}
+
+
+class LatencyWindow:
+    """Latencies of the last `size` successful calls, for the hedging threshold."""
+
+    def __init__(self, size=200, min_samples=20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q):
+        """The q-quantile, or None until min_samples calls have been seen."""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class RetryPolicy:
+    """
+    Retries, deadline, circuit breaker and hedging for one provider.
+    call()/call_async() take a function making one attempt, with the timeout
+    (seconds) that attempt may use. With `slot` (a function returning a
+    context manager, e.g. a limiter slot) each attempt runs inside slot() and
+    gets what it yields as a second argument; the attempt's timeout and
+    latency start once the slot is held, so local queueing never counts as
+    the provider being slow or down.
+    """
+
+    def __init__(self, provider, timeout=60.0, retries=2, base_delay=0.5, max_delay=8.0,
+                 breaker=None, hedge_quantile=None):
+        self.provider = provider
+        self.timeout = timeout
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker or CircuitBreaker(provider, failures=0)
+        self.hedge_quantile = hedge_quantile
+        self.latencies = LatencyWindow()
+
+    def backoff(self, attempt):
+        """Full-jitter delay before retry number `attempt` (0-based)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _next_delay(self, error, attempt, retryable):
+        """Delay before the next attempt, or None to give up with `error`."""
+        if attempt >= self.retries or not is_retryable(error) or (retryable and not retryable(error)):
+            return None
+        delay = self.backoff(attempt)
+        try:
+            left = remaining()
+        except DeadlineExceeded:
+            return None
+        if left is not None and left <= delay:
+            return None
+        outbound_retries_total.inc(provider=self.provider)
+        log.info("outbound_retry", provider=self.provider, attempt=attempt + 1, delay_ms=round(delay * 1000),
+                 error=str(error))
+        return delay
+
+    def attempt_timeout(self):
+        """
+        (seconds, capped): the timeout of an attempt starting now, and whether
+        the request's deadline rather than the provider's timeout sets it.
+        """
+        timeout = remaining(self.timeout)
+        return timeout, timeout is not None and (self.timeout is None or timeout < self.timeout)
+
+    def record_failure(self, error, capped=False):
+        """
+        Reports a failed attempt to the breaker. Only unavailability counts
+        against the provider: a rejected request (e.g. a 400) is not recorded,
+        and a timeout cut short by the request's deadline (capped) is raised
+        as DeadlineExceeded instead, so one impatient client can't open the
+        circuit for everyone.
+        """
+        if capped and is_timeout(error):
+            self.breaker.forget()
+            raise DeadlineExceeded("request deadline exceeded") from error
+        if is_retryable(error):
+            self.breaker.record(False)
+        else:
+            self.breaker.forget()
+
+    def call(self, attempt_fn, retryable=None, slot=None):
+        """Runs attempt_fn(timeout[, held slot]) with retries; raises the last error."""
+        for attempt in range(self.retries + 1):
+            self.breaker.allow()
+            with (slot() if slot else nullcontext()) as held:
+                timeout, capped = self.attempt_timeout()
+                started = time.monotonic()
+                try:
+                    result = attempt_fn(timeout, held) if slot else attempt_fn(timeout)
+                except Exception as e:
+                    self.record_failure(e, capped)
+                    delay = self._next_delay(e, attempt, retryable)
+                    if delay is None:
+                        raise
+                else:
+                    self.breaker.record(True)
+                    self.latencies.add(time.monotonic() - started)
+                    return result
+            # Backoff without holding the slot
+            time.sleep(delay)
+
+    async def call_async(self, attempt_fn, retryable=None, hedge=False, slot=None):
+        """
+        Awaits attempt_fn(timeout[, held slot]) with retries; raises the last error.
+        slot() is an async context manager here; waiting for it ends with
+        DeadlineExceeded at the request's deadline.
+        With hedge=True (and hedge_quantile set), an attempt still running past
+        that quantile of recent latencies gets a second, concurrent attempt in
+        the same slot; whichever succeeds first is used and the other is cancelled.
+        """
+        for attempt in range(self.retries + 1):
+            self.breaker.allow()
+            async with AsyncExitStack() as stack:
+                held = await self._hold(stack, slot)
+                run = (lambda timeout: attempt_fn(timeout, held)) if slot else attempt_fn
+                timeout, capped = self.attempt_timeout()
+                started = time.monotonic()
+                try:
+                    if hedge and self.hedge_quantile:
+                        result = await self._hedged(run, timeout)
+                    else:
+                        result = await asyncio.wait_for(run(timeout), timeout)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.record_failure(e, capped)
+                    delay = self._next_delay(e, attempt, retryable)
+                    if delay is None:
+                        raise
+                else:
+                    self.breaker.record(True)
+                    self.latencies.add(time.monotonic() - started)
+                    return result
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    async def _hold(stack, slot):
+        """Enters slot() on the stack, waiting no longer than the request's deadline."""
+        if slot is None:
+            return None
+        # Before the coroutine exists, so a passed deadline doesn't leave it unawaited
+        timeout = remaining()
+        try:
+            return await asyncio.wait_for(stack.enter_async_context(slot()), timeout)
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded("request deadline exceeded while waiting for a slot") from None
+
+    async def _hedged(self, attempt_fn, timeout):
+        started = time.monotonic()
+        first = asyncio.ensure_future(attempt_fn(timeout))
+        tasks = [first]
+        try:
+            threshold = self.latencies.quantile(self.hedge_quantile)
+            if threshold is not None and (timeout is None or threshold < timeout):
+                await asyncio.wait([first], timeout=threshold)
+                if not first.done():
+                    left = None if timeout is None else timeout - (time.monotonic() - started)
+                    tasks.append(asyncio.ensure_future(attempt_fn(left)))
+            deadline = None if timeout is None else started + timeout
+            pending = set(tasks)
+            error = None
+            while pending:
+                wait = None if deadline is None else max(deadline - time.monotonic(), 0)
+                done, pending = await asyncio.wait(pending, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    raise asyncio.TimeoutError()
+                for task in done:
+                    if task.exception() is None:
+                        if len(tasks) > 1:
+                            outbound_hedges_total.inc(provider=self.provider,
+                                                      winner="original" if task is first else "hedge")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stats(self):
+        p95 = self.latencies.quantile(0.95)
+        return dict(self.breaker.stats(), p95_ms=round(p95 * 1000, 1) if p95 is not None else None)
+
+
+class DeadlineMiddleware:
+    """
+    ASGI middleware giving each HTTP request a deadline: the client's
+    X-Request-Timeout header (seconds), else `default` (None or 0: none).
+    Outbound calls made for the request are capped to the time left.
+    """
+
+    def __init__(self, app, default=None):
+        self.app = app
+        self.default = default
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        seconds = self.default
+        header = dict(scope.get("headers") or []).get(b"x-request-timeout")
+        if header:
+            try:
+                seconds = float(header)
+            except ValueError:
+                pass
+        with deadline_scope(seconds):
+            await self.app(scope, receive, send)
@@ -1,221 +1,1703 @@
-import fitz  # PyMuPDF
 import os
+import json
+import time
+import asyncio
+import hashlib
+import mmap
+import multiprocessing
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from dotenv import load_dotenv
-import google.generativeai as genai
-from apify_client import ApifyClient
+
+try:
+    from .rate_limit import ConcurrencyLimiter
+    from .cache import make_cache, MemoryCache, sha256_hex, text_fingerprint, SingleFlightCache
+    from .ranking import rank_jobs
+    from .job_index import JobIndex, job_key
+    from .job_sources import (
+        JobSource, FixtureJobSource, SourceRegistry, Job, PartialResults, normalize_job, job_fingerprint
+    )
+    from .compaction import prepare_resume, estimate_tokens, PAGE_BREAK
+    from .streaming_json import ObjectStreamParser
+    from .analysis_jobs import make_job_store, QueueFull
+    from .telemetry import get_logger, counter, histogram, span, configure as configure_telemetry
+    from .lazy import Lazy, LazyModule, warm, status as lazy_status
+    from .resilience import RetryPolicy, CircuitBreaker, DeadlineExceeded, remaining
+    from . import skills
+except ImportError:
+    from rate_limit import ConcurrencyLimiter
+    from cache import make_cache, MemoryCache, sha256_hex, text_fingerprint, SingleFlightCache
+    from ranking import rank_jobs
+    from job_index import JobIndex, job_key
+    from job_sources import (
+        JobSource, FixtureJobSource, SourceRegistry, Job, PartialResults, normalize_job, job_fingerprint
+    )
+    from compaction import prepare_resume, estimate_tokens, PAGE_BREAK
+    from streaming_json import ObjectStreamParser
+    from analysis_jobs import make_job_store, QueueFull
+    from telemetry import get_logger, counter, histogram, span, configure as configure_telemetry
+    from lazy import Lazy, LazyModule, warm, status as lazy_status
+    from resilience import RetryPolicy, CircuitBreaker, DeadlineExceeded, remaining
+    import skills
 
 from pathlib import Path
 env_path = Path(__file__).parent / '.env'
 load_dotenv(dotenv_path=env_path)
 
+# Structured logs on stderr: LOG_FORMAT text or json; TRACING=1 also logs trace spans
+configure_telemetry(
+    level=os.getenv("LOG_LEVEL", "INFO"),
+    fmt=os.getenv("LOG_FORMAT", "text"),
+    tracing=os.getenv("TRACING", "0").lower() in ("1", "true", "yes"),
+)
+log = get_logger("services")
+
+# PDF upload and extraction limits
+PDF_MAX_BYTES = int(os.getenv("PDF_MAX_BYTES", str(10 * 1024 * 1024)))
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "50"))
+PDF_MAX_CHARS = int(os.getenv("PDF_MAX_CHARS", "100000"))
+# Documents with at least this many pages are extracted in a process pool
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "16"))
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "2"))
+
+# Heavy SDKs are imported on first use, keeping imports and cold starts fast.
+# PREWARM=1 loads them in the background as soon as a server starts (see warm_up).
+PREWARM = os.getenv("PREWARM", "0") == "1"
+# Imported as pymupdf: importing it as fitz prints a deprecation notice on stdout,
+# which would corrupt the MCP stdio stream
+pymupdf = LazyModule("pymupdf")
+
 # Initialize Gemini Client
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
+genai = LazyModule("google.generativeai", on_load=lambda m: m.configure(api_key=GEMINI_API_KEY) if GEMINI_API_KEY else None)
 # We don't need a persistent client object like OpenAI, but we can define the model
-model = genai.GenerativeModel('gemini-3-flash-preview') if GEMINI_API_KEY else None
+MODEL_NAME = 'gemini-3-flash-preview'
+gemini_model = Lazy("gemini_model", lambda: genai.GenerativeModel(MODEL_NAME) if GEMINI_API_KEY else None)
+
+# Process-wide limit on Gemini calls shared by the sync and async paths.
+# GEMINI_TOKENS_PER_MINUTE=0 disables the token bucket.
+gemini_limiter = ConcurrencyLimiter(
+    max_in_flight=int(os.getenv("GEMINI_MAX_CONCURRENCY", "16")),
+    tokens_per_minute=int(os.getenv("GEMINI_TOKENS_PER_MINUTE", "0")),
+)
+
+# Outbound calls: a Gemini attempt may take GEMINI_TIMEOUT seconds once it has a
+# limiter slot (less if the request's deadline is sooner); retryable errors (429, 5xx, timeouts) are
+# retried GEMINI_RETRIES times with jittered backoff. After BREAKER_FAILURES
+# consecutive failures a provider's calls fail fast for BREAKER_RESET_SECONDS.
+# GEMINI_HEDGE_QUANTILE (e.g. 0.95) sends a second request when a non-streamed
+# call runs past that quantile of recent latencies; 0 disables hedging.
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "60"))
+GEMINI_RETRIES = int(os.getenv("GEMINI_RETRIES", "2"))
+GEMINI_HEDGE_QUANTILE = float(os.getenv("GEMINI_HEDGE_QUANTILE", "0"))
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "30"))
+# Deadline of an HTTP request without an X-Request-Timeout header (seconds; 0: none)
+REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", "0"))
+gemini_policy = RetryPolicy(
+    "gemini",
+    timeout=GEMINI_TIMEOUT,
+    retries=GEMINI_RETRIES,
+    breaker=CircuitBreaker("gemini", failures=BREAKER_FAILURES, reset_after=BREAKER_RESET_SECONDS),
+    hedge_quantile=GEMINI_HEDGE_QUANTILE or None,
+)
+
+# USD per million tokens, used for the gemini_cost_usd_total metric
+GEMINI_INPUT_COST_PER_MTOK = float(os.getenv("GEMINI_INPUT_COST_PER_MTOK", "0.50"))
+GEMINI_OUTPUT_COST_PER_MTOK = float(os.getenv("GEMINI_OUTPUT_COST_PER_MTOK", "3.00"))
+# Prompt tokens served from Gemini's context cache (implicit prefix hits or cached contexts)
+GEMINI_CACHED_INPUT_COST_PER_MTOK = float(os.getenv("GEMINI_CACHED_INPUT_COST_PER_MTOK", "0.05"))
+
+# GEMINI_CONTEXT_CACHE=1 registers each resume once as Gemini cached context,
+# which the analysis steps then reference instead of resending it. Resumes
+# shorter than the minimum (estimated tokens) are sent inline.
+GEMINI_CONTEXT_CACHE = os.getenv("GEMINI_CONTEXT_CACHE", "0") == "1"
+GEMINI_CONTEXT_CACHE_TTL = int(os.getenv("GEMINI_CONTEXT_CACHE_TTL", "600"))
+GEMINI_CONTEXT_CACHE_MIN_TOKENS = int(os.getenv("GEMINI_CONTEXT_CACHE_MIN_TOKENS", "1024"))
+# Forgotten a minute before Gemini expires them, so no request references an expired context
+resume_contexts = SingleFlightCache(ttl=max(GEMINI_CONTEXT_CACHE_TTL - 60, 0), stale_ttl=0, max_entries=256)
+# Resumes whose context could not be created are sent inline for this many
+# seconds, instead of every later step trying (and waiting on) the create again
+GEMINI_CONTEXT_FAILURE_TTL = int(os.getenv("GEMINI_CONTEXT_FAILURE_TTL", "300"))
+resume_context_failures = MemoryCache(ttl=GEMINI_CONTEXT_FAILURE_TTL, max_bytes=1024 * 1024)
+
+# Streamed output is sent to clients in batches of at least this many
+# characters, or whatever has arrived after this many milliseconds
+DELTA_FLUSH_CHARS = int(os.getenv("DELTA_FLUSH_CHARS", "80"))
+DELTA_FLUSH_MS = int(os.getenv("DELTA_FLUSH_MS", "100"))
+
+# Cache for extracted resume text and analysis results, shared by the API and MCP tools.
+# Backend: memory (default), sqlite (survives restarts) or none.
+analysis_cache = make_cache(
+    os.getenv("ANALYSIS_CACHE_BACKEND", "memory"),
+    path=os.getenv("ANALYSIS_CACHE_PATH"),
+    ttl=int(os.getenv("ANALYSIS_CACHE_TTL", str(7 * 24 * 3600))),
+    max_bytes=int(os.getenv("ANALYSIS_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+)
+# Bump when analyzer parsing or token limits change so old results are not served
+ANALYSIS_CACHE_VERSION = "1"
+
+# Extracted resume text by resume_id, which resume_id (HTTP) and resume:// (MCP)
+# handles refer to. Always kept in memory, whatever the analysis cache backend.
+resume_texts = MemoryCache(
+    ttl=int(os.getenv("RESUME_TEXT_TTL", str(24 * 3600))),
+    max_bytes=int(os.getenv("RESUME_TEXT_MAX_BYTES", str(32 * 1024 * 1024))),
+)
+
+# Resumes longer than this (estimated tokens) are compacted section by section
+# before being put into prompts
+RESUME_TOKEN_BUDGET = int(os.getenv("RESUME_TOKEN_BUDGET", "3000"))
+# Updated from worker threads and the event loop, so only under _compaction_lock
+compaction_stats = {"resumes": 0, "original_tokens": 0, "compacted_tokens": 0, "tokens_saved": 0}
+_compaction_lock = threading.Lock()
+
+# Background analysis jobs (POST /analyze-resume with background=true).
+# Backend: memory (default) or sqlite, which survives restarts and can be
+# shared with standalone workers (python -m app.worker).
+analysis_job_store = make_job_store(
+    os.getenv("JOBS_BACKEND", "memory"),
+    path=os.getenv("JOBS_DB_PATH"),
+    max_queued=int(os.getenv("JOBS_MAX_QUEUED", "100")),
+    lease=int(os.getenv("JOBS_LEASE_SECONDS", "600")),
+)
+JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", "2"))
+JOBS_MAX_ATTEMPTS = int(os.getenv("JOBS_MAX_ATTEMPTS", "3"))
+JOBS_UPLOAD_DIR = os.getenv("JOBS_UPLOAD_DIR", str(Path(__file__).parent / "job_uploads"))
+
+# Bulk analysis (POST /analyze-batch and python -m app.batch): documents
+# analyzed at once, documents and bytes accepted per request, and where
+# per-batch checkpoints are kept
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_MAX_DOCS = int(os.getenv("BATCH_MAX_DOCS", "500"))
+BATCH_MAX_BYTES = int(os.getenv("BATCH_MAX_BYTES", str(200 * 1024 * 1024)))
+BATCH_CHECKPOINT_DIR = os.getenv("BATCH_CHECKPOINT_DIR", str(Path(__file__).parent / "batch_checkpoints"))
 
 # Initialize Apify Client
 APIFY_API_TOKEN = os.getenv("APIFY_API_TOKEN")
-apify_client = ApifyClient(APIFY_API_TOKEN) if APIFY_API_TOKEN else None
-
-def extract_text_from_pdf(pdf_content):
-    """Extracts text from PDF bytes."""
-    doc = fitz.open(stream=pdf_content, filetype="pdf")
-    text = ""
-    for page in doc:
-        text += page.get_text()
-    return text
+apify_sdk = LazyModule("apify_client")
+apify_client = Lazy("apify_client", lambda: apify_sdk.ApifyClient(APIFY_API_TOKEN) if APIFY_API_TOKEN else None)
 
-def ask_gemini(prompt, max_tokens=500):
-    """Sends a prompt to Gemini and returns the response."""
-    if not model:
-        return "Gemini API Key is missing."
-    
+# Job search results, keyed on (title, location, rows). Entries are fresh for
+# JOB_CACHE_TTL seconds and served stale (while refreshing) for JOB_CACHE_STALE_TTL more.
+job_search_cache = SingleFlightCache(
+    ttl=int(os.getenv("JOB_CACHE_TTL", str(30 * 60))),
+    stale_ttl=int(os.getenv("JOB_CACHE_STALE_TTL", str(6 * 3600))),
+    max_entries=int(os.getenv("JOB_CACHE_MAX_ENTRIES", "1024")),
+)
+
+# Local store of every scraped job, so searches can be answered without Apify.
+# Jobs not seen again for JOB_INDEX_MAX_AGE seconds are purged.
+job_index = JobIndex(
+    os.getenv("JOB_INDEX_PATH", str(Path(__file__).parent / "job_index.db")),
+    max_age=int(os.getenv("JOB_INDEX_MAX_AGE", str(14 * 24 * 3600))),
+)
+# Index answers only count if seen within this many seconds
+JOB_INDEX_FRESH_SECONDS = int(os.getenv("JOB_INDEX_FRESH_SECONDS", str(24 * 3600)))
+
+# Multi-keyword job search fan-out
+JOB_SEARCH_MAX_KEYWORDS = int(os.getenv("JOB_SEARCH_MAX_KEYWORDS", "2"))
+JOB_SEARCH_CONCURRENCY = int(os.getenv("JOB_SEARCH_CONCURRENCY", "4"))
+JOB_SEARCH_TIMEOUT = float(os.getenv("JOB_SEARCH_TIMEOUT", "120"))
+# When ranking against a resume, fetch this many candidates per keyword
+JOB_RANK_CANDIDATES = int(os.getenv("JOB_RANK_CANDIDATES", "25"))
+# Seconds between dataset reads while an Apify run is in progress
+APIFY_POLL_INTERVAL = float(os.getenv("APIFY_POLL_INTERVAL", "2"))
+
+# Metrics exposed at GET /metrics
+pdf_extract_seconds = histogram("pdf_extract_seconds", "PDF text extraction time.", ("parallel",))
+pdf_pages_total = counter("pdf_pages_total", "PDF pages read.")
+gemini_request_seconds = histogram(
+    "gemini_request_seconds", "Gemini request latency, including streaming.", ("analyzer", "mode")
+)
+gemini_first_token_seconds = histogram(
+    "gemini_first_token_seconds", "Time to the first streamed Gemini chunk.", ("analyzer",)
+)
+gemini_requests_total = counter(
+    "gemini_requests_total", "Gemini requests by finish reason (stop, max_tokens, blocked, error).",
+    ("analyzer", "finish_reason"),
+)
+gemini_prompt_tokens_total = counter("gemini_prompt_tokens_total", "Gemini prompt tokens.", ("analyzer",))
+gemini_output_tokens_total = counter("gemini_output_tokens_total", "Gemini output tokens.", ("analyzer",))
+gemini_cached_tokens_total = counter(
+    "gemini_cached_tokens_total", "Gemini prompt tokens served from the context cache.", ("analyzer",)
+)
+gemini_cost_usd_total = counter("gemini_cost_usd_total", "Estimated Gemini spend in USD.", ("analyzer",))
+apify_run_seconds = histogram(
+    "apify_run_seconds", "Apify actor run time, by outcome (ok, aborted, timeout, error).", ("actor", "outcome")
+)
+apify_dataset_seconds = histogram("apify_dataset_seconds", "Apify dataset read time (per poll).", ("actor",))
+apify_first_item_seconds = histogram(
+    "apify_first_item_seconds", "Time from starting an Apify run to its first dataset item.", ("actor",)
+)
+apify_items_total = counter("apify_items_total", "Items fetched from Apify datasets.", ("actor",))
+analysis_steps_total = counter(
+    "analysis_steps_total", "Analysis steps served, by source (cache, model or single_shot).", ("analyzer", "source")
+)
+
+class PDFTooLarge(ValueError):
+    """Raised when an upload exceeds PDF_MAX_BYTES."""
+
+async def spool_upload(upload, max_bytes=None, chunk_size=1024 * 1024):
+    """
+    Copies an uploaded file to a temp file chunk by chunk, hashing as it goes,
+    so the whole upload is never held in memory.
+    Returns (path, sha256 hex digest). The caller deletes the file.
+    """
+    max_bytes = max_bytes or PDF_MAX_BYTES
+    digest = hashlib.sha256()
+    size = 0
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+        try:
+            while chunk := await upload.read(chunk_size):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise PDFTooLarge(f"PDF exceeds the {max_bytes // (1024 * 1024)} MB limit.")
+                digest.update(chunk)
+                tmp.write(chunk)
+        except BaseException:
+            tmp.close()
+            os.unlink(tmp.name)
+            raise
+    return tmp.name, digest.hexdigest()
+
+def _open_pdf(source):
+    if isinstance(source, str):
+        return pymupdf.open(source, filetype="pdf")
+    return pymupdf.open(stream=source, filetype="pdf")
+
+def _extract_pages(source, start, stop, max_chars):
+    """Text of pages [start, stop), stopping early once max_chars have been read."""
+    pages = []
+    total = 0
+    with _open_pdf(source) as doc:
+        for number in range(start, stop):
+            text = doc.load_page(number).get_text()
+            pages.append(text)
+            total += len(text)
+            if total >= max_chars:
+                break
+    return pages
+
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+
+def _get_pdf_pool():
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            # Workers come from a fork server (spawned where there is none) rather than
+            # a fork of this multi-threaded process, whose held locks (e.g. a lazy
+            # import half done in another thread) would deadlock them
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _pdf_pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=context)
+        return _pdf_pool
+
+def _warm_pdf_worker():
+    pymupdf.get()
+
+def warm_up():
+    """
+    Imports the SDKs, builds the clients and starts the PDF workers now rather
+    than on the first request that needs them. Returns {component: error or None}.
+    """
+    errors = warm()
     try:
-        # Configure safety settings to be less restrictive for resume analysis
-        safety_settings = [
-            {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
-            {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
-            {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
-            {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
+        pool = _get_pdf_pool()
+        for future in [pool.submit(_warm_pdf_worker) for _ in range(PDF_WORKERS)]:
+            future.result()
+        errors["pdf_pool"] = None
+    except Exception as e:
+        errors["pdf_pool"] = str(e)
+    log.info("warmed_up", errors={k: v for k, v in errors.items() if v})
+    return errors
+
+def readiness():
+    """Whether every lazy component is loaded, and each one's load status."""
+    components = lazy_status()
+    components["pdf_pool"] = {"loaded": _pdf_pool is not None}
+    return all(c["loaded"] and not c.get("error") for c in components.values()), components
+
+def extract_pdf(source, max_pages=None, max_chars=None, parallel=True):
+    """
+    Extracts text from PDF bytes or a PDF file path, within a page and character budget.
+    Large documents given by path are split into page ranges read in a process pool
+    (unless parallel=False, e.g. when already running inside that pool).
+    Returns (text, info) where info has page counts, truncation and per-stage timings (ms).
+    """
+    max_pages = max_pages or PDF_MAX_PAGES
+    max_chars = max_chars or PDF_MAX_CHARS
+    started = time.perf_counter()
+    
+    with _open_pdf(source) as doc:
+        if doc.needs_pass:
+            raise ValueError("PDF is password protected.")
+        page_count = doc.page_count
+    pages_to_read = min(page_count, max_pages)
+    opened = time.perf_counter()
+    
+    parallel = parallel and isinstance(source, str) and pages_to_read >= PDF_PARALLEL_MIN_PAGES
+    if parallel:
+        step = -(-pages_to_read // (PDF_WORKERS * 2))
+        futures = [
+            _get_pdf_pool().submit(_extract_pages, source, start, min(start + step, pages_to_read), max_chars)
+            for start in range(0, pages_to_read, step)
         ]
-        
-        response = model.generate_content(
-            prompt,
-            generation_config=genai.types.GenerationConfig(
-                max_output_tokens=max_tokens,
-                temperature=0.5,
-            ),
-            safety_settings=safety_settings
+        pages = [page for future in futures for page in future.result()]
+    else:
+        pages = _extract_pages(source, 0, pages_to_read, max_chars)
+    extracted = time.perf_counter()
+    
+    # Join once instead of growing a string page by page; page breaks let
+    # compaction spot running headers and footers
+    text = PAGE_BREAK.join(pages)
+    truncated = pages_to_read < page_count or len(text) > max_chars
+    text = text[:max_chars]
+    done = time.perf_counter()
+    
+    info = {
+        "pages": page_count,
+        "pages_read": len(pages),
+        "chars": len(text),
+        "truncated": truncated,
+        "timings_ms": {
+            "open": round((opened - started) * 1000, 1),
+            "extract": round((extracted - opened) * 1000, 1),
+            "join": round((done - extracted) * 1000, 1),
+        },
+    }
+    pdf_extract_seconds.observe(done - started, parallel=str(parallel).lower())
+    pdf_pages_total.inc(len(pages))
+    log.info("pdf_extracted", pages=page_count, pages_read=len(pages), chars=len(text),
+             truncated=truncated, **{f"{stage}_ms": ms for stage, ms in info["timings_ms"].items()})
+    return text, info
+
+def extract_text_from_pdf(pdf_content, parallel=True):
+    """Extracts text from PDF bytes (or a file path)."""
+    return extract_pdf(pdf_content, parallel=parallel)[0]
+
+def resume_id_for(pdf_content):
+    """Content id of an uploaded resume; clients pass it back to reference the resume."""
+    return sha256_hex(pdf_content)
+
+def resume_id_for_file(path):
+    """resume_id_for of a PDF file, hashed through a memory map instead of reading it into memory."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return resume_id_for(b"")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return resume_id_for(data)
+
+def cached_resume_text(resume_id):
+    """Extracted text of a previously uploaded resume, or None if unknown/expired."""
+    text = resume_texts.get(resume_id)
+    if text is None:
+        # E.g. parsed before a restart, with the sqlite analysis cache
+        text = analysis_cache.get(f"pdf:{resume_id}")
+        if text is not None:
+            resume_texts.set(resume_id, text)
+    return text
+
+def _store_resume_text(resume_id, text):
+    resume_texts.set(resume_id, text)
+    analysis_cache.set(f"pdf:{resume_id}", text)
+
+def extract_resume_text(pdf_content, resume_id=None):
+    """
+    Extracts text from PDF bytes or a file path, reusing the result for
+    byte-identical uploads. Pass resume_id when the content hash is already known.
+    """
+    if resume_id is None:
+        # A path is keyed by the file's content, so a reused path with new content isn't served stale text
+        resume_id = resume_id_for_file(pdf_content) if isinstance(pdf_content, str) else resume_id_for(pdf_content)
+    text = cached_resume_text(resume_id)
+    if text is None:
+        text = extract_text_from_pdf(pdf_content)
+        _store_resume_text(resume_id, text)
+    return text
+
+async def extract_resume_text_async(pdf_content, resume_id=None):
+    """
+    Async variant of extract_resume_text. Extraction runs in the PDF process
+    pool, so at most PDF_WORKERS documents are parsed at once and the
+    event loop (and the GIL) stay free meanwhile.
+    """
+    if resume_id is None:
+        if isinstance(pdf_content, str):
+            resume_id = await asyncio.to_thread(resume_id_for_file, pdf_content)
+        else:
+            resume_id = resume_id_for(pdf_content)
+    text = cached_resume_text(resume_id)
+    if text is None:
+        # Whole documents go to the pool; parallel=False stops them splitting again inside it
+        loop = asyncio.get_running_loop()
+        text = await loop.run_in_executor(_get_pdf_pool(), extract_text_from_pdf, pdf_content, False)
+        _store_resume_text(resume_id, text)
+    return text
+
+# Fallback answers returned instead of raising; these are never cached
+GEMINI_MISSING = "Gemini API Key is missing."
+GEMINI_BLOCKED = "Content could not be generated. Please try again."
+GEMINI_UNAVAILABLE = "Analysis temporarily unavailable. Please try again."
+
+# Configure safety settings to be less restrictive for resume analysis
+SAFETY_SETTINGS = [
+    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
+]
+
+def _generation_config(max_tokens, schema=None):
+    """Generation settings; with a response schema the answer is JSON constrained to it."""
+    if schema is None:
+        return genai.types.GenerationConfig(
+            max_output_tokens=max_tokens,
+            temperature=0.5,
         )
+    return genai.types.GenerationConfig(
+        max_output_tokens=max_tokens,
+        temperature=0.5,
+        response_mime_type="application/json",
+        response_schema=schema,
+    )
+
+def _response_text(response):
+    """Pulls the answer text out of a Gemini response, handling blocked/truncated candidates."""
+    # Check if response has valid candidates
+    if response.candidates and len(response.candidates) > 0:
+        candidate = response.candidates[0]
         
-        # Check if response has valid candidates
-        if response.candidates and len(response.candidates) > 0:
-            candidate = response.candidates[0]
-            
-            # Check finish reason
-            # 1 = STOP (normal), 2 = MAX_TOKENS, 3 = SAFETY, 4 = RECITATION, 5 = OTHER
-            if candidate.finish_reason == 2:
-                # MAX_TOKENS - content was truncated
-                if candidate.content and candidate.content.parts:
-                    return candidate.content.parts[0].text + "..."
-            elif candidate.finish_reason in [3, 4, 5]:
-                # SAFETY, RECITATION, or OTHER block
-                return "Content could not be generated. Please try again."
-            
-            # Normal response
+        # Check finish reason
+        # 1 = STOP (normal), 2 = MAX_TOKENS, 3 = SAFETY, 4 = RECITATION, 5 = OTHER
+        if candidate.finish_reason == 2:
+            # MAX_TOKENS - content was truncated
             if candidate.content and candidate.content.parts:
-                return candidate.content.parts[0].text
-        
-        # Fallback - try response.text
-        return response.text
+                return candidate.content.parts[0].text + "..."
+        elif candidate.finish_reason in [3, 4, 5]:
+            # SAFETY, RECITATION, or OTHER block
+            return GEMINI_BLOCKED
         
+        # Normal response
+        if candidate.content and candidate.content.parts:
+            return candidate.content.parts[0].text
+    
+    # Fallback - try response.text
+    return response.text
+
+def _unused_tokens(response, max_tokens):
+    """Output tokens reserved but not spent, returned to the limiter's bucket."""
+    usage = getattr(response, "usage_metadata", None)
+    used = getattr(usage, "candidates_token_count", None) if usage else None
+    return max(max_tokens - used, 0) if used is not None else 0
+
+FINISH_REASONS = {1: "stop", 2: "max_tokens", 3: "blocked", 4: "blocked", 5: "blocked"}
+
+def _record_gemini(analyzer, mode, started, response=None, error=None):
+    """Records latency, tokens, estimated cost and finish reason of one Gemini request."""
+    latency = time.perf_counter() - started
+    gemini_request_seconds.observe(latency, analyzer=analyzer, mode=mode)
+    if error is not None:
+        gemini_requests_total.inc(analyzer=analyzer, finish_reason="error")
+        log.error("gemini_error", analyzer=analyzer, mode=mode, latency_ms=round(latency * 1000), error=str(error))
+        return
+    candidates = getattr(response, "candidates", None)
+    finish_reason = FINISH_REASONS.get(getattr(candidates[0], "finish_reason", None), "other") if candidates else "other"
+    usage = getattr(response, "usage_metadata", None)
+    prompt_tokens = getattr(usage, "prompt_token_count", 0) or 0
+    cached_tokens = getattr(usage, "cached_content_token_count", 0) or 0
+    output_tokens = getattr(usage, "candidates_token_count", 0) or 0
+    gemini_requests_total.inc(analyzer=analyzer, finish_reason=finish_reason)
+    gemini_prompt_tokens_total.inc(prompt_tokens, analyzer=analyzer)
+    gemini_cached_tokens_total.inc(cached_tokens, analyzer=analyzer)
+    gemini_output_tokens_total.inc(output_tokens, analyzer=analyzer)
+    gemini_cost_usd_total.inc(
+        ((prompt_tokens - cached_tokens) * GEMINI_INPUT_COST_PER_MTOK + cached_tokens * GEMINI_CACHED_INPUT_COST_PER_MTOK
+         + output_tokens * GEMINI_OUTPUT_COST_PER_MTOK) / 1e6,
+        analyzer=analyzer,
+    )
+    log.info("gemini_call", analyzer=analyzer, mode=mode, latency_ms=round(latency * 1000),
+             prompt_tokens=prompt_tokens, cached_tokens=cached_tokens, output_tokens=output_tokens,
+             finish_reason=finish_reason)
+
+def _request_options(timeout):
+    return {"timeout": timeout} if timeout else None
+
+def ask_gemini(prompt, max_tokens=500, analyzer="adhoc", schema=None):
+    """
+    Sends a prompt to Gemini and returns the response (JSON text when a response schema is given).
+    Retryable failures are retried through gemini_policy before giving up.
+    """
+    model = gemini_model.get()
+    if not model:
+        return GEMINI_MISSING
+
+    tokens = estimate_tokens(prompt) + max_tokens
+
+    def attempt(timeout, usage):
+        started = time.perf_counter()
+        try:
+            with span("gemini", analyzer=analyzer):
+                response = model.generate_content(
+                    prompt,
+                    generation_config=_generation_config(max_tokens, schema),
+                    safety_settings=SAFETY_SETTINGS,
+                    request_options=_request_options(timeout)
+                )
+            usage["refund"] = _unused_tokens(response, max_tokens)
+            _record_gemini(analyzer, "sync", started, response)
+            return _response_text(response)
+        except Exception as e:
+            _record_gemini(analyzer, "sync", started, error=e)
+            raise
+
+    try:
+        # The limiter slot is held around each attempt, outside its timeout
+        return gemini_policy.call(attempt, slot=lambda: gemini_limiter.slot(tokens))
+    except Exception:
+        return GEMINI_UNAVAILABLE
+
+class DeltaCoalescer:
+    """Batches streamed text into fewer, larger pieces: flushes every min_chars or interval seconds."""
+
+    def __init__(self, emit, min_chars=None, interval=None):
+        self.emit = emit
+        self.min_chars = min_chars or DELTA_FLUSH_CHARS
+        self.interval = (interval or DELTA_FLUSH_MS) / 1000
+        self._parts = []
+        self._size = 0
+        self._flushed_at = time.monotonic()
+
+    def add(self, text):
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size >= self.min_chars or time.monotonic() - self._flushed_at >= self.interval:
+            self.flush()
+
+    def flush(self):
+        if self._parts:
+            self.emit("".join(self._parts))
+        self._parts = []
+        self._size = 0
+        self._flushed_at = time.monotonic()
+
+def _streamed_text(response, text):
+    """Final answer of a streamed response, with the same finish-reason handling as _response_text."""
+    candidate = response.candidates[0] if response.candidates else None
+    if candidate is not None:
+        if candidate.finish_reason == 2:
+            return text + "..."
+        elif candidate.finish_reason in [3, 4, 5]:
+            return GEMINI_BLOCKED
+    return text
+
+async def ask_gemini_async(prompt, max_tokens=500, on_delta=None, analyzer="adhoc", schema=None, client=None):
+    """
+    Async counterpart of ask_gemini; waits for a limiter slot without blocking the event loop.
+    With on_delta, the answer is streamed and on_delta(text) is called with
+    coalesced pieces as they arrive; the full answer is still returned.
+    client replaces the default model, e.g. with one bound to a cached context.
+    Retries (and hedging, for non-streamed calls) go through gemini_policy; a
+    stream is only retried if it failed before sending any output. Each attempt
+    (with its hedge) holds one limiter slot, and only the request itself is timed.
+    """
+    model = await gemini_model.get_async()
+    if not model:
+        return GEMINI_MISSING
+    client = client or model
+    # The SDK may not be imported yet when the model was injected (e.g. by the benchmarks)
+    await genai.get_async()
+    config = _generation_config(max_tokens, schema)
+    tokens = estimate_tokens(prompt) + max_tokens
+    
+    mode = "async" if on_delta is None else "stream"
+    emitted = False
+
+    def emit(text):
+        nonlocal emitted
+        emitted = True
+        on_delta(text)
+
+    async def attempt(timeout, usage):
+        started = time.perf_counter()
+        try:
+            with span("gemini", analyzer=analyzer):
+                response = await client.generate_content_async(
+                    prompt,
+                    generation_config=config,
+                    safety_settings=SAFETY_SETTINGS,
+                    stream=on_delta is not None,
+                    request_options=_request_options(timeout)
+                )
+                if on_delta is None:
+                    usage["refund"] = _unused_tokens(response, max_tokens)
+                    _record_gemini(analyzer, mode, started, response)
+                    return _response_text(response)
+                
+                parts = []
+                coalescer = DeltaCoalescer(emit)
+                async for chunk in response:
+                    text = _chunk_text(chunk)
+                    if text:
+                        if not parts:
+                            gemini_first_token_seconds.observe(time.perf_counter() - started, analyzer=analyzer)
+                        parts.append(text)
+                        coalescer.add(text)
+                coalescer.flush()
+                usage["refund"] = _unused_tokens(response, max_tokens)
+            _record_gemini(analyzer, mode, started, response)
+            return _streamed_text(response, "".join(parts))
+        except Exception as e:
+            _record_gemini(analyzer, mode, started, error=e)
+            raise
+
+    try:
+        return await gemini_policy.call_async(attempt, retryable=lambda e: not emitted, hedge=on_delta is None,
+                                              slot=lambda: gemini_limiter.slot_async(tokens))
+    except Exception:
+        return GEMINI_UNAVAILABLE
+
+def _chunk_text(chunk):
+    try:
+        return chunk.text
+    except ValueError:
+        # Chunks without text parts (e.g. the final one carrying only the finish reason)
+        return ""
+
+async def stream_gemini_json(prompt, schema, max_tokens=500, client=None):
+    """
+    Streams a JSON answer constrained to the given response schema, yielding
+    text chunks as Gemini produces them. Raises on errors (without retrying:
+    callers fall back to per-step prompts), and at once while Gemini's circuit is open.
+    """
+    client = client or await gemini_model.get_async()
+    await genai.get_async()
+    config = _generation_config(max_tokens, schema)
+    gemini_policy.breaker.allow()
+    async with gemini_limiter.slot_async(estimate_tokens(prompt) + max_tokens) as usage:
+        # Timed from here, so waiting for the slot doesn't shorten the request
+        timeout, capped = gemini_policy.attempt_timeout()
+        started = time.perf_counter()
+        first = True
+        try:
+            response = await client.generate_content_async(
+                prompt,
+                generation_config=config,
+                safety_settings=SAFETY_SETTINGS,
+                stream=True,
+                request_options=_request_options(timeout)
+            )
+            async for chunk in response:
+                text = _chunk_text(chunk)
+                if text:
+                    if first:
+                        gemini_first_token_seconds.observe(time.perf_counter() - started, analyzer="single_shot")
+                        first = False
+                    yield text
+        except Exception as e:
+            _record_gemini("single_shot", "stream_json", started, error=e)
+            gemini_policy.record_failure(e, capped)
+            raise
+        gemini_policy.breaker.record(True)
+        usage["refund"] = _unused_tokens(response, max_tokens)
+        _record_gemini("single_shot", "stream_json", started, response)
+
+LINKEDIN_ACTOR_ID = "BHzefUZlZRKWxkTck"
+NAUKRI_ACTOR_ID = "alpcnRV9YI9lYVPWk"
+# Run states in which an actor may still add items to its dataset
+APIFY_ACTIVE_STATES = ("READY", "RUNNING")
+
+def stream_actor_items(actor_id, run_input, rows, timeout=None, poll_interval=None, cancel=None, actor="linkedin"):
+    """
+    Starts an Apify actor and yields items as they land in its dataset,
+    while the run is still going. Stops after `rows` items (or `timeout`
+    seconds, or once the `cancel` threading.Event is set) and aborts the run
+    if it is still active, so no more results are scraped and paid for than
+    are used. `actor` labels the metrics. Raises on failure, with
+    TimeoutError when the timeout passes before any item arrived, and with
+    PartialResults (after yielding them) when it passes after some did.
+    """
+    client = apify_client.get()
+    if not client:
+        raise RuntimeError("APIFY_API_TOKEN missing")
+    timeout = timeout or JOB_SEARCH_TIMEOUT
+    poll_interval = poll_interval or APIFY_POLL_INTERVAL
+    
+    started = time.perf_counter()
+    deadline = started + timeout
+    outcome = "error"
+    fetched = 0
+    active = False
+    try:
+        run = client.actor(actor_id).start(run_input=run_input)
+        active = True
+        dataset = client.dataset(run["defaultDatasetId"])
+        run_client = client.run(run["id"])
+        while True:
+            with apify_dataset_seconds.time(actor=actor):
+                items = dataset.list_items(offset=fetched, limit=rows - fetched).items
+            if items and not fetched:
+                apify_first_item_seconds.observe(time.perf_counter() - started, actor=actor)
+            for item in items:
+                fetched += 1
+                yield item
+            if fetched >= rows or not active or (cancel and cancel.is_set()):
+                break
+            if time.perf_counter() >= deadline:
+                outcome = "timeout"
+                log.warning("apify_run_timeout", actor=actor, timeout_s=timeout, items=fetched)
+                if not fetched:
+                    raise TimeoutError(f"No {actor} results within {timeout:g}s")
+                raise PartialResults(f"Only {fetched} of {rows} {actor} results within {timeout:g}s")
+            # Once the run has finished, one more read picks up its last items
+            status = run_client.get()["status"]
+            active = status in APIFY_ACTIVE_STATES
+            if active:
+                time.sleep(poll_interval)
+            elif status != "SUCCEEDED" and not fetched:
+                raise RuntimeError(f"Apify run {run['id']} ended with status {status}")
+        outcome = "ok"
+    except GeneratorExit:
+        # The consumer has what it needs
+        outcome = "ok"
+        raise
+    finally:
+        if active:
+            # Enough rows, a timeout, or the consumer stopped early
+            try:
+                stopped = client.run(run["id"]).abort() or {}
+                if outcome == "ok" and stopped.get("status") in ("ABORTING", "ABORTED"):
+                    outcome = "aborted"
+            except Exception as e:
+                log.warning("apify_abort_failed", run_id=run["id"], error=str(e))
+        apify_items_total.inc(fetched, actor=actor)
+        apify_run_seconds.observe(time.perf_counter() - started, actor=actor, outcome=outcome)
+
+def stream_linkedin_jobs(search_query, location="Türkiye", rows=10, timeout=None, poll_interval=None, cancel=None):
+    """Raw LinkedIn jobs from the Apify actor, yielded as they are scraped (see stream_actor_items)."""
+    run_input = {
+        "title": search_query,
+        "location": location,
+        "rows": rows,
+        "proxy": {
+            "useApifyProxy": True,
+            "apifyProxyGroups": ["RESIDENTIAL"],
+        }
+    }
+    return stream_actor_items(LINKEDIN_ACTOR_ID, run_input, rows, timeout, poll_interval, cancel, actor="linkedin")
+
+def stream_naukri_jobs(search_query, location="", rows=10, timeout=None, poll_interval=None, cancel=None):
+    """Raw Naukri jobs from the Apify actor. The actor searches India-wide; location is not used."""
+    run_input = {
+        "keyword": search_query,
+        "maxJobs": rows,
+        "freshness": "all",
+        "sortBy": "relevance",
+        "experience": "all",
+    }
+    return stream_actor_items(NAUKRI_ACTOR_ID, run_input, rows, timeout, poll_interval, cancel, actor="naukri")
+
+def _source_setting(name, setting, default):
+    return os.getenv(f"JOB_SOURCE_{name.upper()}_{setting}", default)
+
+def _make_source(name, fetch=None, cls=JobSource, cost_per_job="0.001", **kwargs):
+    """A JobSource configured from JOB_SOURCE_<NAME>_TIMEOUT/_CONCURRENCY/_BUDGET_USD/_COST_PER_JOB."""
+    return cls(
+        name,
+        fetch=fetch,
+        timeout=float(_source_setting(name, "TIMEOUT", str(JOB_SEARCH_TIMEOUT))),
+        concurrency=int(_source_setting(name, "CONCURRENCY", "16")),
+        budget=float(_source_setting(name, "BUDGET_USD", "0")),
+        cost_per_job=float(_source_setting(name, "COST_PER_JOB", cost_per_job)),
+        breaker=CircuitBreaker(name, failures=BREAKER_FAILURES, reset_after=BREAKER_RESET_SECONDS),
+        **kwargs,
+    )
+
+# Job providers. JOB_SOURCES lists the ones searched by default; each has its
+# own timeout, concurrency limit and daily budget (JOB_SOURCE_<NAME>_*).
+job_sources = SourceRegistry()
+JOB_SOURCES = os.getenv("JOB_SOURCES", "linkedin").split(",")
+job_sources.register(_make_source("linkedin", stream_linkedin_jobs), enabled="linkedin" in JOB_SOURCES)
+job_sources.register(_make_source("naukri", stream_naukri_jobs, fields={"postedAt": ("createdDate", "footerPlaceholderLabel")}),
+                     enabled="naukri" in JOB_SOURCES)
+if os.getenv("JOB_SOURCE_FIXTURE_PATH"):
+    job_sources.register(_make_source("fixture", cls=FixtureJobSource, cost_per_job="0", path=os.getenv("JOB_SOURCE_FIXTURE_PATH")),
+                         enabled="fixture" in JOB_SOURCES)
+# Seconds a multi-source search waits before returning whatever has arrived
+JOB_SEARCH_DEADLINE = float(os.getenv("JOB_SEARCH_DEADLINE", str(JOB_SEARCH_TIMEOUT)))
+# Cached and returned jobs carry this much of their description; the full
+# posting is kept in the job index and served by GET /jobs/{id}
+JOB_DESCRIPTION_PREVIEW_CHARS = int(os.getenv("JOB_DESCRIPTION_PREVIEW_CHARS", "300"))
+
+def compact_job(job):
+    return Job.from_dict(job, JOB_DESCRIPTION_PREVIEW_CHARS)
+
+def _search_and_index(source, search_query, location, rows):
+    """
+    Searches one source, indexes the full postings and returns them as compact
+    Jobs. A search that timed out raises PartialResults with the compact jobs
+    it got, which are not indexed.
+    """
+    started = time.perf_counter()
+    try:
+        with span("job_source", source=source.name, query=search_query, location=location, rows=rows):
+            jobs = source.search(search_query, location, rows)
+    except PartialResults as e:
+        log.warning("job_source_partial", source=source.name, query=search_query, location=location, rows=rows,
+                    jobs=len(e.jobs), run_ms=round((time.perf_counter() - started) * 1000))
+        raise PartialResults(str(e), [compact_job(job) for job in e.jobs]) from None
+    
+    if len(jobs) == 0:
+        # Usually a query too specific / full of jargon, or a too restrictive location
+        log.warning("job_source_no_jobs", source=source.name, query=search_query, location=location, rows=rows)
+    else:
+        log.info("job_source_searched", source=source.name, query=search_query, location=location, rows=rows,
+                 jobs=len(jobs), run_ms=round((time.perf_counter() - started) * 1000))
+        _index_jobs(jobs, source.name)
+    return [compact_job(job) for job in jobs]
+
+def _index_jobs(jobs, source):
+    try:
+        job_index.ingest(jobs, source=source)
     except Exception as e:
-        print(f"Gemini error: {str(e)}")
-        return f"Analysis temporarily unavailable. Please try again."
+        # The index is an optimization; never fail a search because of it
+        log.warning("job_index_ingest_failed", error=str(e))
 
-def fetch_linkedin_jobs(search_query, location="Türkiye", rows=10):
-    """Fetches jobs from LinkedIn via Apify."""
-    if not apify_client:
-        print("WARNING: Apify client not initialized - APIFY_API_TOKEN missing")
+def job_search_key(search_query, location, rows, source="linkedin"):
+    """Normalized cache key for a job search."""
+    normalize = lambda s: " ".join(str(s).split()).casefold()
+    return (source, normalize(search_query), normalize(location), int(rows))
+
+def search_source(source, search_query, location="Türkiye", rows=10, use_cache=True):
+    """
+    Compact jobs from one source. Goes through the job search cache:
+    repeated queries are served from memory, stale results are refreshed in
+    the background and identical concurrent queries share one scrape.
+    A timed-out search returns the jobs it got without caching them.
+    Raises on failure.
+    """
+    try:
+        if not use_cache:
+            return _search_and_index(source, search_query, location, rows)
+        jobs = job_search_cache.get(
+            job_search_key(search_query, location, rows, source.name),
+            lambda: _search_and_index(source, search_query, location, rows),
+        )
+    except PartialResults as e:
+        # A failed load to the cache, so the next search scrapes again
+        return list(e.jobs)
+    # Callers may modify the list; the cached one must stay intact
+    return list(jobs)
+
+def fetch_linkedin_jobs(search_query, location="Türkiye", rows=10, use_cache=True):
+    """Fetches (compact) jobs from LinkedIn via Apify, through the job search cache."""
+    if not apify_client.get():
+        log.warning("apify_not_configured", reason="APIFY_API_TOKEN missing")
         return []
     
     try:
-        print(f"\n=== LinkedIn Job Search ===")
-        print(f"Search Query: '{search_query}'")
-        print(f"Location: '{location}'")
-        print(f"Requested rows: {rows}")
-        
-        run_input = {
-            "title": search_query,
-            "location": location,
-            "rows": rows,
-            "proxy": {
-                "useApifyProxy": True,
-                "apifyProxyGroups": ["RESIDENTIAL"],
-            }
-        }
-        
-        print(f"Calling Apify actor with input: {run_input}")
-        run = apify_client.actor("BHzefUZlZRKWxkTck").call(run_input=run_input)
-        jobs = list(apify_client.dataset(run["defaultDatasetId"]).iterate_items())
-        
-        # Ensure we return maximum 10 jobs
-        jobs = jobs[:10]
-        
-        print(f"✓ Successfully fetched {len(jobs)} jobs")
-        if len(jobs) == 0:
-            print("WARNING: No jobs found! This might be because:")
-            print("  - The search query is too specific or contains technical jargon")
-            print("  - The location is too restrictive")
-            print("  - LinkedIn has no matching results")
-            print(f"  - Try simplifying the search query: '{search_query}'")
-        else:
-            print(f"Sample job titles: {[job.get('title', 'N/A')[:50] for job in jobs[:3]]}")
-        
-        return jobs
+        return search_source(job_sources.get("linkedin"), search_query, location, rows, use_cache)
     except Exception as e:
-        print(f"✗ Error fetching LinkedIn jobs: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception("linkedin_fetch_failed", query=search_query, location=location, error=str(e))
         return []
 
-def analyze_summary(resume_text):
-    """Analyzes resume and returns an executive summary."""
-    prompt = f"""Analyze this resume and provide a comprehensive executive summary. Include:
+def _indexed_jobs(search_query, location, rows):
+    """Fresh matches from the local job index, or None when it has fewer than `rows`."""
+    jobs = job_index.search(search_query, location, limit=rows, max_age=JOB_INDEX_FRESH_SECONDS)
+    if len(jobs) >= rows:
+        log.info("job_index_answered", query=search_query, location=location, jobs=len(jobs))
+        return [compact_job(normalize_job(job, job.get("source") or "linkedin")) for job in jobs]
+    return None
+
+def job_details(job_id):
+    """The full stored posting for a job's id (or link, for jobs without one), or None."""
+    job = job_index.get(f"id:{job_id}") or job_index.get(job_id.split("?")[0])
+    return normalize_job(job, job.get("source") or "linkedin") if job else None
+
+def rank_jobs_for_resume(resume_text, jobs, top_k=10):
+    """rank_jobs scored on the full postings in the job index, returning the compact jobs."""
+    full = job_index.get_many([job_key(job) for job in jobs])
+    return rank_jobs(resume_text, jobs, top_k=top_k, full=[full.get(job_key(job), job) for job in jobs])
+
+class JobMerger:
+    """
+    Merges jobs from several searches and sources. A posting is the same job
+    when its id/link matches, or its title, company and city do (the same
+    posting listed on two sites); it keeps every keyword and source it came from.
+    """
+
+    def __init__(self):
+        self.jobs = {}
+        self._aliases = {}
+
+    def add(self, job, keyword):
+        """Adds a job; returns (key, True if it was new)."""
+        key = self._aliases.get(job_key(job)) or self._aliases.get(job_fingerprint(job))
+        new = key is None
+        if new:
+            key = job_key(job)
+            # Copy so the cached job dicts are left untouched
+            self.jobs[key] = dict(job, matchedKeywords=[], sources=[])
+        self._aliases.setdefault(job_key(job), key)
+        self._aliases.setdefault(job_fingerprint(job), key)
+        merged = self.jobs[key]
+        if keyword not in merged["matchedKeywords"]:
+            merged["matchedKeywords"].append(keyword)
+        if job.get("source") and job["source"] not in merged["sources"]:
+            merged["sources"].append(job["source"])
+        return key, new
+
+def _search_deadline(timeout):
+    """Seconds a multi-source search may take: timeout (JOB_SEARCH_DEADLINE), capped by the request's deadline."""
+    try:
+        return remaining(timeout or JOB_SEARCH_DEADLINE)
+    except DeadlineExceeded:
+        return 0
+
+async def fetch_jobs_for_keywords(keywords, location="Türkiye", rows=5, max_concurrency=None, timeout=None,
+                                  use_index=False, sources=None):
+    """
+    Searches every source (the enabled ones unless `sources` names others)
+    for every keyword concurrently and merges the results.
+    Searches are capped at max_concurrency at a time per request, and at each
+    source's own concurrency limit process-wide. Each source search gets that
+    source's timeout, and after `timeout` seconds (JOB_SEARCH_DEADLINE) the
+    jobs that have arrived are returned; slower searches are dropped.
+    Jobs found by several keywords or sources appear once, with every match
+    listed in 'matchedKeywords' and 'sources'.
+    With use_index=True a keyword is answered from the local job index when
+    it has enough fresh matches, and only scraped otherwise.
+    Returns (jobs, timed_out_keywords).
+    """
+    max_concurrency = max_concurrency or JOB_SEARCH_CONCURRENCY
+    deadline = _search_deadline(timeout)
+    sources = job_sources.resolve(sources)
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def search(keyword, source):
+        async with semaphore:
+            # A source stops at its own timeout and returns what it has, which can take one
+            # more dataset read; past that the search is dropped but still fills the job cache
+            return await asyncio.wait_for(
+                asyncio.to_thread(search_source, source, keyword, location, rows),
+                source.timeout + APIFY_POLL_INTERVAL + 1
+            )
+
+    async def search_keyword(keyword):
+        if use_index:
+            jobs = await asyncio.to_thread(_indexed_jobs, keyword, location, rows)
+            if jobs is not None:
+                return [(None, jobs)]
+        results = await asyncio.gather(*(search(keyword, s) for s in sources), return_exceptions=True)
+        return list(zip(sources, results))
+
+    tasks = {asyncio.create_task(search_keyword(k)): k for k in keywords}
+    try:
+        done, pending = await asyncio.wait(tasks, timeout=deadline) if tasks else (set(), set())
+    finally:
+        # Also when the caller is cancelled; running scrapes still finish and fill the cache
+        for task in tasks:
+            task.cancel()
+    timed_out = []
+    for task in pending:
+        log.warning("job_search_deadline", keyword=tasks[task], deadline_s=deadline)
+        timed_out.append(tasks[task])
+
+    merger = JobMerger()
+    for task in done:
+        keyword = tasks[task]
+        for source, jobs in task.result():
+            name = source.name if source else "index"
+            if isinstance(jobs, asyncio.TimeoutError):
+                log.warning("job_search_timeout", keyword=keyword, source=name, timeout_s=source.timeout)
+                if keyword not in timed_out:
+                    timed_out.append(keyword)
+                continue
+            if isinstance(jobs, BaseException):
+                log.warning("job_search_failed", keyword=keyword, source=name, error=str(jobs))
+                continue
+            for job in jobs:
+                merger.add(job, keyword)
+    # Keep the caller's keyword order
+    return list(merger.jobs.values()), [k for k in keywords if k in timed_out]
+
+async def stream_jobs_for_keywords(keywords, location="Türkiye", rows=5, max_concurrency=None, timeout=None,
+                                   sources=None):
+    """
+    Streaming counterpart of fetch_jobs_for_keywords: yields events as soon
+    as each job arrives from a running scraper (or from the job search cache):
+      {"type": "job", "keyword", "source", "key", "job"}     first time a job is seen
+      {"type": "match", "keyword", "source", "key"}          job already sent (other keyword or source)
+      {"type": "keyword_done", "keyword", "source", "jobs", "cached"[, "partial"][, "error"]}
+    one keyword_done per keyword and source; "partial" marks a search that hit
+    the source's timeout after some jobs. After `timeout` seconds
+    (JOB_SEARCH_DEADLINE) unfinished searches end with error "deadline".
+    Completed searches are stored in the job search cache and the job index.
+    Closing the generator stops the searches and aborts their actor runs.
+    """
+    max_concurrency = max_concurrency or JOB_SEARCH_CONCURRENCY
+    deadline = time.monotonic() + _search_deadline(timeout)
+    sources = job_sources.resolve(sources)
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+    semaphore = asyncio.Semaphore(max_concurrency)
+    cancel = threading.Event()
+    emit = lambda event: loop.call_soon_threadsafe(events.put_nowait, event)
+
+    def pump(keyword, source):
+        """Runs in a worker thread: forwards one search's jobs as they arrive."""
+        done = {"type": "keyword_done", "keyword": keyword, "source": source.name, "jobs": 0, "cached": False}
+        try:
+            key = job_search_key(keyword, location, rows, source.name)
+            cached = job_search_cache.peek(key)
+            if cached is not None:
+                done["cached"] = True
+                for job in cached:
+                    emit((keyword, job))
+                done["jobs"] = len(cached)
+                return
+            jobs, compacted = [], []
+            for job in source.stream(keyword, location, rows, cancel=cancel):
+                jobs.append(job)
+                compacted.append(compact_job(job))
+                emit((keyword, compacted[-1]))
+                done["jobs"] = len(jobs)
+            if not cancel.is_set() and jobs:
+                _index_jobs(jobs, source.name)
+                job_search_cache.put(key, compacted)
+        except PartialResults as e:
+            # The jobs are sent, but a short list must not be cached as the search's answer
+            log.warning("job_search_partial", keyword=keyword, source=source.name, jobs=done["jobs"], error=str(e))
+            done["partial"] = True
+        except Exception as e:
+            log.warning("job_search_failed", keyword=keyword, source=source.name, error=str(e))
+            done["error"] = str(e)
+        finally:
+            emit(done)
+
+    async def search(keyword, source):
+        async with semaphore:
+            await asyncio.to_thread(pump, keyword, source)
+
+    searches = {(k, s.name): s for k in keywords for s in sources}
+    tasks = [asyncio.create_task(search(k, s)) for (k, _), s in searches.items()]
+    merger = JobMerger()
+    try:
+        while searches:
+            try:
+                event = await asyncio.wait_for(events.get(), max(deadline - time.monotonic(), 0))
+            except asyncio.TimeoutError:
+                for keyword, name in searches:
+                    log.warning("job_search_deadline", keyword=keyword, source=name)
+                    yield {"type": "keyword_done", "keyword": keyword, "source": name, "jobs": 0,
+                           "cached": False, "error": "deadline"}
+                return
+            if isinstance(event, dict):
+                searches.pop((event["keyword"], event["source"]), None)
+                yield event
+                continue
+            keyword, job = event
+            key, new = merger.add(job, keyword)
+            if new:
+                yield {"type": "job", "keyword": keyword, "source": job["source"], "key": key, "job": job}
+            else:
+                yield {"type": "match", "keyword": keyword, "source": job["source"], "key": key}
+    finally:
+        cancel.set()
+        for task in tasks:
+            task.cancel()
+
+# Resume prompts are laid out as RESUME_PREFIX + resume + task, so every
+# request about one resume starts with the same prefix (which Gemini can serve
+# from its implicit cache) and only the task differs between steps.
+RESUME_PREFIX = "You are a career advisor. Read the candidate's resume below, then complete the task that follows it.\n\nResume:\n"
+
+def resume_prefix(resume_text):
+    return f"{RESUME_PREFIX}{resume_text}\n\n"
+
+def resume_prompt(resume_text, task):
+    return f"{resume_prefix(resume_text)}{task}"
+
+def create_resume_context(resume_text):
+    """A model bound to a new Gemini cached context holding the resume prefix."""
+    cached = genai.caching.CachedContent.create(
+        model=f"models/{MODEL_NAME}",
+        display_name=f"resume-{text_fingerprint(resume_text)[:16]}",
+        contents=[resume_prefix(resume_text)],
+        ttl=GEMINI_CONTEXT_CACHE_TTL,
+    )
+    log.info("gemini_context_created", name=cached.name, ttl=GEMINI_CONTEXT_CACHE_TTL)
+    return genai.GenerativeModel.from_cached_content(cached)
+
+async def resume_request(resume_text, task):
+    """
+    (prompt, client) for a task about the resume. With GEMINI_CONTEXT_CACHE the
+    resume's cached context is created once (concurrent steps share it) and
+    only the task is sent; otherwise, or if caching fails, the full prompt.
+    A failed create is not retried for the resume for GEMINI_CONTEXT_FAILURE_TTL.
+    """
+    if GEMINI_CONTEXT_CACHE and await gemini_model.get_async() and estimate_tokens(resume_text) >= GEMINI_CONTEXT_CACHE_MIN_TOKENS:
+        fingerprint = text_fingerprint(resume_text)
+        if not resume_context_failures.get(fingerprint):
+            try:
+                client = await asyncio.to_thread(
+                    resume_contexts.get, fingerprint, lambda: create_resume_context(resume_text)
+                )
+                return task, client
+            except Exception as e:
+                log.warning("gemini_context_failed", error=str(e), retry_after_s=GEMINI_CONTEXT_FAILURE_TTL)
+                resume_context_failures.set(fingerprint, True)
+    return resume_prompt(resume_text, task), None
+
+SUMMARY_TASK = """Task: Provide a comprehensive executive summary of this resume. Include:
 1. Professional Profile (role, experience level, specializations)
 2. Education (institution, degree, GPA if available)
 3. Key Technical Skills
 4. Notable Projects and Achievements
 5. Work Experience highlights
 
-Be thorough and complete. Do not cut off mid-sentence.
+Be thorough and complete. Do not cut off mid-sentence."""
 
-Resume:
-{resume_text}"""
-    return ask_gemini(prompt, max_tokens=2000)
+def summary_prompt(resume_text):
+    return resume_prompt(resume_text, SUMMARY_TASK)
 
-def analyze_gaps(resume_text):
-    """Analyzes resume and identifies gaps."""
-    prompt = f"""Analyze this resume and identify gaps that could be improved for better job opportunities. Include:
+def analyze_summary(resume_text):
+    """Analyzes resume and returns an executive summary."""
+    return ask_gemini(summary_prompt(compact_resume(resume_text)), max_tokens=2000, analyzer="summary")
+
+async def analyze_summary_async(resume_text, on_delta=None):
+    """Async variant of analyze_summary. on_delta receives partial output as it streams."""
+    prompt, client = await resume_request(resume_text, SUMMARY_TASK)
+    return await ask_gemini_async(prompt, max_tokens=2000, on_delta=on_delta, analyzer="summary", client=client)
+
+GAPS_TASK = """Task: Identify gaps in this resume that could be improved for better job opportunities. Include:
 1. Missing technical skills for the target role
 2. Certifications that would strengthen the profile
 3. Experience gaps (leadership, team size, project scale)
 4. Soft skills that could be highlighted
 5. Portfolio/GitHub/online presence improvements
 
-Provide actionable recommendations. Be thorough and complete.
+Provide actionable recommendations. Be thorough and complete."""
 
-Resume:
-{resume_text}"""
-    return ask_gemini(prompt, max_tokens=1500)
+def gaps_prompt(resume_text):
+    return resume_prompt(resume_text, GAPS_TASK)
 
-def analyze_roadmap(resume_text):
-    """Creates a career roadmap based on resume."""
-    prompt = f"""Based on this resume, create a strategic career roadmap for the next 1-2 years. Include:
+def analyze_gaps(resume_text):
+    """Analyzes resume and identifies gaps."""
+    return ask_gemini(gaps_prompt(compact_resume(resume_text)), max_tokens=1500, analyzer="gaps")
+
+async def analyze_gaps_async(resume_text, on_delta=None):
+    """Async variant of analyze_gaps. on_delta receives partial output as it streams."""
+    prompt, client = await resume_request(resume_text, GAPS_TASK)
+    return await ask_gemini_async(prompt, max_tokens=1500, on_delta=on_delta, analyzer="gaps", client=client)
+
+ROADMAP_TASK = """Task: Based on this resume, create a strategic career roadmap for the next 1-2 years. Include:
 1. Short-term goals (0-6 months): Skills to learn immediately
 2. Medium-term goals (6-12 months): Certifications and projects
 3. Long-term goals (1-2 years): Career positioning and industry exposure
 4. Recommended learning resources and platforms
 5. Networking and community engagement suggestions
 
-Be specific and actionable. Complete all sections.
+Be specific and actionable. Complete all sections."""
 
-Resume:
-{resume_text}"""
-    return ask_gemini(prompt, max_tokens=1500)
+def roadmap_prompt(resume_text):
+    return resume_prompt(resume_text, ROADMAP_TASK)
 
-def analyze_keywords(resume_text, summary_text=None):
-    """Suggests job search keywords based on resume."""
+def analyze_roadmap(resume_text):
+    """Creates a career roadmap based on resume."""
+    return ask_gemini(roadmap_prompt(compact_resume(resume_text)), max_tokens=1500, analyzer="roadmap")
+
+async def analyze_roadmap_async(resume_text, on_delta=None):
+    """Async variant of analyze_roadmap. on_delta receives partial output as it streams."""
+    prompt, client = await resume_request(resume_text, ROADMAP_TASK)
+    return await ask_gemini_async(prompt, max_tokens=1500, on_delta=on_delta, analyzer="roadmap", client=client)
+
+# Keyword answers are constrained to this schema: job titles and technologies kept apart
+KEYWORDS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "titles": {"type": "array", "items": {"type": "string"}},
+        "technologies": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["titles", "technologies"],
+}
+KEYWORDS_MAX_TITLES = 5
+KEYWORDS_MAX_TOTAL = 12
+# A keyword containing one of these words is a job title, not a technology
+TITLE_WORDS = frozenset("""
+engineer developer programmer architect scientist analyst administrator manager lead consultant
+designer specialist intern devops sre tester researcher officer director technician head
+""".split())
+keywords_total = counter(
+    "keywords_total", "Keyword extractions by outcome (ok, repaired, failed, local).", ("outcome",)
+)
+# Where keywords come from: "merge" (Gemini's, checked against the resume and
+# completed by the local skills matcher, which also stands in when Gemini
+# fails), "llm" (Gemini only) or "local" (the matcher only, no Gemini call)
+KEYWORDS_MODE = os.getenv("KEYWORDS_MODE", "merge")
+# Start job searches for this many locally found titles as soon as an analysis
+# starts, so /fetch-jobs finds them cached (0 = off; each search may run a paid scraper)
+KEYWORDS_PREFETCH_JOBS = int(os.getenv("KEYWORDS_PREFETCH_JOBS", "0"))
+
+def keywords_prompt(resume_text, summary_text=None):
     if not summary_text:
         # If no summary provided, use first 2000 chars of resume as context
         summary_text = resume_text[:2000]
 
-    prompt = f"""Based on this resume, suggest the best job search keywords.
+    return f"""Based on this resume, suggest the best job search keywords.
 
-CRITICAL: Return ONLY a valid JSON array of strings. No explanation, no markdown, just the JSON array.
-Example format: ["Software Engineer", "Full Stack Developer", "Python Developer", "Machine Learning", "React"]
+Return a JSON object with two arrays:
+- "titles": 3-5 actual job titles (e.g., "Software Engineer", "Backend Developer")
+- "technologies": up to 7 key technologies, the most relevant first
 
 IMPORTANT: 
-- The FIRST 3-5 items MUST be actual job titles (e.g., "Software Engineer", "Backend Developer")
-- **PRIORITY ORDERING:** You MUST order these job titles based on the candidate's STRONGEST profile match. 
+- **PRIORITY ORDERING:** You MUST order the job titles based on the candidate's STRONGEST profile match. 
   - If the resume is AI-heavy, "AI Engineer" or "Machine Learning Engineer" MUST be first.
   - If the resume is Full Stack heavy, "Full Stack Developer" MUST be first.
   - The most relevant and senior-appropriate role should be at the very top.
   - Be specific: if the user is a Junior, put "Junior..." titles.
 - Job titles should be searchable on LinkedIn
-- After job titles, you can include key technologies (prioritize the most relevant ones)
 - Avoid overly specific technical jargon that wouldn't be used in job titles
-- Maximum 10-12 keywords total
 
 Resume Summary:
 {summary_text}"""
-    
-    keywords_raw = ask_gemini(prompt, max_tokens=1000)
-    
-    import json
-    # Parse JSON keywords
-    try:
-        # Try to extract JSON array from response
-        keywords_raw = keywords_raw.strip()
-        # Remove markdown code blocks if present
-        if keywords_raw.startswith("```"):
-            keywords_raw = keywords_raw.split("```")[1]
-            if keywords_raw.startswith("json"):
-                keywords_raw = keywords_raw[4:]
-        keywords_raw = keywords_raw.strip()
-        
-        keywords = json.loads(keywords_raw)
-        if not isinstance(keywords, list):
-            keywords = [str(keywords)]
+
+def keywords_repair_prompt(answer):
+    return f"""Rewrite this as a JSON object with "titles" (job titles) and "technologies" arrays of strings. Keep only real job titles and technologies.
+
+{answer[:1500]}"""
+
+def _is_title(keyword):
+    return any(word in TITLE_WORDS for word in keyword.casefold().replace("-", " ").split())
+
+def _clean_keyword(value):
+    """A keyword with whitespace collapsed and stray quotes/bullets removed, or "" if it is not a plausible search term."""
+    keyword = " ".join(str(value).split()).strip("\"'`*•-–.,;: ")
+    if not 2 <= len(keyword) <= 60 or len(keyword.split()) > 6:
+        return ""
+    if any(c in keyword for c in "{}[]<>|\\") or not any(c.isalpha() for c in keyword):
+        return ""
+    return keyword
+
+def validate_keywords(answer):
+    """
+    Search keywords from a keyword answer: a {"titles", "technologies"} object,
+    or a plain list, which is split into the two by TITLE_WORDS.
+    Cleans each keyword, drops implausible ones and case-insensitive
+    duplicates, and returns up to KEYWORDS_MAX_TITLES titles (in the model's
+    order) followed by technologies, KEYWORDS_MAX_TOTAL in all.
+    Returns [] when no job title is left, so nothing is searched with it.
+    """
+    if isinstance(answer, list):
+        answer = {
+            "titles": [k for k in answer if _is_title(str(k))],
+            "technologies": [k for k in answer if not _is_title(str(k))],
+        }
+    if not isinstance(answer, dict):
+        return []
+    seen = set()
+    groups = []
+    for field, limit in (("titles", KEYWORDS_MAX_TITLES), ("technologies", KEYWORDS_MAX_TOTAL)):
+        values = answer.get(field)
+        group = []
+        for value in values if isinstance(values, list) else []:
+            keyword = _clean_keyword(value)
+            if keyword and keyword.casefold() not in seen and len(group) < limit:
+                seen.add(keyword.casefold())
+                group.append(keyword)
+        groups.append(group)
+    titles, technologies = groups
+    if not titles:
+        return []
+    return (titles + technologies)[:KEYWORDS_MAX_TOTAL]
+
+def parse_keywords(keywords_raw):
+    """Validated keywords from a raw Gemini answer ([] if it is not a usable keyword answer)."""
+    text = keywords_raw.strip()
+    # Remove a markdown code fence if present
+    if text.startswith("```"):
+        text = text.strip("`")
+        if text.startswith("json"):
+            text = text[4:]
+    try:
+        return validate_keywords(json.loads(text))
     except json.JSONDecodeError:
-        # Fallback: split by comma or newline
-        if "," in keywords_raw:
-            keywords = [k.strip().strip('"').strip("'") for k in keywords_raw.split(",") if k.strip()]
-        else:
-            keywords = [k.strip().strip('"').strip("'") for k in keywords_raw.split("\n") if k.strip()]
-            
-    # Clean up keywords
-    keywords = [k for k in keywords if k and len(k) > 2 and not k.startswith("[")]
+        return []
+
+def local_keywords(resume_text):
+    """Keywords from the local skills matcher alone: deterministic, free and takes about a millisecond."""
+    return validate_keywords(skills.extract_keywords(resume_text))
+
+def _keyword_kind(keyword):
+    found = skills.matcher.lookup(keyword)
+    if found:
+        return found[1]
+    return "title" if _is_title(keyword) else "technology"
+
+def finish_keywords(keywords, resume_text):
+    """
+    Applies KEYWORDS_MODE to validated Gemini keywords: in merge mode they are
+    checked against the resume and completed with the local matches (see
+    skills.merge_keywords); in local mode only the local matches are used.
+    """
+    if KEYWORDS_MODE == "local":
+        return local_keywords(resume_text)
+    if KEYWORDS_MODE != "merge":
+        return keywords
+    suggested = {
+        "titles": [k for k in keywords if _keyword_kind(k) == "title"],
+        "technologies": [k for k in keywords if _keyword_kind(k) != "title"],
+    }
+    merged, dropped = skills.merge_keywords(suggested, resume_text)
+    result = validate_keywords(merged)
+    log.info("keywords_merged", suggested=len(keywords), dropped=dropped, keywords=len(result))
+    return result
+
+def _needs_repair(answer, keywords):
+    # Fallback messages mean no answer at all; asking again to reformat them is pointless
+    return not keywords and answer not in (GEMINI_MISSING, GEMINI_BLOCKED, GEMINI_UNAVAILABLE)
+
+def _keywords_outcome(keywords, repaired):
+    outcome = "failed" if not keywords else "repaired" if repaired else "ok"
+    keywords_total.inc(outcome=outcome)
+    if outcome == "failed":
+        log.warning("keywords_invalid", repaired=repaired)
     return keywords
+
+def analyze_keywords(resume_text, summary_text=None):
+    """
+    Suggests job search keywords based on resume: job titles first, then
+    technologies. An unusable answer is sent back once with a short repair
+    prompt; if that fails too, [] is returned rather than bad search terms
+    (unless KEYWORDS_MODE fills in local matches, see finish_keywords).
+    """
+    resume_text = compact_resume(resume_text)
+    if KEYWORDS_MODE == "local":
+        keywords_total.inc(outcome="local")
+        return local_keywords(resume_text)
+    answer = ask_gemini(keywords_prompt(resume_text, summary_text), max_tokens=400, analyzer="keywords",
+                        schema=KEYWORDS_SCHEMA)
+    keywords = parse_keywords(answer)
+    repaired = _needs_repair(answer, keywords)
+    if repaired:
+        keywords = parse_keywords(ask_gemini(keywords_repair_prompt(answer), max_tokens=200,
+                                             analyzer="keywords_repair", schema=KEYWORDS_SCHEMA))
+    return finish_keywords(_keywords_outcome(keywords, repaired), resume_text)
+
+async def analyze_keywords_async(resume_text, summary_text=None):
+    """Async variant of analyze_keywords."""
+    if KEYWORDS_MODE == "local":
+        keywords_total.inc(outcome="local")
+        return local_keywords(resume_text)
+    answer = await ask_gemini_async(keywords_prompt(resume_text, summary_text), max_tokens=400, analyzer="keywords",
+                                    schema=KEYWORDS_SCHEMA)
+    keywords = parse_keywords(answer)
+    repaired = _needs_repair(answer, keywords)
+    if repaired:
+        keywords = parse_keywords(await ask_gemini_async(keywords_repair_prompt(answer), max_tokens=200,
+                                                         analyzer="keywords_repair", schema=KEYWORDS_SCHEMA))
+    return finish_keywords(_keywords_outcome(keywords, repaired), resume_text)
+
+
+# Analysis pipeline: step name -> (analyzer, steps whose results it needs).
+# Steps without dependencies run concurrently; a dependent step starts as soon
+# as everything it needs has finished.
+ANALYSIS_STEPS = {
+    "summary": (analyze_summary_async, ()),
+    "gaps": (analyze_gaps_async, ()),
+    "roadmap": (analyze_roadmap_async, ()),
+    # Local keywords don't need the summary, so they finish right away
+    "keywords": (analyze_keywords_async, () if KEYWORDS_MODE == "local" else ("summary",)),
+}
+# Steps producing free text, which can stream partial output
+STREAMING_STEPS = ("summary", "gaps", "roadmap")
+
+# Single-shot mode: one structured-output request returns every section
+SINGLE_SHOT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "summary": {"type": "string"},
+        "gaps": {"type": "string"},
+        "roadmap": {"type": "string"},
+        "keywords": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["summary", "gaps", "roadmap", "keywords"],
+}
+SINGLE_SHOT_MAX_TOKENS = 6000
+
+SINGLE_SHOT_TASK = """Task: Analyze this resume and return a JSON object with the following fields.
+
+"summary": A comprehensive executive summary. Include:
+1. Professional Profile (role, experience level, specializations)
+2. Education (institution, degree, GPA if available)
+3. Key Technical Skills
+4. Notable Projects and Achievements
+5. Work Experience highlights
+
+"gaps": Gaps that could be improved for better job opportunities, with actionable recommendations. Include:
+1. Missing technical skills for the target role
+2. Certifications that would strengthen the profile
+3. Experience gaps (leadership, team size, project scale)
+4. Soft skills that could be highlighted
+5. Portfolio/GitHub/online presence improvements
+
+"roadmap": A strategic career roadmap for the next 1-2 years. Include:
+1. Short-term goals (0-6 months): Skills to learn immediately
+2. Medium-term goals (6-12 months): Certifications and projects
+3. Long-term goals (1-2 years): Career positioning and industry exposure
+4. Recommended learning resources and platforms
+5. Networking and community engagement suggestions
+
+"keywords": The best job search keywords, 10-12 in total.
+- The FIRST 3-5 items MUST be actual job titles searchable on LinkedIn, ordered by the candidate's STRONGEST profile match (be specific: if the user is a Junior, put "Junior..." titles).
+- After job titles, include the most relevant key technologies.
+- Avoid overly specific technical jargon that wouldn't be used in job titles.
+
+Be thorough and complete in every text field. Do not cut off mid-sentence."""
+
+def single_shot_prompt(resume_text):
+    return resume_prompt(resume_text, SINGLE_SHOT_TASK)
+
+# Prompt templates rendered with placeholders; their hash versions the cache keys
+PROMPT_HASHES = {
+    "summary": sha256_hex(summary_prompt("{resume}")),
+    "gaps": sha256_hex(gaps_prompt("{resume}")),
+    "roadmap": sha256_hex(roadmap_prompt("{resume}")),
+    "keywords": sha256_hex(keywords_prompt("", "{summary}") + KEYWORDS_MODE),
+    "single_shot": sha256_hex(single_shot_prompt("{resume}") + KEYWORDS_MODE),
+}
+
+def analysis_cache_key(step, resume_text, *inputs):
+    """Cache key for one analysis step: model, prompt template, resume content and upstream results."""
+    parts = [step, ANALYSIS_CACHE_VERSION, MODEL_NAME, PROMPT_HASHES[step], text_fingerprint(resume_text)]
+    parts += [sha256_hex(json.dumps(i)) for i in inputs]
+    return "analysis:" + sha256_hex(":".join(parts))
+
+def is_cacheable(result):
+    """True unless the result is (or was parsed from) a fallback error message."""
+    text = result if isinstance(result, str) else " ".join(result)
+    return bool(text) and not any(msg in text for msg in (GEMINI_MISSING, GEMINI_BLOCKED, GEMINI_UNAVAILABLE))
+
+async def _analyze_and_store(step, key, resume_text, *inputs, on_delta=None):
+    analyzer = ANALYSIS_STEPS[step][0]
+    analysis_steps_total.inc(analyzer=step, source="model")
+    with span("analysis_step", analyzer=step):
+        if on_delta:
+            result = await analyzer(resume_text, *inputs, on_delta=on_delta)
+        else:
+            result = await analyzer(resume_text, *inputs)
+    if is_cacheable(result):
+        analysis_cache.set(key, result)
+    return result
+
+def compact_resume(resume_text):
+    """
+    Normalizes the resume (whitespace, page headers/footers, duplicate lines)
+    and compacts it to RESUME_TOKEN_BUDGET. Every prompt shares the result.
+    """
+    compacted, stats = prepare_resume(resume_text, RESUME_TOKEN_BUDGET)
+    with _compaction_lock:
+        compaction_stats["resumes"] += 1
+        for field in ("original_tokens", "compacted_tokens", "tokens_saved"):
+            compaction_stats[field] += stats[field]
+    log.info("resume_compacted", **stats)
+    return compacted
+
+def compaction_snapshot():
+    """A consistent copy of compaction_stats."""
+    with _compaction_lock:
+        return dict(compaction_stats)
+
+async def run_analysis_step(step, resume_text, *inputs):
+    """Runs a single analysis step through the shared cache."""
+    resume_text = compact_resume(resume_text)
+    key = analysis_cache_key(step, resume_text, *inputs)
+    cached = analysis_cache.get(key)
+    if cached is not None:
+        analysis_steps_total.inc(analyzer=step, source="cache")
+        return cached
+    return await _analyze_and_store(step, key, resume_text, *inputs)
+
+async def run_analysis(resume_text, concurrent=True, deltas=False):
+    """
+    Runs every analysis step and yields (step, status, data) tuples.
+    Analyzers are async and share the Gemini limiter, so the event loop stays free.
+    Cached steps complete immediately without a 'processing' event.
+    With concurrent=False the steps run one after another in declaration order.
+    With deltas=True, text steps also yield (step, 'delta', text) with output
+    as it is generated, before their 'complete' event.
+    """
+    resume_text = compact_resume(resume_text)
+    results = {}
+    pending = dict(ANALYSIS_STEPS)
+    running = {}
+    events = asyncio.Queue()
+
+    async def run_step(step, key, inputs):
+        on_delta = None
+        if deltas and step in STREAMING_STEPS:
+            on_delta = lambda text: events.put_nowait((step, "delta", text))
+        try:
+            result = await _analyze_and_store(step, key, resume_text, *inputs, on_delta=on_delta)
+        except Exception as e:
+            events.put_nowait((step, "error", e))
+            return
+        events.put_nowait((step, "complete", result))
+
+    try:
+        while pending or running:
+            # Start steps whose dependencies are satisfied (one at a time unless
+            # concurrent); cached ones finish right away
+            while pending and (concurrent or not running):
+                step = next((s for s, (_, deps) in pending.items() if all(d in results for d in deps)), None)
+                if step is None:
+                    break
+                inputs = [results[d] for d in pending.pop(step)[1]]
+                key = analysis_cache_key(step, resume_text, *inputs)
+                cached = analysis_cache.get(key)
+                if cached is not None:
+                    analysis_steps_total.inc(analyzer=step, source="cache")
+                    results[step] = cached
+                    yield step, "complete", cached
+                    continue
+                running[step] = asyncio.create_task(run_step(step, key, inputs))
+                yield step, "processing", None
+
+            if not running:
+                continue
+
+            step, status, data = await events.get()
+            if status == "error":
+                raise data
+            if status == "complete":
+                del running[step]
+                results[step] = data
+            yield step, status, data
+    finally:
+        # Client went away or a step failed - don't leave orphaned tasks behind
+        for task in running.values():
+            task.cancel()
+
+async def run_single_shot_analysis(resume_text):
+    """
+    Same events as run_analysis, but from one structured-output Gemini request.
+    The JSON answer is parsed while it streams, so each step completes as soon
+    as its field is closed. Steps the request fails to deliver fall back to
+    their own prompts.
+    """
+    resume_text = compact_resume(resume_text)
+    key = analysis_cache_key("single_shot", resume_text)
+    cached = analysis_cache.get(key)
+    if cached is not None:
+        for step in ANALYSIS_STEPS:
+            analysis_steps_total.inc(analyzer=step, source="cache")
+            yield step, "complete", cached[step]
+        return
+
+    for step in ANALYSIS_STEPS:
+        yield step, "processing", None
+
+    results = {}
+    if await gemini_model.get_async():
+        parser = ObjectStreamParser()
+        try:
+            # The fallback steps below reuse the resume's cached context, if any
+            prompt, client = await resume_request(resume_text, SINGLE_SHOT_TASK)
+            async for chunk in stream_gemini_json(prompt, SINGLE_SHOT_SCHEMA, SINGLE_SHOT_MAX_TOKENS, client=client):
+                for step, value in parser.feed(chunk):
+                    if step not in ANALYSIS_STEPS or step in results:
+                        continue
+                    if step == "keywords":
+                        value = finish_keywords(validate_keywords(value), resume_text)
+                        if not value:
+                            # Left to the keywords prompt below, which can repair its answer
+                            continue
+                    analysis_steps_total.inc(analyzer=step, source="single_shot")
+                    results[step] = value
+                    yield step, "complete", value
+        except Exception as e:
+            log.warning("single_shot_failed", error=str(e))
+
+    streamed = set(results)
+    for step, (_, deps) in ANALYSIS_STEPS.items():
+        if step not in results:
+            inputs = [results[d] for d in deps]
+            step_key = analysis_cache_key(step, resume_text, *inputs)
+            results[step] = analysis_cache.get(step_key) or await _analyze_and_store(step, step_key, resume_text, *inputs)
+            yield step, "complete", results[step]
+
+    if streamed == set(ANALYSIS_STEPS) and all(is_cacheable(results[s]) for s in ANALYSIS_STEPS):
+        analysis_cache.set(key, results)
+
+# Job search prefetches still running; held so they aren't garbage collected
+_prefetches = set()
+
+def prefetch_jobs(keywords):
+    """Starts job searches for keywords in the background, as /fetch-jobs would run them with a resume_id."""
+    task = asyncio.create_task(fetch_jobs_for_keywords(keywords, rows=JOB_RANK_CANDIDATES))
+    _prefetches.add(task)
+    task.add_done_callback(_prefetches.discard)
+    log.info("job_search_prefetch", keywords=keywords)
+
+async def analysis_events(resume_text, resume_id, mode="concurrent", deltas=False):
+    """
+    Client-facing analysis events as dicts: a 'preview' of the keywords from the
+    local skills matcher first (before any Gemini call), each step's progress,
+    then a final 'done' event with every result (in ANALYSIS_STEPS order) and the resume_id.
+    """
+    preview = local_keywords(resume_text)
+    if preview:
+        yield {'step': 'keywords', 'status': 'preview', 'data': preview}
+        if KEYWORDS_PREFETCH_JOBS:
+            titles = [k for k in preview if _keyword_kind(k) == "title"]
+            prefetch_jobs(titles[:KEYWORDS_PREFETCH_JOBS])
+
+    results = {}
+    if mode == "single_shot":
+        events = run_single_shot_analysis(resume_text)
+    else:
+        events = run_analysis(resume_text, concurrent=(mode == "concurrent"), deltas=deltas)
+
+    async for step, status, data in events:
+        event = {'step': step, 'status': status}
+        if status == 'complete':
+            results[step] = data
+        if data is not None:
+            event['data'] = data
+        yield event
+
+    # resume_id lets /fetch-jobs rank jobs against this resume later
+    results = {step: results[step] for step in ANALYSIS_STEPS}
+    results['resume_id'] = resume_id
+    yield {'step': 'done', 'status': 'complete', 'data': results}
+
+def enqueue_analysis_job(path, resume_id, mode="concurrent"):
+    """
+    Queues a background analysis of an uploaded PDF and returns the job id.
+    The file is moved to JOBS_UPLOAD_DIR so retries (and other processes) can read it.
+    Raises QueueFull when too many jobs are waiting.
+    """
+    os.makedirs(JOBS_UPLOAD_DIR, exist_ok=True)
+    stored = os.path.join(JOBS_UPLOAD_DIR, f"{os.path.basename(path)}.pdf")
+    shutil.move(path, stored)
+    try:
+        return analysis_job_store.enqueue({"path": stored, "resume_id": resume_id, "mode": mode})
+    except BaseException:
+        os.unlink(stored)
+        raise
+
+async def run_analysis_job(payload, emit):
+    """Worker handler for background jobs: extracts the stored PDF and records each analysis event."""
+    resume_text = await asyncio.to_thread(extract_resume_text, payload["path"], payload["resume_id"])
+    # Per-token deltas are not stored; steps finished by an earlier attempt come from the cache
+    async for event in analysis_events(resume_text, payload["resume_id"], payload["mode"]):
+        await emit(event)
+
+def cleanup_analysis_job(payload):
+    """Removes a finished job's stored upload."""
+    try:
+        os.unlink(payload["path"])
+    except FileNotFoundError:
+        pass
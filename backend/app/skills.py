@@ -0,0 +1,357 @@
+"""
+Local, deterministic job search keywords: a taxonomy of technologies and job
+titles (with aliases) compiled into a trie, so one pass over the resume finds
+every mention. Matches are weighted by the section they appear in and how
+often they recur. Used as an instant preview of the keywords and to check and
+complete the keywords Gemini suggests.
+"""
+import re
+from collections import namedtuple
+
+try:
+    from .compaction import split_sections
+except ImportError:
+    from compaction import split_sections
+
+# Word tokens; keeps terms like "C++", "C#", "Node.js" and "ASP.NET" whole
+TOKEN_RE = re.compile(r"\w[\w+#]*(?:\.\w[\w+#]*)*")
+
+# Technology: (aliases, job titles it points to). The name itself always matches,
+# case-insensitively. Aliases in CASE_SENSITIVE only match as written.
+TECHNOLOGIES = {
+    "Python": ((), ("Python Developer", "Backend Developer")),
+    "Java": ((), ("Java Developer", "Backend Developer")),
+    "JavaScript": (("JS", "ES6", "ECMAScript"), ("Frontend Developer", "Full Stack Developer")),
+    "TypeScript": ((), ("Frontend Developer", "Full Stack Developer")),
+    "C++": (("cpp",), ("Software Engineer",)),
+    "C#": (("csharp", "c sharp"), (".NET Developer",)),
+    ".NET": (("dotnet", ".NET Core", "ASP.NET", "ASP.NET Core"), (".NET Developer",)),
+    "Go": (("Golang",), ("Backend Developer",)),
+    "Rust": ((), ("Software Engineer",)),
+    "Kotlin": ((), ("Android Developer",)),
+    "Swift": ((), ("iOS Developer",)),
+    "Dart": ((), ("Mobile Developer",)),
+    "PHP": ((), ("Web Developer", "Backend Developer")),
+    "Ruby": ((), ("Backend Developer",)),
+    "Scala": ((), ("Data Engineer",)),
+    "SQL": (("T-SQL", "PL/SQL"), ("Data Analyst",)),
+    "MATLAB": ((), ()),
+    "Solidity": ((), ("Blockchain Developer",)),
+    "HTML": (("HTML5",), ("Frontend Developer",)),
+    "CSS": (("CSS3", "SCSS", "Sass"), ("Frontend Developer",)),
+    "React": (("React.js", "ReactJS"), ("Frontend Developer", "Full Stack Developer")),
+    "Next.js": (("NextJS",), ("Frontend Developer", "Full Stack Developer")),
+    "Vue.js": (("Vue", "VueJS"), ("Frontend Developer",)),
+    "Angular": (("AngularJS",), ("Frontend Developer",)),
+    "Svelte": ((), ("Frontend Developer",)),
+    "Redux": ((), ("Frontend Developer",)),
+    "Tailwind CSS": (("Tailwind",), ("Frontend Developer",)),
+    "Node.js": (("NodeJS",), ("Backend Developer", "Full Stack Developer")),
+    "Express.js": (("ExpressJS", "Express"), ("Backend Developer",)),
+    "NestJS": (("Nest.js",), ("Backend Developer",)),
+    "Django": ((), ("Python Developer", "Backend Developer")),
+    "Flask": ((), ("Python Developer", "Backend Developer")),
+    "FastAPI": ((), ("Python Developer", "Backend Developer")),
+    "Spring Boot": (("Spring Framework",), ("Java Developer", "Backend Developer")),
+    "Hibernate": ((), ("Java Developer",)),
+    "Laravel": ((), ("Web Developer",)),
+    "Ruby on Rails": (("Rails",), ("Backend Developer",)),
+    "React Native": ((), ("Mobile Developer",)),
+    "Flutter": ((), ("Mobile Developer",)),
+    "Android": ((), ("Android Developer",)),
+    "iOS": ((), ("iOS Developer",)),
+    "Unity": (("Unity3D",), ("Game Developer",)),
+    "Unreal Engine": ((), ("Game Developer",)),
+    "PostgreSQL": (("Postgres",), ("Backend Developer",)),
+    "MySQL": ((), ("Backend Developer",)),
+    "MongoDB": (("Mongo",), ("Backend Developer",)),
+    "Redis": ((), ("Backend Developer",)),
+    "Elasticsearch": (("Elastic Search", "ELK"), ("Backend Developer",)),
+    "SQLite": ((), ()),
+    "Oracle Database": (("Oracle DB",), ("Database Administrator",)),
+    "GraphQL": ((), ("Backend Developer",)),
+    "REST APIs": (("REST", "RESTful", "REST API", "RESTful APIs"), ("Backend Developer",)),
+    "gRPC": ((), ("Backend Developer",)),
+    "Microservices": (("Microservice", "microservice architecture"), ("Backend Developer",)),
+    "Kafka": (("Apache Kafka",), ("Data Engineer", "Backend Developer")),
+    "RabbitMQ": ((), ("Backend Developer",)),
+    "Celery": ((), ("Python Developer",)),
+    "Spark": (("Apache Spark", "PySpark"), ("Data Engineer",)),
+    "Hadoop": ((), ("Data Engineer",)),
+    "Airflow": (("Apache Airflow",), ("Data Engineer",)),
+    "dbt": ((), ("Data Engineer",)),
+    "Snowflake": ((), ("Data Engineer",)),
+    "BigQuery": ((), ("Data Engineer",)),
+    "ETL": (("ELT", "data pipelines"), ("Data Engineer",)),
+    "AWS": (("Amazon Web Services",), ("Cloud Engineer", "DevOps Engineer")),
+    "Azure": (("Microsoft Azure",), ("Cloud Engineer",)),
+    "GCP": (("Google Cloud", "Google Cloud Platform"), ("Cloud Engineer",)),
+    "Docker": ((), ("DevOps Engineer",)),
+    "Kubernetes": (("K8s",), ("DevOps Engineer",)),
+    "Terraform": ((), ("DevOps Engineer", "Cloud Engineer")),
+    "Ansible": ((), ("DevOps Engineer",)),
+    "Jenkins": ((), ("DevOps Engineer",)),
+    "GitHub Actions": ((), ("DevOps Engineer",)),
+    "GitLab CI": (("GitLab CI/CD",), ("DevOps Engineer",)),
+    "CI/CD": (("CI CD", "continuous integration"), ("DevOps Engineer",)),
+    "Linux": (("Ubuntu", "Unix"), ("System Administrator", "DevOps Engineer")),
+    "Bash": (("Shell scripting",), ("System Administrator",)),
+    "Nginx": ((), ("DevOps Engineer",)),
+    "Prometheus": ((), ("Site Reliability Engineer",)),
+    "Grafana": ((), ("Site Reliability Engineer",)),
+    "Git": ((), ()),
+    "Machine Learning": (("ML",), ("Machine Learning Engineer", "Data Scientist")),
+    "Deep Learning": (("neural networks",), ("Machine Learning Engineer",)),
+    "NLP": (("Natural Language Processing",), ("NLP Engineer", "Machine Learning Engineer")),
+    "Computer Vision": ((), ("Computer Vision Engineer",)),
+    "LLM": (("LLMs", "Large Language Models", "Large Language Model"), ("AI Engineer",)),
+    "Generative AI": (("GenAI", "Gen AI"), ("AI Engineer",)),
+    "RAG": (("Retrieval Augmented Generation", "Retrieval-Augmented Generation"), ("AI Engineer",)),
+    "LangChain": ((), ("AI Engineer",)),
+    "Hugging Face": (("HuggingFace", "Transformers"), ("AI Engineer", "Machine Learning Engineer")),
+    "PyTorch": ((), ("Machine Learning Engineer",)),
+    "TensorFlow": ((), ("Machine Learning Engineer",)),
+    "Keras": ((), ("Machine Learning Engineer",)),
+    "scikit-learn": (("sklearn", "scikit learn"), ("Data Scientist", "Machine Learning Engineer")),
+    "Pandas": ((), ("Data Scientist", "Data Analyst")),
+    "NumPy": ((), ("Data Scientist",)),
+    "OpenCV": ((), ("Computer Vision Engineer",)),
+    "MLOps": ((), ("Machine Learning Engineer",)),
+    "Statistics": (("statistical analysis",), ("Data Scientist", "Data Analyst")),
+    "Data Analysis": (("data analytics",), ("Data Analyst",)),
+    "Data Visualization": ((), ("Data Analyst",)),
+    "Power BI": (("PowerBI",), ("Data Analyst", "Business Analyst")),
+    "Tableau": ((), ("Data Analyst",)),
+    "Excel": (("Microsoft Excel",), ("Data Analyst", "Business Analyst")),
+    "Selenium": ((), ("QA Engineer",)),
+    "Cypress": ((), ("QA Engineer",)),
+    "Jest": ((), ("Frontend Developer",)),
+    "pytest": ((), ("Python Developer",)),
+    "JUnit": ((), ("Java Developer",)),
+    "Test Automation": (("automated testing", "automation testing"), ("QA Engineer",)),
+    "Figma": ((), ("UI/UX Designer",)),
+    "Adobe XD": ((), ("UI/UX Designer",)),
+    "Cybersecurity": (("Cyber Security", "Information Security", "InfoSec"), ("Security Engineer",)),
+    "Penetration Testing": (("Pentesting", "Pentest"), ("Security Engineer",)),
+    "Blockchain": (("Web3",), ("Blockchain Developer",)),
+    "Embedded Systems": (("Embedded C", "Microcontrollers", "RTOS"), ("Embedded Software Engineer",)),
+    "Networking": (("TCP/IP", "CCNA"), ("Network Engineer",)),
+    "Salesforce": ((), ()),
+    "SAP": ((), ()),
+    "Agile": (("Scrum", "Kanban"), ()),
+}
+
+# Job title: aliases. Punctuation doesn't matter ("Back-end" matches "Back end").
+TITLES = {
+    "Software Engineer": (),
+    "Software Developer": ("Software Development Engineer", "SDE"),
+    "Backend Developer": ("Back End Developer", "Backend Engineer", "Back End Engineer", "Server Side Developer"),
+    "Frontend Developer": ("Front End Developer", "Frontend Engineer", "Front End Engineer", "UI Developer"),
+    "Full Stack Developer": ("Fullstack Developer", "Full Stack Engineer", "Fullstack Engineer"),
+    "Web Developer": (),
+    "Mobile Developer": ("Mobile Application Developer", "Mobile Engineer", "Mobile App Developer"),
+    "Android Developer": ("Android Engineer",),
+    "iOS Developer": ("iOS Engineer",),
+    "Python Developer": ("Python Engineer",),
+    "Java Developer": ("Java Engineer",),
+    ".NET Developer": ("C# Developer", "dotnet Developer"),
+    "Game Developer": ("Game Programmer", "Unity Developer"),
+    "Data Scientist": (),
+    "Data Analyst": (),
+    "Data Engineer": ("Big Data Engineer",),
+    "Data Architect": (),
+    "Machine Learning Engineer": ("ML Engineer", "Machine Learning Developer"),
+    "AI Engineer": ("Artificial Intelligence Engineer", "AI Developer", "AI/ML Engineer", "Generative AI Engineer"),
+    "NLP Engineer": (),
+    "Computer Vision Engineer": (),
+    "Research Scientist": ("Research Engineer", "Research Assistant"),
+    "DevOps Engineer": ("DevOps Specialist",),
+    "Site Reliability Engineer": ("SRE",),
+    "Cloud Engineer": ("Cloud Architect", "AWS Engineer"),
+    "Platform Engineer": (),
+    "QA Engineer": ("Quality Assurance Engineer", "Test Engineer", "Software Tester", "QA Automation Engineer",
+                    "Software Development Engineer in Test", "SDET"),
+    "Security Engineer": ("Cybersecurity Engineer", "Security Analyst", "Cyber Security Specialist",
+                          "Penetration Tester"),
+    "Embedded Software Engineer": ("Embedded Engineer", "Embedded Systems Engineer", "Firmware Engineer"),
+    "Blockchain Developer": ("Smart Contract Developer", "Web3 Developer"),
+    "Network Engineer": ("Network Administrator",),
+    "System Administrator": ("Systems Administrator", "Sysadmin"),
+    "Database Administrator": ("DBA",),
+    "Software Architect": ("Solutions Architect", "Solution Architect"),
+    "UI/UX Designer": ("UX Designer", "UI Designer", "Product Designer", "UX/UI Designer"),
+    "Product Manager": (),
+    "Project Manager": (),
+    "Business Analyst": (),
+    "Engineering Manager": (),
+}
+
+# Names and aliases that are also common words or abbreviations, so only count
+# when written exactly like this (as their words, e.g. "NET" for ".NET")
+CASE_SENSITIVE = frozenset(("Go", "NET", "ML", "SDE", "SRE", "DBA", "REST", "Express", "Transformers", "Rails",
+                            "Unity", "Jest", "Spark", "Rust", "Swift", "Dart", "ELK", "RAG", "SAP", "Mongo", "Excel"))
+
+# How much a mention counts by resume section (see compaction.split_sections);
+# None is the top of the resume, usually the candidate's name and current title
+SECTION_WEIGHTS = {
+    None: 2.0,
+    "skills": 3.0, "technical skills": 3.0,
+    "summary": 2.0, "profile": 2.0, "about": 2.0, "objective": 2.0,
+    "experience": 2.0, "work experience": 2.0, "professional experience": 2.0, "employment": 2.0,
+    "projects": 2.0,
+    "references": 0.0, "hobbies": 0.0, "interests": 0.0,
+}
+DEFAULT_SECTION_WEIGHT = 1.0
+# Each further mention of a keyword counts this fraction of the one before it
+REPEAT_DECAY = 0.5
+# Share of a technology's score passed to the job titles it points to
+ROLE_SHARE = 0.25
+
+Keyword = namedtuple("Keyword", "name kind score mentions")
+
+_END = ""  # trie key of a phrase's end; tokens are never empty
+
+
+class PhraseMatcher:
+    """
+    Multi-pattern matcher over word tokens: every phrase is a path in a trie
+    keyed by casefolded tokens. At each token the longest phrase starting
+    there wins, and the scan continues after it, so the text is read once and
+    "React Native" isn't also counted as "React".
+    """
+
+    def __init__(self):
+        self._root = {}
+
+    def add(self, phrase, value, exact=False):
+        """Adds a phrase; with exact=True it only matches with the same capitalization."""
+        tokens = TOKEN_RE.findall(phrase)
+        if not tokens:
+            raise ValueError(f"no words in phrase {phrase!r}")
+        node = self._root
+        for token in tokens:
+            node = node.setdefault(token.casefold(), {})
+        node[_END] = (tuple(tokens) if exact else None, value)
+
+    def matches(self, tokens, folded=None):
+        """Yields (start, end, value) for each phrase found in a token list."""
+        folded = folded or [t.casefold() for t in tokens]
+        root = self._root
+        i, n = 0, len(folded)
+        while i < n:
+            node = root.get(folded[i])
+            best = None
+            j = i
+            while node is not None:
+                j += 1
+                end = node.get(_END)
+                if end is not None and (end[0] is None or tuple(tokens[i:j]) == end[0]):
+                    best = (j, end[1])
+                node = node.get(folded[j]) if j < n else None
+            if best:
+                yield i, best[0], best[1]
+                i = best[0]
+            else:
+                i += 1
+
+    def lookup(self, phrase):
+        """The value of a phrase matched as a whole, case-insensitively, or None."""
+        node = self._root
+        for token in TOKEN_RE.findall(phrase):
+            node = node.get(token.casefold())
+            if node is None:
+                return None
+        end = node.get(_END)
+        return end[1] if end else None
+
+
+def build_matcher(technologies=TECHNOLOGIES, titles=TITLES):
+    """A PhraseMatcher whose values are (name, kind) for every name and alias of the taxonomy."""
+    matcher = PhraseMatcher()
+    for kind, entries in (("technology", technologies), ("title", titles)):
+        for name, entry in entries.items():
+            aliases = entry[0] if kind == "technology" else entry
+            for phrase in (name, *aliases):
+                matcher.add(phrase, (name, kind), exact=" ".join(TOKEN_RE.findall(phrase)) in CASE_SENSITIVE)
+    return matcher
+
+
+matcher = build_matcher()
+
+
+def rank_keywords(text):
+    """
+    Every taxonomy keyword the text mentions, as Keyword tuples, best first:
+    titles the resume names, then titles its technologies point to, then
+    technologies. Scores add up section weights per mention, each repeat
+    counting REPEAT_DECAY times the one before.
+    """
+    weights = {}
+    for heading, lines in split_sections(text):
+        weight = SECTION_WEIGHTS.get(heading, DEFAULT_SECTION_WEIGHT)
+        if not weight:
+            continue
+        for _, _, found in matcher.matches(TOKEN_RE.findall("\n".join(lines))):
+            weights.setdefault(found, []).append(weight)
+
+    scores = {}
+    for found, found_weights in weights.items():
+        found_weights.sort(reverse=True)
+        scores[found] = sum(w * REPEAT_DECAY ** i for i, w in enumerate(found_weights))
+
+    inferred = {}
+    for (name, kind), score in scores.items():
+        if kind == "technology":
+            for title in TECHNOLOGIES[name][1]:
+                if (title, "title") not in scores:
+                    inferred[title] = inferred.get(title, 0.0) + score * ROLE_SHARE
+
+    named = [Keyword(name, kind, round(score, 2), len(weights[(name, kind)]))
+             for (name, kind), score in scores.items()]
+    ranked = sorted((k for k in named if k.kind == "title"), key=lambda k: -k.score)
+    ranked += sorted((Keyword(t, "title", round(s, 2), 0) for t, s in inferred.items()), key=lambda k: -k.score)
+    ranked += sorted((k for k in named if k.kind == "technology"), key=lambda k: -k.score)
+    return ranked
+
+
+def extract_keywords(text):
+    """Job search keywords found in a resume, as a {"titles", "technologies"} answer (best first)."""
+    ranked = rank_keywords(text)
+    return {
+        "titles": [k.name for k in ranked if k.kind == "title"],
+        "technologies": [k.name for k in ranked if k.kind == "technology"],
+    }
+
+
+def _words(phrase):
+    return " " + " ".join(TOKEN_RE.findall(phrase.casefold())) + " "
+
+
+def merge_keywords(suggested, text):
+    """
+    Checks suggested keywords (a {"titles", "technologies"} answer, e.g.
+    from Gemini) against the resume and completes them with its own matches.
+    Known aliases become their taxonomy name; known technologies the resume
+    never mentions are dropped; unknown keywords are kept, as the taxonomy
+    can't judge them. Suggested keywords keep their order, ahead of local ones.
+    Returns (answer, dropped).
+    """
+    local = extract_keywords(text)
+    mentioned = {name.casefold() for name in local["technologies"]}
+    dropped = []
+    merged = {}
+    for field, kind in (("titles", "title"), ("technologies", "technology")):
+        group = []
+        for keyword in suggested.get(field) or []:
+            found = matcher.lookup(keyword)
+            if found:
+                keyword = found[0]
+                if found[1] == "technology" and keyword.casefold() not in mentioned:
+                    dropped.append(keyword)
+                    continue
+            group.append(keyword)
+        # A local keyword already covered by a suggested one (e.g. "Senior Python Developer") is left out
+        covered = [_words(k) for k in group]
+        group += [k for k in local[field] if not any(_words(k) in c for c in covered)]
+        merged[field] = group
+    return merged, dropped
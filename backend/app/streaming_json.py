@@ -0,0 +1,60 @@
+import json
+
+
+class ObjectStreamParser:
+    """
+    Incrementally parses a JSON object that arrives in chunks and reports
+    each top-level member as soon as its value is complete.
+
+        parser = ObjectStreamParser()
+        for chunk in chunks:
+            for key, value in parser.feed(chunk):
+                ...
+    """
+
+    def __init__(self):
+        self._buf = []
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._member_start = None
+        self.done = False
+
+    def feed(self, chunk):
+        """Consumes a chunk and returns the (key, value) pairs it completed."""
+        self._buf.append(chunk)
+        text = "".join(self._buf)
+        self._buf = [text]
+        members = []
+        for pos in range(self._pos, len(text)):
+            ch = text[pos]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+                if self._depth == 1:
+                    self._member_start = pos + 1
+            elif ch in "}]":
+                if self._depth == 1:
+                    members += self._member(text, pos)
+                    self.done = True
+                self._depth -= 1
+            elif ch == "," and self._depth == 1:
+                members += self._member(text, pos)
+                self._member_start = pos + 1
+        self._pos = len(text)
+        return members
+
+    def _member(self, text, end):
+        segment = text[self._member_start:end].strip()
+        if not segment:
+            return []
+        return list(json.loads("{" + segment + "}").items())
@@ -0,0 +1,406 @@
+"""
+Metrics, trace spans and structured logging.
+
+- Counters and histograms render in the Prometheus text format (GET /metrics).
+- span() times a block, records it in span_seconds and, with tracing on,
+  logs it with trace/span ids. Ids live in a context variable, so they follow
+  the request into awaited code, asyncio tasks and asyncio.to_thread.
+- get_logger() returns a logger taking key=value fields. Records are handed
+  to a background thread for formatting and output, so logging never blocks
+  the caller on I/O.
+"""
+import asyncio
+import atexit
+import contextvars
+import functools
+import json
+import logging
+import queue
+import secrets
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _label_text(names, values):
+    if not names:
+        return ""
+    pairs = (f'{n}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+             for n, v in zip(names, values))
+    return "{" + ",".join(pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_text(self.labels, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._values.items()):
+                for bound, count in zip(self.buckets + ("+Inf",), series[:len(self.buckets)] + [series[-1]]):
+                    labels = _label_text(self.labels + ("le",), key + (bound,))
+                    lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _label_text(self.labels, key)
+                lines.append(f"{self.name}_sum{labels} {round(series[-2], 6)}")
+                lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+def _register(cls, name, help, labels, **kwargs):
+    with _metrics_lock:
+        metric = _metrics.get(name)
+        if metric is None:
+            metric = _metrics[name] = cls(name, help, labels, **kwargs)
+        return metric
+
+
+def counter(name, help, labels=()):
+    """Registers (or returns the existing) counter with this name."""
+    return _register(Counter, name, help, labels)
+
+
+def histogram(name, help, labels=(), buckets=DEFAULT_BUCKETS):
+    """Registers (or returns the existing) histogram with this name."""
+    return _register(Histogram, name, help, labels, buckets=buckets)
+
+
+def render_metrics():
+    """All registered metrics in the Prometheus text exposition format."""
+    with _metrics_lock:
+        metrics = list(_metrics.values())
+    lines = []
+    for metric in metrics:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+
+span_seconds = histogram("span_seconds", "Duration of traced operations.", ("span", "outcome"))
+
+# --- Tracing ---
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_tracing = False
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attrs", "started")
+
+    def __init__(self, name, trace_id, parent_id, attrs):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attrs = attrs
+        self.started = time.perf_counter()
+
+    def traceparent(self):
+        """W3C traceparent header value for calls made under this span."""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+
+def parse_traceparent(value):
+    """(trace_id, parent span id) from a W3C traceparent header, or None if malformed."""
+    parts = (value or "").strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    return parts[1], parts[2]
+
+
+def current_span():
+    return _current_span.get()
+
+
+@contextmanager
+def span(name, traceparent=None, **attrs):
+    """
+    Times a block as a span nested under the current one (or under an
+    incoming traceparent header). Yields the Span; set span.attrs to annotate it.
+    Only use within one function or coroutine, not across yields of a generator.
+    """
+    parent = _current_span.get()
+    remote = parse_traceparent(traceparent) if traceparent else None
+    if remote:
+        trace_id, parent_id = remote
+    elif parent:
+        trace_id, parent_id = parent.trace_id, parent.span_id
+    else:
+        trace_id, parent_id = secrets.token_hex(16), None
+    current = Span(name, trace_id, parent_id, attrs)
+    token = _current_span.set(current)
+    outcome = "ok"
+    try:
+        yield current
+    except BaseException as e:
+        outcome = "cancelled" if isinstance(e, asyncio.CancelledError) else "error"
+        current.attrs["error"] = type(e).__name__
+        raise
+    finally:
+        _current_span.reset(token)
+        duration = time.perf_counter() - current.started
+        span_seconds.observe(duration, span=name, outcome=outcome)
+        if _tracing:
+            _trace_log.info("span", span=name, duration_ms=round(duration * 1000, 2), outcome=outcome,
+                            trace_id=trace_id, span_id=current.span_id, parent_id=parent_id, **current.attrs)
+
+
+def traced(name, metric=None, **labels):
+    """
+    Decorator running a sync or async function inside span(name); if metric
+    (a histogram with an 'outcome' label: ok, error or cancelled) is given,
+    its duration is recorded there too.
+    """
+    def decorate(fn):
+        def record(started, outcome):
+            if metric is not None:
+                metric.observe(time.perf_counter() - started, outcome=outcome, **labels)
+
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                started, outcome = time.perf_counter(), "error"
+                try:
+                    with span(name, **labels):
+                        result = await fn(*args, **kwargs)
+                    outcome = "ok"
+                    return result
+                except asyncio.CancelledError:
+                    outcome = "cancelled"
+                    raise
+                finally:
+                    record(started, outcome)
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                started, outcome = time.perf_counter(), "error"
+                try:
+                    with span(name, **labels):
+                        result = fn(*args, **kwargs)
+                    outcome = "ok"
+                    return result
+                finally:
+                    record(started, outcome)
+        return wrapper
+    return decorate
+
+
+async def observe_stream(chunks, first_event, duration, started=None, **labels):
+    """
+    Passes a streamed response body through, recording the time from `started`
+    (perf_counter; defaults to now) to the first chunk and to the end.
+    """
+    started = started or time.perf_counter()
+    first = True
+    try:
+        async for chunk in chunks:
+            if first:
+                first_event.observe(time.perf_counter() - started, **labels)
+                first = False
+            yield chunk
+    finally:
+        duration.observe(time.perf_counter() - started, **labels)
+
+
+http_request_seconds = histogram(
+    "http_request_seconds", "HTTP request time until the response body is fully sent.", ("method", "route", "status")
+)
+
+
+class TelemetryMiddleware:
+    """
+    ASGI middleware wrapping each HTTP request in a span (continuing an
+    incoming traceparent header) and recording http_request_seconds by route
+    template. The response carries a traceparent header for the request's span.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope.get("headers") or [])
+        traceparent = headers.get(b"traceparent", b"").decode("latin-1") or None
+        started = time.perf_counter()
+        status = 500
+
+        with span("http", traceparent=traceparent, method=scope["method"], path=scope["path"]) as current:
+            async def send_with_trace(message):
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"traceparent", current.traceparent().encode())
+                    ]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_trace)
+            finally:
+                current.attrs["status"] = status
+                # Route templates keep label cardinality bounded (/analysis-jobs/{job_id})
+                route = getattr(scope.get("route"), "path", None) or "unmatched"
+                http_request_seconds.observe(time.perf_counter() - started,
+                                             method=scope["method"], route=route, status=status)
+
+
+# --- Logging ---
+
+class StructuredLogger:
+    """Logger taking an event name plus key=value fields: log.info("gemini_call", latency_ms=12)."""
+
+    def __init__(self, name):
+        self._logger = logging.getLogger(f"jobrec.{name}")
+
+    def _log(self, level, event, fields, exc_info=None):
+        if self._logger.isEnabledFor(level):
+            self._logger.log(level, event, exc_info=exc_info, extra={"fields": fields})
+
+    def debug(self, event, **fields):
+        self._log(logging.DEBUG, event, fields)
+
+    def info(self, event, **fields):
+        self._log(logging.INFO, event, fields)
+
+    def warning(self, event, **fields):
+        self._log(logging.WARNING, event, fields)
+
+    def error(self, event, **fields):
+        self._log(logging.ERROR, event, fields)
+
+    def exception(self, event, **fields):
+        self._log(logging.ERROR, event, fields, exc_info=True)
+
+
+def get_logger(name):
+    return StructuredLogger(name)
+
+
+_trace_log = get_logger("trace")
+
+
+class _ContextQueueHandler(QueueHandler):
+    """Queues records for the listener thread, first capturing what only the calling thread knows."""
+
+    def prepare(self, record):
+        current = _current_span.get()
+        record.trace_id = current.trace_id if current else None
+        record.span_id = current.span_id if current else None
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name.removeprefix("jobrec."),
+            "event": record.getMessage(),
+        }
+        if getattr(record, "trace_id", None):
+            entry["trace_id"] = record.trace_id
+            entry.setdefault("span_id", record.span_id)
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        fields = " ".join(f"{k}={v}" for k, v in getattr(record, "fields", {}).items())
+        line = f"{self.formatTime(record)} {record.levelname:<7} {record.name.removeprefix('jobrec.')}: {record.getMessage()}"
+        if fields:
+            line += f" {fields}"
+        if getattr(record, "trace_id", None):
+            line += f" trace_id={record.trace_id}"
+        if record.exc_text:
+            line += "\n" + record.exc_text
+        return line
+
+
+_listener = None
+
+
+def configure(level="INFO", fmt="text", tracing=False, stream=None):
+    """
+    Sets up the 'jobrec' loggers (idempotent): level, 'text' or 'json' output
+    on stderr via a background thread, and whether spans are logged.
+    """
+    global _listener, _tracing
+    _tracing = tracing
+    root = logging.getLogger("jobrec")
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    if _listener is not None:
+        return
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(JSONFormatter() if fmt == "json" else TextFormatter())
+    records = queue.SimpleQueue()
+    root.addHandler(_ContextQueueHandler(records))
+    root.propagate = False
+    _listener = QueueListener(records, handler)
+    _listener.start()
+    atexit.register(_listener.stop)
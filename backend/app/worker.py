@@ -0,0 +1,42 @@
+"""
+Standalone worker for background analysis jobs, so analysis can be scaled
+separately from the API. Needs a store shared with the API:
+
+    JOBS_BACKEND=sqlite python -m app.worker
+"""
+import asyncio
+
+from .analysis_jobs import WorkerPool
+from .services import (
+    analysis_job_store,
+    run_analysis_job,
+    cleanup_analysis_job,
+    JOBS_WORKERS,
+    JOBS_MAX_ATTEMPTS,
+)
+from .telemetry import get_logger
+
+log = get_logger("worker")
+
+
+async def main():
+    pool = WorkerPool(
+        analysis_job_store,
+        run_analysis_job,
+        workers=max(JOBS_WORKERS, 1),
+        max_attempts=JOBS_MAX_ATTEMPTS,
+        cleanup=cleanup_analysis_job,
+    )
+    pool.start()
+    log.info("worker_started", worker=pool.name, workers=pool.workers)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await pool.stop()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,46 @@
+"""Synthetic resume PDFs of varying size for the benchmarks."""
+import random
+
+import pymupdf
+
+from .fakes import WORDS, TITLES
+
+# name -> pages
+SIZES = {"small": 1, "medium": 4, "large": 20, "xlarge": 60}
+
+SECTIONS = ("Summary", "Experience", "Skills", "Projects", "Education", "Certifications")
+
+
+def resume_lines(rng, pages, person):
+    lines = [f"Candidate {person}", rng.choice(TITLES), f"candidate{person}@example.com"]
+    for page in range(pages):
+        for section in SECTIONS:
+            lines.append(section.upper())
+            for _ in range(6):
+                lines.append(" ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 12))))
+        lines.append(f"Page {page + 1} of {pages}")
+    return lines
+
+
+def make_resume_pdf(pages=1, seed=0, person=None):
+    """Bytes of a deterministic resume PDF with about `pages` pages."""
+    rng = random.Random(seed)
+    doc = pymupdf.open()
+    lines = resume_lines(rng, pages, person if person is not None else seed)
+    per_page = -(-len(lines) // pages)
+    for start in range(0, len(lines), per_page):
+        page = doc.new_page()
+        page.insert_text((50, 50), "\n".join(lines[start:start + per_page]), fontsize=8)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def build_corpus(sizes=None, per_size=3, seed=0):
+    """[(name, pdf bytes)] with per_size distinct documents for each size."""
+    sizes = sizes or list(SIZES)
+    return [
+        (f"{size}-{n}", make_resume_pdf(SIZES[size], seed=seed * 1000 + i * 100 + n))
+        for i, size in enumerate(sizes)
+        for n in range(per_size)
+    ]
@@ -0,0 +1,288 @@
+"""
+Deterministic local stand-ins for genai.GenerativeModel and ApifyClient,
+so the whole pipeline can be exercised without network access or keys.
+
+Latency is drawn from latency ± jitter seconds with a seeded RNG; a failed
+call (error_rate) raises like the real client would.
+"""
+import asyncio
+import json
+import random
+import threading
+import time
+
+WORDS = (
+    "python django fastapi react typescript docker kubernetes aws gcp sql postgres redis kafka "
+    "microservices testing ci cd leadership mentoring design architecture performance scaling "
+    "machine learning data pipelines analytics api security cloud backend frontend mobile"
+).split()
+
+TITLES = ("Software Engineer", "Backend Developer", "Full Stack Developer", "Data Engineer",
+          "Machine Learning Engineer", "DevOps Engineer", "Frontend Developer", "Python Developer")
+
+
+class FakeServiceError(RuntimeError):
+    """Injected failure of a fake client call."""
+
+
+class _Timing:
+    def __init__(self, latency, jitter, error_rate, seed):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+
+    def draw(self):
+        """(delay seconds, should fail) for one call."""
+        with self._lock:
+            self.calls += 1
+            delay = max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+            fail = self._rng.random() < self.error_rate
+            self.errors += fail
+            return delay, fail
+
+    def words(self, n):
+        with self._lock:
+            return " ".join(self._rng.choice(WORDS) for _ in range(n))
+
+
+class _Part:
+    def __init__(self, text):
+        self.text = text
+
+
+class _Content:
+    def __init__(self, text):
+        self.parts = [_Part(text)]
+
+
+class _Candidate:
+    def __init__(self, text, finish_reason=1):
+        self.content = _Content(text)
+        self.finish_reason = finish_reason
+
+
+class _Usage:
+    def __init__(self, prompt, text, cached=""):
+        self.prompt_token_count = (len(cached) + len(prompt)) // 4
+        self.cached_content_token_count = len(cached) // 4
+        self.candidates_token_count = len(text) // 4
+        self.total_token_count = self.prompt_token_count + self.candidates_token_count
+
+    def __repr__(self):
+        return f"Usage(prompt={self.prompt_token_count}, candidates={self.candidates_token_count})"
+
+
+class FakeResponse:
+    def __init__(self, prompt, text, cached=""):
+        self.text = text
+        self.candidates = [_Candidate(text)]
+        self.usage_metadata = _Usage(prompt, text, cached)
+
+
+class FakeStreamResponse(FakeResponse):
+    """Async-iterable response that yields the answer in chunk_chars pieces over the call's latency."""
+
+    def __init__(self, prompt, text, delay, chunk_chars, cached=""):
+        super().__init__(prompt, text, cached)
+        self._delay = delay
+        self._chunk_chars = chunk_chars
+
+    async def __aiter__(self):
+        pieces = [self.text[i:i + self._chunk_chars] for i in range(0, len(self.text), self._chunk_chars)]
+        for piece in pieces:
+            await asyncio.sleep(self._delay / max(len(pieces), 1))
+            yield _Part(piece)
+
+
+class FakeGenerativeModel:
+    """
+    Answers like Gemini for the prompts services.py sends: titles and
+    technologies for keyword requests, every section for single-shot
+    (response_schema) requests and output_chars of text otherwise.
+    with_cached_context() returns a model whose requests report the cached
+    prefix as cached prompt tokens, like one bound to Gemini cached content.
+    """
+
+    def __init__(self, latency=0.5, jitter=0.2, error_rate=0.0, output_chars=1200, chunk_chars=40, seed=0):
+        self.timing = _Timing(latency, jitter, error_rate, seed)
+        self.output_chars = output_chars
+        self.chunk_chars = chunk_chars
+        self.cached = ""
+        self.contexts_created = 0
+
+    def with_cached_context(self, prefix):
+        self.contexts_created += 1
+        bound = object.__new__(FakeGenerativeModel)
+        bound.__dict__.update(self.__dict__, cached=prefix)
+        return bound
+
+    def _answer(self, prompt, generation_config):
+        schema = getattr(generation_config, "response_schema", None) or {}
+        if "titles" in schema.get("properties", {}):
+            return json.dumps({"titles": list(TITLES[:4]), "technologies": WORDS[:6]})
+        if getattr(generation_config, "response_mime_type", None) == "application/json":
+            return json.dumps({
+                "summary": self._text(), "gaps": self._text(), "roadmap": self._text(),
+                "keywords": list(TITLES[:4]) + WORDS[:6],
+            })
+        return self._text()
+
+    def _text(self):
+        text = self.timing.words(self.output_chars // 6)
+        return text[:self.output_chars]
+
+    def generate_content(self, prompt, generation_config=None, **kwargs):
+        delay, fail = self.timing.draw()
+        time.sleep(delay)
+        if fail:
+            raise FakeServiceError("429 Resource exhausted (injected)")
+        return FakeResponse(prompt, self._answer(prompt, generation_config), self.cached)
+
+    async def generate_content_async(self, prompt, generation_config=None, stream=False, **kwargs):
+        delay, fail = self.timing.draw()
+        if fail:
+            await asyncio.sleep(delay)
+            raise FakeServiceError("429 Resource exhausted (injected)")
+        text = self._answer(prompt, generation_config)
+        if stream:
+            # The first chunk arrives after a fraction of the latency, like a real stream
+            await asyncio.sleep(delay * 0.2)
+            return FakeStreamResponse(prompt, text, delay * 0.8, self.chunk_chars, self.cached)
+        await asyncio.sleep(delay)
+        return FakeResponse(prompt, text, self.cached)
+
+
+class _FakeRun:
+    """A run whose dataset fills up evenly over its drawn duration."""
+
+    def __init__(self, client, run_input, duration, fail):
+        self.id = f"run-{client.timing.calls}"
+        # LinkedIn actor input, or the Naukri actor's keyword/maxJobs
+        self.naukri = "keyword" in run_input
+        self.title = run_input.get("keyword" if self.naukri else "title", "")
+        self.location = run_input.get("location", "India" if self.naukri else "")
+        self.rows = run_input.get("maxJobs" if self.naukri else "rows", 10)
+        self.duration = duration
+        self.fail = fail
+        self.started = time.monotonic()
+        self.aborted = False
+
+    def progress(self):
+        return 1.0 if self.duration <= 0 else min(1.0, (time.monotonic() - self.started) / self.duration)
+
+    def status(self):
+        if self.aborted:
+            return "ABORTED"
+        if self.progress() < 1.0:
+            return "RUNNING"
+        return "FAILED" if self.fail else "SUCCEEDED"
+
+    def available(self):
+        if self.fail:
+            return 0
+        # The first results show up after a fifth of the run
+        return int(self.rows * max(0.0, self.progress() - 0.2) / 0.8) if self.progress() < 1.0 else self.rows
+
+
+class _FakeActor:
+    def __init__(self, client):
+        self._client = client
+
+    def start(self, run_input=None, **kwargs):
+        delay, fail = self._client.timing.draw()
+        run = _FakeRun(self._client, run_input or {}, delay, fail)
+        self._client.runs[run.id] = run
+        return {"id": run.id, "defaultDatasetId": run.id, "status": "RUNNING"}
+
+    def call(self, run_input=None, **kwargs):
+        run = self.start(run_input)
+        fake = self._client.runs[run["id"]]
+        time.sleep(fake.duration)
+        if fake.fail:
+            raise FakeServiceError("Actor run failed (injected)")
+        return dict(run, status="SUCCEEDED")
+
+
+class _Page:
+    def __init__(self, items):
+        self.items = items
+        self.count = len(items)
+
+
+class _FakeDataset:
+    def __init__(self, client, dataset_id):
+        self._client = client
+        self._run = client.runs[dataset_id]
+
+    def list_items(self, offset=0, limit=None, **kwargs):
+        run = self._run
+        end = run.available() if limit is None else min(run.available(), (offset or 0) + limit)
+        make = self._client.make_naukri_job if run.naukri else self._client.make_job
+        return _Page([make(run.title, run.location, n) for n in range(offset or 0, end)])
+
+    def iterate_items(self):
+        yield from self.list_items(0).items
+
+
+class _FakeRunClient:
+    def __init__(self, run):
+        self._run = run
+
+    def get(self):
+        return {"id": self._run.id, "status": self._run.status()}
+
+    def abort(self, **kwargs):
+        if self._run.status() == "RUNNING":
+            self._run.aborted = True
+            self._run.duration = 0
+        return self.get()
+
+
+class FakeApifyClient:
+    """
+    LinkedIn and Naukri actor stand-in: each run takes the drawn latency, its
+    dataset filling with `rows` postings as it goes. Failed runs end FAILED with no items.
+    """
+
+    def __init__(self, latency=3.0, jitter=1.0, error_rate=0.0, description_chars=2000, seed=0):
+        self.timing = _Timing(latency, jitter, error_rate, seed)
+        self.description_chars = description_chars
+        self.runs = {}
+
+    def make_job(self, title, location, n):
+        key = f"{title}-{location}-{n}".lower().replace(" ", "-")
+        return {
+            "id": key,
+            "title": f"{TITLES[n % len(TITLES)]} ({title})",
+            "companyName": f"Company {n % 17}",
+            "location": location or "Remote",
+            "link": f"https://www.linkedin.com/jobs/view/{key}",
+            "postedAt": "2024-01-01",
+            "descriptionText": self.timing.words(self.description_chars // 6)[:self.description_chars],
+        }
+
+    def make_naukri_job(self, title, location, n):
+        job = self.make_job(title, location, n)
+        return {
+            "jobId": job["id"],
+            "title": job["title"],
+            "companyName": job["companyName"],
+            "location": job["location"],
+            "jobUrl": job["link"].replace("linkedin.com/jobs/view", "naukri.com/job-listings"),
+            "createdDate": job["postedAt"],
+            "tagsAndSkills": ",".join(WORDS[n % len(WORDS):n % len(WORDS) + 4]),
+            "jobDescription": job["descriptionText"],
+        }
+
+    def actor(self, actor_id):
+        return _FakeActor(self)
+
+    def dataset(self, dataset_id):
+        return _FakeDataset(self, dataset_id)
+
+    def run(self, run_id):
+        return _FakeRunClient(self.runs[run_id])
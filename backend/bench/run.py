@@ -0,0 +1,277 @@
+"""
+Offline benchmark of the API and MCP tools against fake Gemini and Apify clients.
+
+    cd backend && python -m bench.run --requests 50 --concurrency 8
+    python -m bench.run --scenarios analyze --gemini-latency 1.0 --gemini-error-rate 0.05
+    python -m bench.run --json bench.json                      # save results
+    python -m bench.run --baseline bench.json                  # exit 1 on regressions
+
+Reports latency percentiles, throughput, process RSS and event-loop lag per
+scenario. Requests go through the ASGI app in-process, so no server,
+network access or API keys are needed.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+
+SCENARIOS = ("extract", "analyze", "jobs", "mcp")
+
+
+def rss_mb():
+    """Current resident set size of this process in MB."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Peak RSS where /proc is unavailable (KB on Linux, bytes on macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+class LoopMonitor:
+    """Samples event-loop lag (how late a timer fires) and RSS while a scenario runs."""
+
+    def __init__(self, interval=0.02):
+        self.interval = interval
+        self.lags = []
+        self.rss = []
+        self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, time.perf_counter() - started - self.interval))
+            self.rss.append(rss_mb())
+
+    def __enter__(self):
+        self.rss.append(rss_mb())
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        self._task.cancel()
+        self.rss.append(rss_mb())
+
+
+def _ms(values, q):
+    return round(float(np.percentile(values, q)) * 1000, 1) if len(values) else 0.0
+
+
+async def drive(name, call, requests, concurrency):
+    """Runs call(i) for i in range(requests) with at most `concurrency` in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = []
+
+    async def one(i):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await call(i)
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+            latencies.append(time.perf_counter() - started)
+
+    with LoopMonitor() as monitor:
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "scenario": name,
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "seconds": round(elapsed, 2),
+        "throughput_rps": round(requests / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {"p50": _ms(latencies, 50), "p95": _ms(latencies, 95),
+                       "p99": _ms(latencies, 99), "max": _ms(latencies, 100)},
+        "loop_lag_ms": {"p50": _ms(monitor.lags, 50), "p99": _ms(monitor.lags, 99), "max": _ms(monitor.lags, 100)},
+        "rss_mb": {"start": round(monitor.rss[0], 1), "peak": round(max(monitor.rss), 1),
+                   "end": round(monitor.rss[-1], 1)},
+    }
+
+
+def setup(args):
+    """Imports the app with fake clients installed. Must run before anything imports app.services."""
+    os.environ.setdefault("JOB_INDEX_PATH", ":memory:")
+    os.environ.setdefault("JOBS_WORKERS", "0")
+    # Fake actor runs take seconds, so poll their datasets more often than a real deployment would
+    os.environ.setdefault("APIFY_POLL_INTERVAL", "0.1")
+    os.environ.setdefault("ANALYSIS_CACHE_BACKEND", "memory" if args.cache else "none")
+    if args.context_cache:
+        os.environ.setdefault("GEMINI_CONTEXT_CACHE", "1")
+    # The app logs every request and Gemini call; keep it out of the report unless asked
+    os.environ.setdefault("LOG_LEVEL", "INFO" if args.verbose else "WARNING")
+
+    from app import services
+    from app.cache import SingleFlightCache
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    from .fakes import FakeGenerativeModel, FakeApifyClient
+
+    model = FakeGenerativeModel(
+        latency=args.gemini_latency, jitter=args.gemini_jitter, error_rate=args.gemini_error_rate,
+        output_chars=args.gemini_output_chars, seed=args.seed,
+    )
+    services.gemini_model.set(model)
+    services.create_resume_context = lambda text: model.with_cached_context(services.resume_prefix(text))
+    services.apify_client.set(FakeApifyClient(
+        latency=args.apify_latency, jitter=args.apify_jitter, error_rate=args.apify_error_rate,
+        description_chars=args.apify_description_chars, seed=args.seed,
+    ))
+    if not args.cache:
+        # Every search reaches the (fake) actor; concurrent identical searches still coalesce
+        services.job_search_cache = SingleFlightCache(ttl=0, stale_ttl=0)
+    return services
+
+
+async def run_scenarios(args, services):
+    import httpx
+    from app import main, mcp_server
+    from .corpus import build_corpus, SIZES
+
+    corpus = build_corpus(per_size=args.per_size, seed=args.seed)
+    analysis_docs = [(name, pdf) for name, pdf in corpus if not name.startswith("xlarge")]
+    texts = [services.extract_text_from_pdf(pdf) for _, pdf in analysis_docs]
+    titles = ["Python Developer", "Data Engineer", "Backend Developer", "DevOps Engineer", "React Developer"]
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench", timeout=600)
+    results = []
+
+    async def analyze(i):
+        name, pdf = analysis_docs[i % len(analysis_docs)]
+        response = await client.post(
+            "/analyze-resume",
+            data={"mode": args.mode, "deltas": "true"},
+            files={"file": (f"{name}.pdf", pdf, "application/pdf")},
+        )
+        response.raise_for_status()
+        if '"step": "done"' not in response.text:
+            raise RuntimeError("analysis stream ended without a done event")
+
+    async def jobs(i):
+        # Distinct keyword pairs so most requests miss the job search cache
+        keywords = f"{titles[i % len(titles)]} {i},{titles[(i + 1) % len(titles)]} {i}"
+        response = await client.get("/fetch-jobs", params={"keywords": keywords})
+        response.raise_for_status()
+
+    async def mcp(i):
+        tool = i % 4
+        if tool == 0:
+            await mcp_server.parse_pdf(analysis_docs[i % len(analysis_docs)][1])
+        elif tool == 1:
+            aspect = ("summary", "gaps", "roadmap", "keywords")[i % 4]
+            await mcp_server.analyze_resume_text(texts[i % len(texts)], aspect)
+        elif tool == 2:
+            await mcp_server.analyze_resume_full(texts[i % len(texts)])
+        else:
+            await mcp_server.get_job_recommendations(f"{titles[i % len(titles)]} {i}")
+
+    for scenario in args.scenarios:
+        if scenario == "extract":
+            for size in SIZES:
+                docs = [pdf for name, pdf in corpus if name.startswith(f"{size}-")]
+                call = lambda i, docs=docs: asyncio.to_thread(services.extract_pdf, docs[i % len(docs)])
+                results.append(await drive(f"extract:{size}", call, args.extract_requests, args.concurrency))
+        elif scenario == "analyze":
+            results.append(await drive("analyze", analyze, args.requests, args.concurrency))
+        elif scenario == "jobs":
+            results.append(await drive("jobs", jobs, args.requests, args.concurrency))
+        elif scenario == "mcp":
+            results.append(await drive("mcp", mcp, args.requests, args.concurrency))
+
+    await client.aclose()
+    return results
+
+
+def compare(results, baseline, max_regression):
+    """Regressions of p95 latency or throughput beyond max_regression (a fraction) versus a saved run."""
+    previous = {r["scenario"]: r for r in baseline["results"]}
+    problems = []
+    for result in results:
+        old = previous.get(result["scenario"])
+        if not old:
+            continue
+        if result["latency_ms"]["p95"] > old["latency_ms"]["p95"] * (1 + max_regression):
+            problems.append(f"{result['scenario']}: p95 {old['latency_ms']['p95']}ms -> {result['latency_ms']['p95']}ms")
+        if result["throughput_rps"] < old["throughput_rps"] * (1 - max_regression):
+            problems.append(f"{result['scenario']}: throughput {old['throughput_rps']} -> {result['throughput_rps']} req/s")
+        if result["errors"] > old["errors"]:
+            problems.append(f"{result['scenario']}: errors {old['errors']} -> {result['errors']}")
+    return problems
+
+
+def print_table(results):
+    print(f"{'scenario':<16}{'req':>6}{'err':>5}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}"
+          f"{'lag p99':>9}{'rss peak':>10}")
+    for r in results:
+        lat = r["latency_ms"]
+        print(f"{r['scenario']:<16}{r['requests']:>6}{r['errors']:>5}{r['throughput_rps']:>9}"
+              f"{lat['p50']:>9}{lat['p95']:>9}{lat['p99']:>9}{r['loop_lag_ms']['p99']:>9}{r['rss_mb']['peak']:>10}")
+    print("(latencies in ms, RSS in MB)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        type=lambda s: [x for x in s.split(",") if x], help="comma-separated: " + ", ".join(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=40, help="requests per scenario")
+    parser.add_argument("--extract-requests", type=int, default=20, help="extractions per corpus size")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--mode", default="concurrent", choices=("concurrent", "sequential", "single_shot"))
+    parser.add_argument("--per-size", type=int, default=3, help="corpus documents per size")
+    parser.add_argument("--cache", action="store_true", help="keep analysis/job caches on (off by default)")
+    parser.add_argument("--context-cache", action="store_true", help="register resumes as Gemini cached context")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--gemini-latency", type=float, default=0.5)
+    parser.add_argument("--gemini-jitter", type=float, default=0.2)
+    parser.add_argument("--gemini-error-rate", type=float, default=0.0)
+    parser.add_argument("--gemini-output-chars", type=int, default=1200)
+    parser.add_argument("--apify-latency", type=float, default=2.0)
+    parser.add_argument("--apify-jitter", type=float, default=0.5)
+    parser.add_argument("--apify-error-rate", type=float, default=0.0)
+    parser.add_argument("--apify-description-chars", type=int, default=2000)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="results file of an earlier run to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="allowed fractional slowdown versus --baseline")
+    parser.add_argument("--verbose", action="store_true", help="show the app's own log output")
+    args = parser.parse_args(argv)
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    services = setup(args)
+    results = asyncio.run(run_scenarios(args, services))
+
+    print_table(results)
+    report = {"config": {k: v for k, v in vars(args).items() if k not in ("json", "baseline")}, "results": results}
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = compare(results, json.load(f), args.max_regression)
+        for problem in problems:
+            print(f"REGRESSION {problem}")
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
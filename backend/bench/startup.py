@@ -0,0 +1,162 @@
+"""
+Cold-start benchmark: import time of the app modules, and how long a fresh
+MCP stdio server takes to answer the handshake and its first tool call.
+
+    cd backend && python -m bench.startup
+    python -m bench.startup --runs 10 --prewarm
+    python -m bench.startup --json startup.json              # save results
+    python -m bench.startup --baseline startup.json          # exit 1 on regressions
+
+Every measurement runs in a new process, as each agent session does, and
+the median of --runs is reported. No API keys or network access are needed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+MODULES = ("app.services", "app.mcp_server", "app.main")
+
+IMPORT_SCRIPT = """
+import time
+started = time.perf_counter()
+import {module}
+print(time.perf_counter() - started)
+"""
+
+API_SCRIPT = """
+import asyncio, time
+started = time.perf_counter()
+import httpx
+from app.main import app
+
+async def first_response():
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://startup") as client:
+        (await client.get("/health")).raise_for_status()
+
+asyncio.run(first_response())
+print(time.perf_counter() - started)
+"""
+
+
+def child_env(prewarm):
+    env = dict(os.environ)
+    env.update(JOB_INDEX_PATH=":memory:", JOBS_WORKERS="0", ANALYSIS_CACHE_BACKEND="none",
+               LOG_LEVEL="WARNING", PREWARM="1" if prewarm else "0")
+    return env
+
+
+def time_script(script, env):
+    """Seconds printed by a script run in a fresh interpreter."""
+    out = subprocess.run([sys.executable, "-c", script], cwd=BACKEND, env=env,
+                         capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+async def time_mcp_session(pdf_path, env):
+    """Seconds from spawning a stdio MCP server to its handshake, first and second tool responses."""
+    from mcp import ClientSession, StdioServerParameters
+    from mcp.client.stdio import stdio_client
+
+    params = StdioServerParameters(command=sys.executable, cwd=str(BACKEND), env=env,
+                                   args=["-c", "from app.mcp_server import mcp; mcp.run()"])
+    started = time.perf_counter()
+    with open(os.devnull, "w") as errlog:
+        async with stdio_client(params, errlog=errlog) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                initialized = time.perf_counter()
+                result = await session.call_tool("parse_pdf_file", {"path": pdf_path})
+                first = time.perf_counter()
+                if result.isError:
+                    raise RuntimeError(result.content[0].text)
+                await session.call_tool("parse_pdf_file", {"path": pdf_path})
+                second = time.perf_counter()
+    return initialized - started, first - started, second - first
+
+
+def measure(args):
+    env = child_env(args.prewarm)
+    samples = {}
+
+    def add(name, seconds):
+        samples.setdefault(name, []).append(seconds)
+
+    from .corpus import make_resume_pdf
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "resume.pdf")
+        with open(pdf_path, "wb") as f:
+            f.write(make_resume_pdf(pages=2))
+        for _ in range(args.runs):
+            for module in MODULES:
+                add(f"import:{module}", time_script(IMPORT_SCRIPT.format(module=module), env))
+            add("api:first_response", time_script(API_SCRIPT, env))
+            handshake, first_tool, next_tool = asyncio.run(time_mcp_session(pdf_path, env))
+            add("mcp:initialize", handshake)
+            add("mcp:first_tool", first_tool)
+            add("mcp:next_tool", next_tool)
+
+    return [
+        {"measurement": name, "runs": len(values), "median_ms": round(statistics.median(values) * 1000, 1),
+         "max_ms": round(max(values) * 1000, 1)}
+        for name, values in samples.items()
+    ]
+
+
+def compare(results, baseline, max_regression):
+    """Medians that got slower than max_regression (a fraction) versus a saved run."""
+    previous = {r["measurement"]: r for r in baseline["results"]}
+    problems = []
+    for result in results:
+        old = previous.get(result["measurement"])
+        if old and result["median_ms"] > old["median_ms"] * (1 + max_regression):
+            problems.append(f"{result['measurement']}: {old['median_ms']}ms -> {result['median_ms']}ms")
+    return problems
+
+
+def print_table(results):
+    print(f"{'measurement':<24}{'runs':>6}{'median':>10}{'max':>10}")
+    for r in results:
+        print(f"{r['measurement']:<24}{r['runs']:>6}{r['median_ms']:>10}{r['max_ms']:>10}")
+    print("(times in ms; mcp:* are measured from spawning the server)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes per measurement")
+    parser.add_argument("--prewarm", action="store_true",
+                        help="load the SDKs in the background as the server starts (PREWARM=1)")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="results file of an earlier run to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="allowed fractional slowdown versus --baseline")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = measure(args)
+
+    print_table(results)
+    report = {"config": {"runs": args.runs, "prewarm": args.prewarm}, "results": results}
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = compare(results, json.load(f), args.max_regression)
+        for problem in problems:
+            print(f"REGRESSION {problem}")
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
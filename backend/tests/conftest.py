@@ -0,0 +1,71 @@
+"""
+Tests run offline: no Gemini or Apify keys, so nothing calls out, and
+every external call a test needs is replaced with a fake.
+"""
+import os
+import tempfile
+
+import pytest
+
+os.environ["GEMINI_API_KEY"] = ""
+os.environ["APIFY_API_TOKEN"] = ""
+os.environ["JOB_INDEX_PATH"] = ":memory:"
+os.environ["JOBS_UPLOAD_DIR"] = tempfile.mkdtemp(prefix="job_uploads")
+os.environ["BATCH_CHECKPOINT_DIR"] = tempfile.mkdtemp(prefix="batch_checkpoints")
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    """Each test gets an empty analysis cache, so results don't leak between tests."""
+    from app import cache, services
+
+    fresh = cache.make_cache("memory")
+    monkeypatch.setattr(services, "analysis_cache", fresh)
+    return fresh
+
+
+@pytest.fixture
+def make_pdf():
+    """Builds PDF bytes with one page per given string."""
+    import fitz
+
+    def build(*pages, password=None):
+        doc = fitz.open()
+        for text in pages:
+            doc.new_page().insert_text((72, 72), text)
+        options = {"encryption": fitz.PDF_ENCRYPT_AES_256, "user_pw": password} if password else {}
+        data = doc.tobytes(**options)
+        doc.close()
+        return data
+    return build
+
+
+@pytest.fixture
+def job_sources(monkeypatch):
+    """
+    Replaces the job sources with an empty registry (and the job search cache
+    with an empty one); returns add(name, fetch, **kwargs), which registers an
+    enabled JobSource around fetch(query, location, rows, timeout, cancel).
+    """
+    from app import main, services
+    from app.cache import SingleFlightCache
+    from app.job_sources import JobSource, SourceRegistry
+
+    registry = SourceRegistry()
+    for module in (services, main):
+        monkeypatch.setattr(module, "job_sources", registry)
+    monkeypatch.setattr(services, "job_search_cache", SingleFlightCache())
+
+    def add(name, fetch, enabled=True, **kwargs):
+        return registry.register(JobSource(name, fetch=fetch, **kwargs), enabled=enabled)
+    return add
+
+
+@pytest.fixture
+def lazy_value(monkeypatch):
+    """Returns install(lazy, value): the Lazy gives back value (unloaded, as-is) for this test only."""
+    def install(lazy, value):
+        monkeypatch.setattr(lazy, "_value", value)
+        monkeypatch.setattr(lazy, "_loaded", True)
+        return value
+    return install
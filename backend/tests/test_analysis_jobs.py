@@ -0,0 +1,133 @@
+import asyncio
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main, services
+from app.analysis_jobs import MemoryJobStore, QueueFull, SQLiteJobStore, WorkerPool
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryJobStore(max_queued=2, lease=0.05)
+    return SQLiteJobStore(str(tmp_path / "jobs.db"), max_queued=2, lease=0.05)
+
+
+def test_jobs_are_claimed_oldest_first_and_the_queue_is_bounded(store):
+    first = store.enqueue({"n": 1})
+    store.enqueue({"n": 2})
+    with pytest.raises(QueueFull):
+        store.enqueue({"n": 3})
+
+    assert store.claim("w1") == (first, {"n": 1}, 1)
+    assert store.get(first)["status"] == "running"
+    store.enqueue({"n": 3})
+
+
+def test_retry_clears_the_failed_attempts_events(store):
+    job_id = store.enqueue({})
+    store.claim("w1")
+    store.add_event(job_id, {"step": "summary", "status": "complete"})
+    store.retry(job_id, "boom")
+
+    assert store.events(job_id) == []
+    assert store.get(job_id)["error"] == "boom"
+    assert store.claim("w1")[2] == 2
+    seq = store.add_event(job_id, {"step": "summary", "status": "complete"})
+    assert store.events(job_id) == [(seq, {"step": "summary", "status": "complete"})]
+    assert store.events(job_id, after=seq) == []
+
+
+def test_abandoned_running_jobs_are_reclaimed_after_the_lease(store):
+    job_id = store.enqueue({})
+    store.claim("w1")
+    assert store.claim("w2") is None
+    time.sleep(0.06)
+    assert store.claim("w2") == (job_id, {}, 2)
+
+
+def test_finished_jobs_are_purged(store):
+    job_id = store.enqueue({})
+    store.claim("w1")
+    store.finish(job_id)
+    assert store.purge(3600) == 0
+    time.sleep(0.01)
+    assert store.purge(0) == 1
+    assert store.get(job_id) is None
+
+
+def run_pool(store, handler, jobs=1, **kwargs):
+    cleaned = []
+
+    async def main():
+        pool = WorkerPool(store, handler, workers=1, retry_backoff=0, poll_interval=0.01,
+                          cleanup=cleaned.append, **kwargs)
+        ids = [store.enqueue({"n": n}) for n in range(jobs)]
+        pool.start()
+        # Cleanup is the last thing a worker does with a job
+        while len(cleaned) < jobs:
+            await asyncio.sleep(0.01)
+        await pool.stop()
+        return pool, ids
+
+    pool, ids = asyncio.run(asyncio.wait_for(main(), 5))
+    return pool, ids, cleaned
+
+
+def test_worker_retries_and_only_keeps_the_last_attempts_events(store):
+    calls = []
+
+    async def flaky(payload, emit):
+        calls.append(payload)
+        await emit({"step": "summary", "status": "complete", "data": "s"})
+        if len(calls) == 1:
+            raise RuntimeError("gemini down")
+        await emit({"step": "done", "status": "complete", "data": {}})
+
+    pool, (job_id,), cleaned = run_pool(store, flaky)
+
+    events = [event for _, event in store.events(job_id)]
+    assert [(e["step"], e["attempt"]) for e in events] == [("summary", 2), ("done", 2)]
+    assert store.get(job_id)["status"] == "done"
+    assert (pool.completed, pool.retried) == (1, 1)
+    assert cleaned == [{"n": 0}]
+
+
+def test_worker_fails_the_job_after_max_attempts(store):
+    async def broken(payload, emit):
+        raise RuntimeError("bad pdf")
+
+    pool, (job_id,), cleaned = run_pool(store, broken, max_attempts=2)
+
+    assert store.get(job_id)["status"] == "failed"
+    assert [event for _, event in store.events(job_id)] == [
+        {"step": "done", "status": "error", "data": "bad pdf", "attempt": 2}]
+    assert cleaned == [{"n": 0}]
+
+
+def test_background_analysis_end_to_end(monkeypatch, make_pdf):
+    async def analyze(resume_text, *inputs):
+        return ["kw"] if inputs else "text"
+
+    for step, (_, deps) in list(services.ANALYSIS_STEPS.items()):
+        monkeypatch.setitem(services.ANALYSIS_STEPS, step, (analyze, deps))
+
+    with TestClient(main.app) as client:
+        response = client.post("/analyze-resume", data={"background": "true"},
+                               files={"file": ("cv.pdf", make_pdf("Jane Doe"), "application/pdf")})
+        job_id = response.json()["job_id"]
+        deadline = time.monotonic() + 5
+        while (job := client.get(f"/analysis-jobs/{job_id}").json())["status"] != "done":
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+
+        assert job["results"]["summary"] == "text"
+        assert job["results"]["keywords"] == ["kw"]
+        lines = client.get(f"/analysis-jobs/{job_id}/events", params={"after": 0}).text.splitlines()
+        ids = [int(line[4:]) for line in lines if line.startswith("id: ")]
+        replay = client.get(f"/analysis-jobs/{job_id}/events", headers={"Last-Event-ID": str(ids[-2])}).text
+        assert [json.loads(line[6:])["step"] for line in replay.splitlines() if line.startswith("data: ")] == ["done"]
+        assert client.get("/analysis-jobs/unknown").status_code == 404
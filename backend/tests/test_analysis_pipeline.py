@@ -0,0 +1,73 @@
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main, services
+
+
+async def collect(events):
+    return [event async for event in events]
+
+
+@pytest.fixture
+def fake_steps(monkeypatch):
+    """Replaces the analyzers with ones that record when they ran."""
+    calls = []
+
+    def analyzer(name, delay):
+        async def analyze(resume_text, *inputs):
+            calls.append(("start", name, inputs))
+            await asyncio.sleep(delay)
+            calls.append(("end", name, inputs))
+            return f"{name} of {resume_text}"
+        return analyze
+
+    for step, delay in (("summary", 0.05), ("gaps", 0.2), ("roadmap", 0.2), ("keywords", 0.05)):
+        monkeypatch.setitem(services.ANALYSIS_STEPS, step,
+                            (analyzer(step, delay), services.ANALYSIS_STEPS[step][1]))
+    return calls
+
+
+def test_concurrent_steps_overlap_and_keywords_waits_for_summary(fake_steps):
+    started = time.perf_counter()
+    events = asyncio.run(collect(services.run_analysis("cv")))
+    elapsed = time.perf_counter() - started
+
+    # The three independent steps run together, so this takes about one slow step
+    assert elapsed < 0.4
+    starts = [name for kind, name, _ in fake_steps if kind == "start"]
+    assert set(starts[:3]) == {"summary", "gaps", "roadmap"}
+    assert fake_steps.index(("start", "keywords", ("summary of cv",))) > fake_steps.index(
+        ("end", "summary", ()))
+
+    completed = [(step, data) for step, status, data in events if status == "complete"]
+    assert dict(completed) == {step: f"{step} of cv" for step in services.ANALYSIS_STEPS}
+    # Completion order: summary and keywords finish before the slow steps
+    assert [step for step, _ in completed][:2] == ["summary", "keywords"]
+
+
+def test_sequential_mode_runs_steps_in_order(fake_steps):
+    events = asyncio.run(collect(services.run_analysis("cv", concurrent=False)))
+
+    assert [(step, status) for step, status, _ in events] == [
+        (step, status) for step in services.ANALYSIS_STEPS for status in ("processing", "complete")
+    ]
+    assert [name for kind, name, _ in fake_steps if kind == "start"] == list(services.ANALYSIS_STEPS)
+
+
+def test_a_failing_step_raises(monkeypatch, fake_steps):
+    async def broken(resume_text):
+        raise RuntimeError("boom")
+
+    monkeypatch.setitem(services.ANALYSIS_STEPS, "gaps", (broken, ()))
+    with pytest.raises(RuntimeError, match="boom"):
+        asyncio.run(collect(services.run_analysis("cv")))
+
+
+def test_analyze_resume_rejects_unknown_mode():
+    client = TestClient(main.app)
+    response = client.post("/analyze-resume", files={"file": ("cv.pdf", b"%PDF", "application/pdf")},
+                           data={"mode": "parallel"})
+    assert response.status_code == 400
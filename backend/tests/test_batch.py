@@ -0,0 +1,130 @@
+import asyncio
+import io
+import json
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import batch, main, services
+
+
+@pytest.fixture
+def fake_steps(monkeypatch):
+    """Analyzers answer from the resume text; a resume mentioning 'offline' gets Gemini's fallback."""
+    calls = []
+
+    def analyzer(step):
+        async def analyze(resume_text, *inputs):
+            calls.append(step)
+            if "offline" in resume_text:
+                return services.GEMINI_UNAVAILABLE
+            return ["kw"] if step == "keywords" else f"{step} ok"
+        return analyze
+
+    for step, (_, deps) in list(services.ANALYSIS_STEPS.items()):
+        monkeypatch.setitem(services.ANALYSIS_STEPS, step, (analyzer(step), deps))
+    return calls
+
+
+def zip_of(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def test_collect_pdfs_expands_directories_and_zips(tmp_path, make_pdf, monkeypatch):
+    (tmp_path / "dir" / "sub").mkdir(parents=True)
+    (tmp_path / "dir" / "a.pdf").write_bytes(make_pdf("a"))
+    (tmp_path / "dir" / "sub" / "b.PDF").write_bytes(make_pdf("b"))
+    (tmp_path / "dir" / "notes.txt").write_text("skip")
+    monkeypatch.setattr(batch, "PDF_MAX_BYTES", 5000)
+    (tmp_path / "cvs.zip").write_bytes(zip_of({
+        "../../evil.pdf": make_pdf("c"), "big.pdf": b"x" * 6000, "readme.md": "skip"}))
+    workdir = tmp_path / "work"
+    workdir.mkdir()
+
+    documents = batch.collect_pdfs([str(tmp_path / "dir"), str(tmp_path / "cvs.zip")], str(workdir))
+
+    assert [name.rsplit("/", 1)[-1] for name, _ in documents] == ["a.pdf", "b.PDF", "evil.pdf"]
+    assert documents[2][1].startswith(str(workdir))
+    assert len(batch.collect_pdfs([str(tmp_path / "dir")], str(workdir), max_docs=1)) == 1
+
+
+def run(documents, checkpoint):
+    async def collect():
+        return [record async for record in batch.run_batch(documents, checkpoint=checkpoint, concurrency=2)]
+    return asyncio.run(collect())
+
+
+def test_batch_checkpoints_successes_and_retries_fallbacks(tmp_path, make_pdf, fake_steps):
+    documents = []
+    for name in ("jane", "john", "offline"):
+        path = tmp_path / f"{name}.pdf"
+        path.write_bytes(make_pdf(f"{name} resume"))
+        documents.append((f"{name}.pdf", str(path)))
+    checkpoint = str(tmp_path / "results.jsonl")
+
+    records = run(documents, checkpoint)
+    by_name = {r["name"]: r for r in records if "name" in r}
+    assert by_name["jane.pdf"]["status"] == "ok"
+    assert by_name["jane.pdf"]["results"]["keywords"] == ["kw"]
+    assert by_name["offline.pdf"]["status"] == "error"
+    assert by_name["offline.pdf"]["error"].startswith("No analysis for")
+    summary = records[-1]["summary"]
+    assert (summary["documents"], summary["ok"], summary["failed"]) == (3, 2, 1)
+    assert sorted(batch.load_checkpoint(checkpoint)) == sorted(
+        by_name[n]["resume_id"] for n in ("jane.pdf", "john.pdf"))
+
+    # An interrupted write leaves a partial line; the rerun skips it and the done documents
+    with open(checkpoint, "a") as f:
+        f.write('{"status": "ok", "resu')
+    fake_steps.clear()
+    records = run(documents, checkpoint)
+    assert {r["name"]: r.get("resumed", False) for r in records if "name" in r} == {
+        "jane.pdf": True, "john.pdf": True, "offline.pdf": False}
+    assert len(fake_steps) == len(services.ANALYSIS_STEPS)
+
+
+def test_unreadable_documents_are_recorded_as_errors(tmp_path, fake_steps):
+    path = tmp_path / "broken.pdf"
+    path.write_bytes(b"not a pdf")
+    records = run([("broken.pdf", str(path))], None)
+    assert records[0]["status"] == "error"
+    assert records[-1]["summary"]["failed"] == 1
+
+
+def post_batch(files, **data):
+    return TestClient(main.app).post("/analyze-batch", files=[("files", f) for f in files], data=data)
+
+
+def test_analyze_batch_streams_ndjson(make_pdf, fake_steps):
+    response = post_batch([("a.pdf", make_pdf("a"), "application/pdf"),
+                           ("more.zip", zip_of({"b.pdf": make_pdf("b")}), "application/zip")])
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(line["name"] for line in lines[:-1]) == ["a.pdf", "b.pdf"]
+    assert lines[-1]["summary"]["ok"] == 2
+
+
+def test_analyze_batch_limits(make_pdf, fake_steps, monkeypatch):
+    pdf = make_pdf("resume")
+    monkeypatch.setattr(main, "BATCH_MAX_DOCS", 2)
+    response = post_batch([(f"{n}.pdf", pdf, "application/pdf") for n in range(4)])
+    # Files past the document limit are not read
+    assert json.loads(response.text.splitlines()[-1])["summary"]["documents"] == 2
+
+    monkeypatch.setattr(main, "PDF_MAX_BYTES", len(pdf) - 1)
+    response = post_batch([("big.pdf", pdf, "application/pdf")])
+    assert response.status_code == 413
+    assert response.json()["detail"].startswith("big.pdf:")
+
+    monkeypatch.setattr(main, "PDF_MAX_BYTES", len(pdf))
+    monkeypatch.setattr(main, "BATCH_MAX_BYTES", len(pdf) + 10)
+    response = post_batch([("a.pdf", pdf, "application/pdf"), ("b.pdf", pdf, "application/pdf")])
+    assert response.status_code == 413
+    assert "batch exceeds" in response.json()["detail"]
+
+    assert post_batch([("a.pdf", pdf, "application/pdf")], batch_id="../x").status_code == 400
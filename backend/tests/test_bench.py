@@ -0,0 +1,98 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import fitz
+import pytest
+
+from app import services
+from bench import run
+from bench.corpus import build_corpus, make_resume_pdf
+from bench.fakes import FakeApifyClient, FakeGenerativeModel, FakeServiceError
+
+
+def test_fake_gemini_answers_like_the_real_one():
+    model = FakeGenerativeModel(latency=0, jitter=0, output_chars=120)
+
+    keywords = model.generate_content("Keywords", generation_config=SimpleNamespace(
+        response_schema=services.KEYWORDS_SCHEMA))
+    assert set(json.loads(keywords.text)) == {"titles", "technologies"}
+    text = model.generate_content("Summarize").text
+    assert 0 < len(text) <= 120
+
+    async def stream():
+        response = await model.generate_content_async("Summarize", stream=True)
+        return [chunk.text async for chunk in response], response.text
+
+    pieces, full = asyncio.run(stream())
+    assert len(pieces) > 1 and "".join(pieces) == full
+
+
+def test_fakes_are_deterministic_and_inject_errors():
+    first = FakeGenerativeModel(latency=0, seed=3).generate_content("x").text
+    assert FakeGenerativeModel(latency=0, seed=3).generate_content("x").text == first
+
+    failing = FakeGenerativeModel(latency=0, error_rate=1.0)
+    with pytest.raises(FakeServiceError):
+        failing.generate_content("x")
+    assert (failing.timing.calls, failing.timing.errors) == (1, 1)
+
+
+def test_fake_apify_returns_the_requested_rows():
+    client = FakeApifyClient(latency=0, jitter=0)
+    run_info = client.actor("any").call(run_input={"title": "Python", "location": "Izmir", "rows": 3})
+    jobs = list(client.dataset(run_info["defaultDatasetId"]).iterate_items())
+
+    assert len(jobs) == 3
+    assert {job["location"] for job in jobs} == {"Izmir"}
+    assert len({job["id"] for job in jobs}) == 3
+
+
+def test_corpus_documents_have_the_requested_pages():
+    with fitz.open(stream=make_resume_pdf(pages=4, seed=1), filetype="pdf") as doc:
+        assert doc.page_count == 4
+    assert services.extract_text_from_pdf(make_resume_pdf(seed=1)) == \
+        services.extract_text_from_pdf(make_resume_pdf(seed=1))
+    corpus = build_corpus(sizes=["small", "medium"], per_size=2)
+    assert [name for name, _ in corpus] == ["small-0", "small-1", "medium-0", "medium-1"]
+
+
+def test_drive_reports_latency_and_errors():
+    async def call(i):
+        await asyncio.sleep(0.01)
+        if i == 3:
+            raise ValueError("bad")
+
+    result = asyncio.run(run.drive("demo", call, requests=6, concurrency=2))
+
+    assert (result["requests"], result["errors"]) == (6, 1)
+    assert result["first_error"] == "ValueError: bad"
+    assert 10 <= result["latency_ms"]["p50"] <= result["latency_ms"]["max"]
+
+
+def test_compare_flags_regressions():
+    def result(p95, rps, errors=0):
+        return {"scenario": "analyze", "latency_ms": {"p95": p95}, "throughput_rps": rps, "errors": errors}
+
+    baseline = {"results": [result(100, 10)]}
+    assert run.compare([result(120, 9)], baseline, 0.25) == []
+    problems = run.compare([result(130, 7, errors=1)], baseline, 0.25)
+    assert [p.split(":")[1].split()[0] for p in problems] == ["p95", "throughput", "errors"]
+
+
+def test_offline_run_end_to_end(monkeypatch, tmp_path, capsys):
+    # setup() installs the fakes on the services module; put the originals back afterwards
+    for lazy in (services.gemini_model, services.apify_client):
+        monkeypatch.setattr(lazy, "_value", lazy._value)
+        monkeypatch.setattr(lazy, "_loaded", lazy._loaded)
+    for name in ("create_resume_context", "job_search_cache"):
+        monkeypatch.setattr(services, name, getattr(services, name))
+    report = tmp_path / "bench.json"
+    args = ["--scenarios", "analyze,jobs,mcp", "--requests", "3", "--concurrency", "2", "--per-size", "1",
+            "--gemini-latency", "0", "--gemini-jitter", "0", "--apify-latency", "0", "--apify-jitter", "0"]
+
+    assert run.main(args + ["--json", str(report)]) == 0
+    results = json.loads(report.read_text())["results"]
+    assert {r["scenario"]: r["errors"] for r in results} == {"analyze": 0, "jobs": 0, "mcp": 0}
+    assert run.main(args + ["--baseline", str(report), "--max-regression", "100"]) == 0
+    assert "scenario" in capsys.readouterr().out
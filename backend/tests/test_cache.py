@@ -0,0 +1,101 @@
+import asyncio
+import time
+
+import pytest
+
+from app import services
+from app.cache import MemoryCache, NullCache, SQLiteCache, make_cache, text_fingerprint
+
+
+def test_memory_cache_expires_entries():
+    cache = MemoryCache(ttl=0.05)
+    cache.set("k", "v")
+    assert cache.get("k") == "v"
+    time.sleep(0.06)
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_memory_cache_evicts_least_recently_used_past_the_size_budget():
+    cache = MemoryCache(max_bytes=20)  # each value is 7 bytes of JSON
+    cache.set("a", "aaaaa")
+    cache.set("b", "bbbbb")
+    cache.get("a")
+    cache.set("c", "ccccc")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "aaaaa"
+    assert cache.get("c") == "ccccc"
+    stats = cache.stats()
+    assert (stats["evictions"], stats["hits"], stats["misses"]) == (1, 3, 1)
+
+
+def test_sqlite_cache_survives_reopening(tmp_path):
+    path = str(tmp_path / "cache.db")
+    SQLiteCache(path).set("k", ["a", "b"])
+    reopened = SQLiteCache(path)
+    assert reopened.get("k") == ["a", "b"]
+    assert reopened.stats()["hit_rate"] == 1.0
+
+
+def test_make_cache_backends(tmp_path):
+    assert isinstance(make_cache("none"), NullCache)
+    assert isinstance(make_cache("sqlite", path=str(tmp_path / "c.db")), SQLiteCache)
+    with pytest.raises(ValueError):
+        make_cache("redis")
+
+
+def test_fingerprint_ignores_whitespace():
+    assert text_fingerprint("Jane  Doe\n\nEngineer ") == text_fingerprint("Jane Doe Engineer")
+
+
+def test_extracted_text_is_keyed_on_pdf_bytes(monkeypatch):
+    extracted = []
+    monkeypatch.setattr(services, "extract_text_from_pdf",
+                        lambda content: extracted.append(content) or f"text of {content!r}")
+
+    assert services.extract_resume_text(b"%PDF-1") == services.extract_resume_text(b"%PDF-1")
+    services.extract_resume_text(b"%PDF-2")
+    assert extracted == [b"%PDF-1", b"%PDF-2"]
+
+
+@pytest.fixture
+def counting_steps(monkeypatch):
+    calls = []
+
+    def analyzer(name, answer):
+        async def analyze(resume_text, *inputs):
+            calls.append(name)
+            return answer(name, resume_text)
+        return analyze
+
+    for step in services.ANALYSIS_STEPS:
+        answer = (lambda name, text: f"{name} of {text}") if step != "roadmap" else (
+            lambda name, text: services.GEMINI_UNAVAILABLE)
+        monkeypatch.setitem(services.ANALYSIS_STEPS, step,
+                            (analyzer(step, answer), services.ANALYSIS_STEPS[step][1]))
+    return calls
+
+
+@pytest.mark.parametrize("concurrent", [True, False])
+def test_repeat_analysis_is_served_from_cache_except_fallbacks(counting_steps, concurrent):
+    async def run(text):
+        return [event async for event in services.run_analysis(text, concurrent=concurrent)]
+
+    asyncio.run(run("cv"))
+    assert sorted(counting_steps) == sorted(services.ANALYSIS_STEPS)
+    counting_steps.clear()
+
+    # Same resume with different whitespace: only the failed roadmap step runs again
+    events = asyncio.run(run("  cv\n"))
+    assert counting_steps == ["roadmap"]
+    assert [step for step, status, _ in events if status == "processing"] == ["roadmap"]
+    completed = {step: data for step, status, data in events if status == "complete"}
+    assert completed["summary"] == "summary of cv"
+    assert completed["roadmap"] == services.GEMINI_UNAVAILABLE
+
+
+def test_cache_key_changes_with_upstream_results():
+    assert services.analysis_cache_key("keywords", "cv", "summary A") != \
+        services.analysis_cache_key("keywords", "cv", "summary B")
+    assert services.analysis_cache_key("summary", "cv") != services.analysis_cache_key("gaps", "cv")
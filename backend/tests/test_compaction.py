@@ -0,0 +1,65 @@
+import pytest
+
+from app import services
+from app.compaction import (compact_to_budget, estimate_tokens, normalize_resume, prepare_resume,
+                            split_sections)
+
+
+def resume_of_length(length):
+    text = "SKILLS\nPython, SQL, Docker\nHOBBIES\nChess "
+    return text + "x" * (length - len(text))
+
+
+def test_repeated_headers_page_numbers_and_duplicate_lines_are_removed():
+    pages = [
+        "Jane Doe - Resume\nEXPERIENCE\nBuilt a data platform for analytics\nShipped it\n1",
+        "Jane Doe - Resume\nSKILLS\nBuilt a data platform for analytics\nPython\nPage 2 of 2",
+    ]
+    assert normalize_resume("\f".join(pages)).splitlines() == [
+        "EXPERIENCE", "Built a data platform for analytics", "Shipped it", "SKILLS", "Python"]
+
+
+def test_sections_are_split_on_headings():
+    sections = split_sections("Jane Doe\nEXPERIENCE\nAcme\nSkills:\nPython")
+    assert [(name, len(lines)) for name, lines in sections] == [(None, 1), ("experience", 2), ("skills", 2)]
+
+
+def test_low_value_sections_go_first_and_the_rest_share_the_budget():
+    text = "\n".join(["EXPERIENCE"] + [f"Role {i}: " + "built things " * 5 for i in range(20)]
+                     + ["SKILLS"] + [f"Skill {i}" for i in range(40)]
+                     + ["REFERENCES", "Available on request from previous managers"])
+    compacted = compact_to_budget(text, 100)
+
+    assert len(compacted) <= 400
+    assert "EXPERIENCE" in compacted and "SKILLS" in compacted
+    assert "REFERENCES" not in compacted
+
+
+@pytest.mark.parametrize("length", [96, 100])
+def test_zero_weight_sections_at_the_exact_budget_boundary(length):
+    # 4 * max_tokens = 96 characters: compaction kicks in at both lengths, and
+    # the zero-weight hobbies section must not divide the budget by zero
+    text = resume_of_length(length)
+    compacted, stats = prepare_resume(text, 24)
+
+    assert stats["budget_applied"]
+    assert "Chess" not in compacted
+    assert compacted == "SKILLS\nPython, SQL, Docker"
+
+
+def test_short_resumes_are_only_normalized():
+    text, stats = prepare_resume("Jane   Doe\n\nPython developer", 100)
+    assert text == "Jane Doe\nPython developer"
+    assert not stats["budget_applied"]
+    assert stats["compacted_tokens"] == estimate_tokens(text)
+
+
+def test_prompts_get_the_compacted_resume(monkeypatch):
+    prompts = []
+    monkeypatch.setattr(services, "RESUME_TOKEN_BUDGET", 24)
+    monkeypatch.setattr(services, "ask_gemini", lambda prompt, **kwargs: prompts.append(prompt) or "ok")
+
+    services.analyze_summary(resume_of_length(100))
+
+    assert "Python, SQL, Docker" in prompts[0] and "Chess" not in prompts[0]
+    assert services.compaction_snapshot()["resumes"] >= 1
@@ -0,0 +1,83 @@
+import asyncio
+import time
+
+import pytest
+
+from app import services
+from app.cache import MemoryCache, SingleFlightCache
+
+RESUME = "Jane Doe\nSenior data engineer. " + "Built Spark pipelines on Kubernetes. " * 40
+
+
+def test_every_step_prompt_starts_with_the_same_resume_prefix():
+    prompts = [services.resume_prompt(RESUME, task)
+               for task in (services.SUMMARY_TASK, services.GAPS_TASK, services.ROADMAP_TASK)]
+
+    assert all(prompt.startswith(services.resume_prefix(RESUME)) for prompt in prompts)
+    assert len(set(prompts)) == 3
+
+
+@pytest.fixture
+def contexts(monkeypatch, lazy_value):
+    """Context caching on, with a create that takes a moment and can be made to fail."""
+    state = {"creates": 0, "error": None}
+
+    def create(resume_text):
+        state["creates"] += 1
+        time.sleep(0.05)
+        if state["error"]:
+            raise state["error"]
+        return f"context for {resume_text[:8]}"
+
+    monkeypatch.setattr(services, "GEMINI_CONTEXT_CACHE", True)
+    monkeypatch.setattr(services, "GEMINI_CONTEXT_CACHE_MIN_TOKENS", 100)
+    lazy_value(services.gemini_model, object())
+    monkeypatch.setattr(services, "create_resume_context", create)
+    monkeypatch.setattr(services, "resume_contexts", SingleFlightCache(ttl=60, stale_ttl=0))
+    monkeypatch.setattr(services, "resume_context_failures", MemoryCache(ttl=60))
+    return state
+
+
+def requests(*tasks, resume=RESUME):
+    async def run():
+        return await asyncio.gather(*(services.resume_request(resume, task) for task in tasks))
+    return asyncio.run(run())
+
+
+def test_concurrent_steps_share_one_cached_context(contexts):
+    results = requests("summary task", "gaps task", "roadmap task")
+
+    assert results == [(task, "context for Jane Doe") for task in ("summary task", "gaps task", "roadmap task")]
+    assert contexts["creates"] == 1
+
+
+def test_short_resumes_are_sent_inline(contexts):
+    assert requests("task", resume="Jane Doe") == [(services.resume_prompt("Jane Doe", "task"), None)]
+    assert contexts["creates"] == 0
+
+
+def test_a_failed_create_is_not_retried_for_the_resume(contexts):
+    contexts["error"] = RuntimeError("caching not supported for this model")
+
+    first = requests("summary task")
+    later = requests("gaps task", "roadmap task")
+
+    assert first == [(services.resume_prompt(RESUME, "summary task"), None)]
+    assert later == [(services.resume_prompt(RESUME, task), None) for task in ("gaps task", "roadmap task")]
+    assert contexts["creates"] == 1
+    # Another resume still gets its own attempt
+    requests("task", resume=RESUME.replace("Jane", "John"))
+    assert contexts["creates"] == 2
+
+
+def test_analyzers_send_only_the_task_to_the_cached_context(contexts, monkeypatch):
+    sent = []
+
+    async def ask(prompt, max_tokens=500, on_delta=None, analyzer="adhoc", schema=None, client=None):
+        sent.append((analyzer, prompt, client))
+        return "answer"
+    monkeypatch.setattr(services, "ask_gemini_async", ask)
+
+    asyncio.run(services.analyze_summary_async(RESUME))
+
+    assert sent == [("summary", services.SUMMARY_TASK, "context for Jane Doe")]
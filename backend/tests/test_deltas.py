@@ -0,0 +1,107 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main, services
+
+
+def test_coalescer_batches_by_size_and_time():
+    emitted = []
+    coalescer = services.DeltaCoalescer(emitted.append, min_chars=10, interval=60_000)
+    for piece in ("abc", "def", "ghij", "k"):
+        coalescer.add(piece)
+    assert emitted == ["abcdefghij"]
+    coalescer.flush()
+    coalescer.flush()
+    assert emitted == ["abcdefghij", "k"]
+
+    emitted.clear()
+    coalescer = services.DeltaCoalescer(emitted.append, min_chars=1000, interval=0.001)
+    coalescer._flushed_at -= 1
+    coalescer.add("late")
+    assert emitted == ["late"]
+
+
+class StreamedResponse:
+    def __init__(self, pieces, finish_reason=1):
+        self.pieces = pieces
+        self.candidates = [SimpleNamespace(finish_reason=finish_reason)]
+        self.usage_metadata = SimpleNamespace(candidates_token_count=5)
+
+    async def __aiter__(self):
+        for piece in self.pieces:
+            yield SimpleNamespace(text=piece)
+
+
+@pytest.mark.parametrize("finish_reason, expected", [(1, "Hello world"), (2, "Hello world..."),
+                                                     (3, services.GEMINI_BLOCKED)])
+def test_ask_gemini_async_streams_pieces_and_returns_the_full_answer(monkeypatch, lazy_value, finish_reason, expected):
+    class Model:
+        async def generate_content_async(self, prompt, stream=False, **kwargs):
+            assert stream
+            return StreamedResponse(["Hello", " ", "world"], finish_reason)
+
+    lazy_value(services.gemini_model, Model())
+    monkeypatch.setattr(services, "DELTA_FLUSH_CHARS", 5)
+    pieces = []
+
+    assert asyncio.run(services.ask_gemini_async("hi", on_delta=pieces.append)) == expected
+    assert "".join(pieces) == "Hello world"
+
+
+@pytest.fixture
+def streaming_steps(monkeypatch):
+    received = {}
+
+    def analyzer(step):
+        async def analyze(resume_text, *inputs, on_delta=None):
+            received[step] = on_delta
+            if on_delta:
+                for word in ("partial ", "text"):
+                    on_delta(word)
+                    await asyncio.sleep(0)
+            return ["kw"] if step == "keywords" else f"{step} done"
+        return analyze
+
+    for step, (_, deps) in list(services.ANALYSIS_STEPS.items()):
+        monkeypatch.setitem(services.ANALYSIS_STEPS, step, (analyzer(step), deps))
+    return received
+
+
+@pytest.mark.parametrize("concurrent", [True, False])
+def test_text_steps_send_deltas_before_completing(streaming_steps, concurrent):
+    async def collect():
+        return [e async for e in services.run_analysis("cv", concurrent=concurrent, deltas=True)]
+
+    events = asyncio.run(collect())
+
+    for step in services.STREAMING_STEPS:
+        statuses = [(status, data) for s, status, data in events if s == step]
+        assert statuses == [("processing", None), ("delta", "partial "), ("delta", "text"),
+                            ("complete", f"{step} done")]
+    assert streaming_steps["keywords"] is None
+
+
+def test_no_deltas_unless_asked(streaming_steps):
+    async def collect():
+        return [e async for e in services.run_analysis("cv")]
+
+    assert "delta" not in {status for _, status, _ in asyncio.run(collect())}
+    assert set(streaming_steps.values()) == {None}
+
+
+@pytest.mark.parametrize("deltas, expected", [("true", True), ("false", False)])
+def test_analyze_resume_forwards_delta_events(streaming_steps, make_pdf, deltas, expected):
+    response = TestClient(main.app).post(
+        "/analyze-resume", files={"file": ("cv.pdf", make_pdf("Jane Doe"), "application/pdf")},
+        data={"deltas": deltas})
+
+    events = [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line]
+    deltas_seen = [e for e in events if e["status"] == "delta"]
+    assert bool(deltas_seen) == expected
+    if expected:
+        assert deltas_seen[0] == {"step": deltas_seen[0]["step"], "status": "delta", "data": "partial "}
+    assert events[-1]["data"]["summary"] == "summary done"
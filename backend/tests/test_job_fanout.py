@@ -0,0 +1,80 @@
+import asyncio
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from app import main, services
+
+
+def fake_search(jobs_by_keyword, active=None):
+    lock = threading.Lock()
+
+    def fetch(keyword, location, rows, timeout=None, cancel=None):
+        if active is not None:
+            with lock:
+                active["now"] += 1
+                active["peak"] = max(active["peak"], active["now"])
+        time.sleep(0.1)
+        if active is not None:
+            with lock:
+                active["now"] -= 1
+        return jobs_by_keyword[keyword]
+    return fetch
+
+
+def test_keywords_are_searched_concurrently_and_merged(job_sources):
+    shared = {"id": "1", "title": "Python Dev"}
+    job_sources("linkedin", fake_search({
+        "python": [shared, {"link": "https://x/jobs/2?ref=a", "title": "Backend"}],
+        "django": [dict(shared), {"link": "https://x/jobs/2?ref=b", "title": "Backend"}],
+        "sql": [{"title": "DBA", "companyName": "Acme"}],
+    }))
+
+    started = time.perf_counter()
+    jobs, timed_out = asyncio.run(services.fetch_jobs_for_keywords(["python", "django", "sql"]))
+
+    assert time.perf_counter() - started < 0.25  # one search, not three
+    assert timed_out == []
+    assert sorted((job["title"], sorted(job["matchedKeywords"])) for job in jobs) == [
+        ("Backend", ["django", "python"]),
+        ("DBA", ["sql"]),
+        ("Python Dev", ["django", "python"]),
+    ]
+    # The scraper's (possibly cached) job dicts are not modified
+    assert "matchedKeywords" not in shared
+
+
+def test_concurrency_is_capped(job_sources):
+    active = {"now": 0, "peak": 0}
+    keywords = [f"k{i}" for i in range(6)]
+    job_sources("linkedin", fake_search({k: [] for k in keywords}, active=active))
+
+    asyncio.run(services.fetch_jobs_for_keywords(keywords, max_concurrency=2))
+    assert active["peak"] == 2
+
+
+def test_slow_and_failing_searches_are_dropped(job_sources):
+    def fetch(keyword, location, rows, timeout=None, cancel=None):
+        if keyword == "broken":
+            raise RuntimeError("actor failed")
+        time.sleep(0.5 if keyword == "slow" else 0)
+        return [{"id": keyword}]
+
+    job_sources("linkedin", fetch)
+    jobs, timed_out = asyncio.run(
+        services.fetch_jobs_for_keywords(["fast", "slow", "broken"], timeout=0.1))
+
+    assert [job["id"] for job in jobs] == ["linkedin:fast"]
+    assert timed_out == ["slow"]
+
+
+def test_fetch_jobs_endpoint_searches_max_keywords(job_sources):
+    searched = []
+    job_sources("linkedin", lambda keyword, location, rows, timeout, cancel: searched.append(keyword) or [])
+
+    response = TestClient(main.app).get("/fetch-jobs", params={"keywords": "a, b, c, d", "max_keywords": 3})
+
+    assert response.status_code == 200
+    assert sorted(searched) == ["a", "b", "c"]
+    assert response.json()["timed_out"] == []
@@ -0,0 +1,96 @@
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main, services
+from app.job_index import JobIndex, job_key
+
+
+@pytest.fixture
+def index():
+    return JobIndex(":memory:")
+
+
+def test_job_key_prefers_ids_then_links_without_tracking():
+    assert job_key({"id": 7, "link": "https://x/1"}) == "id:7"
+    assert job_key({"link": "https://x/1?trk=a"}) == job_key({"link": "https://x/1?trk=b"})
+    assert job_key({"title": "Dev", "companyName": "Acme", "location": "Izmir"}) == "Dev|Acme|Izmir"
+
+
+def test_ingest_is_idempotent(index):
+    job = {"id": "1", "title": "Python Developer", "location": "Istanbul"}
+    assert index.ingest([job]) == 1
+    assert index.ingest([job]) == 0
+    assert index.ingest([dict(job, title="Senior Python Developer")]) == 0
+
+    stats = index.stats()
+    assert (stats["jobs"], stats["ingested"], stats["updated"]) == (1, 1, 1)
+    # Postings follow the changed content
+    assert index.search("senior")[0]["title"] == "Senior Python Developer"
+
+
+def test_search_needs_every_term_in_title_or_skills_and_location(index):
+    index.ingest([
+        {"id": "1", "title": "Python Developer", "location": "Istanbul, Türkiye"},
+        {"id": "2", "jobTitle": "Backend Engineer", "keySkills": ["Python", "Django"], "jobLocation": "Ankara"},
+        {"id": "3", "title": "Java Developer", "location": "Istanbul"},
+    ])
+
+    assert {job["id"] for job in index.search("python")} == {"1", "2"}
+    assert [job["id"] for job in index.search("python django")] == ["2"]
+    assert [job["id"] for job in index.search("Developer", "istanbul türkiye")] == ["1"]
+    assert index.search("") == []
+    assert len(index.search("developer", limit=1)) == 1
+
+
+def test_old_postings_are_filtered_and_purged(monkeypatch):
+    index = JobIndex(":memory:", purge_interval=float("inf"))
+    index.ingest([{"id": "old", "title": "Python Developer"}])
+    monkeypatch.setattr(time, "time", lambda: 1e10)
+    index.ingest([{"id": "new", "title": "Python Developer"}])
+
+    assert [job["id"] for job in index.search("python", max_age=60)] == ["new"]
+    assert index.purge() == 1
+    assert index.stats()["jobs"] == 1
+    # Ingestion purges on its own once purge_interval has passed
+    index = JobIndex(":memory:", max_age=60)
+    index.ingest([{"id": "old", "title": "Python Developer"}])
+    monkeypatch.setattr(time, "time", lambda: 2e10)
+    index.ingest([{"id": "new", "title": "Python Developer"}])
+    assert index.stats()["jobs"] == 1
+
+
+@pytest.fixture
+def scraper(monkeypatch, index, job_sources):
+    runs = []
+    monkeypatch.setattr(services, "job_index", index)
+    job_sources("linkedin", lambda query, location, rows, timeout, cancel: runs.append(query) or [
+        {"id": f"{query}-{i}", "title": f"{query} developer", "location": location} for i in range(rows)])
+    return runs
+
+
+def search_indexed(query, location, rows):
+    jobs, _ = asyncio.run(services.fetch_jobs_for_keywords([query], location, rows=rows, use_index=True))
+    return jobs
+
+
+def test_scraped_jobs_feed_the_index_and_answer_later_searches(scraper, index):
+    first = search_indexed("python", "Istanbul", rows=3)
+    second = search_indexed("Python", "istanbul", rows=3)
+
+    assert scraper == ["python"]
+    assert index.stats()["jobs"] == 3
+    assert {job["id"] for job in second} == {job["id"] for job in first}
+    # Asking for more than the index holds goes back to the scraper
+    search_indexed("python", "Istanbul", rows=5)
+    assert scraper == ["python", "python"]
+
+
+def test_fetch_jobs_index_mode(scraper):
+    client = TestClient(main.app)
+    assert client.get("/fetch-jobs", params={"keywords": "go", "mode": "index"}).status_code == 200
+    assert client.get("/fetch-jobs", params={"keywords": "go", "mode": "index"}).status_code == 200
+    assert scraper == ["go"]
+    assert client.get("/fetch-jobs", params={"keywords": "go", "mode": "cache"}).status_code == 400
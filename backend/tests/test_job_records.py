@@ -0,0 +1,58 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main, services
+from app.job_index import JobIndex
+from app.job_sources import Job, normalize_job, preview
+
+DESCRIPTION = "We build data pipelines in Python. " * 20 + "Kubernetes and Terraform experience is a must."
+
+
+def test_preview_cuts_at_a_word_boundary():
+    assert preview("short text", 300) == "short text"
+    assert preview("one two, three four", 12) == "one two…"
+
+
+def test_job_is_a_compact_read_only_mapping():
+    job = Job.from_dict(normalize_job({"id": "7", "title": "Data Engineer", "descriptionText": DESCRIPTION,
+                                       "skills": ["Python", "SQL"]}, "linkedin"), preview_chars=40)
+
+    assert not hasattr(job, "__dict__")
+    assert job["id"] == job.get("id") == "linkedin:7"
+    assert job.get("score") is None and job.skills == ("Python", "SQL")
+    assert len(job.description) <= 41 and job.description.endswith("…")
+    assert dict(job, score=0.5)["score"] == 0.5
+    assert job.to_dict() == dict(job)
+    assert Job.from_dict(job) is job
+    with pytest.raises(KeyError):
+        job["score"]
+
+
+@pytest.fixture
+def scraped(monkeypatch, job_sources):
+    monkeypatch.setattr(services, "job_index", JobIndex(":memory:"))
+    job_sources("linkedin", lambda query, location, rows, timeout, cancel: [
+        {"id": "1", "title": "Data Engineer", "description": DESCRIPTION, "location": location},
+        {"link": "https://jobs.example/2?ref=feed", "title": "Designer", "description": "Figma all day."},
+    ])
+
+
+def test_searches_return_previews_and_the_index_keeps_full_postings(scraped):
+    client = TestClient(main.app)
+
+    jobs = client.get("/fetch-jobs", params={"keywords": "data"}).json()["linkedin"]
+
+    assert jobs[0]["id"] == "linkedin:1"
+    assert len(jobs[0]["description"]) <= services.JOB_DESCRIPTION_PREVIEW_CHARS + 1
+    assert client.get("/jobs/linkedin:1").json()["description"] == DESCRIPTION
+    assert client.get("/jobs/https://jobs.example/2").json()["title"] == "Designer"
+    assert client.get("/jobs/linkedin:404").status_code == 404
+
+
+def test_ranking_scores_the_full_posting_not_the_preview(scraped):
+    jobs = services.search_source(services.job_sources.get("linkedin"), "data")
+
+    # Kubernetes and Terraform are only past the preview
+    assert "Kubernetes" not in jobs[0]["description"]
+    ranked = services.rank_jobs_for_resume("Kubernetes Terraform platform engineer", jobs, top_k=1)
+    assert [(job["id"], job["score"] > 0) for job in ranked] == [("linkedin:1", True)]
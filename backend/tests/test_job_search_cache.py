@@ -0,0 +1,102 @@
+import threading
+import time
+
+import pytest
+
+from app import services
+from app.cache import SingleFlightCache
+
+
+def wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_concurrent_misses_share_one_load():
+    cache = SingleFlightCache()
+    release = threading.Event()
+    loads = []
+
+    def loader():
+        loads.append(1)
+        release.wait(2)
+        return ["job"]
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("k", loader))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    wait_for(lambda: cache.stats()["coalesced"] == 4)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert loads == [1]
+    assert results == [["job"]] * 5
+    assert cache.stats()["loads_saved"] == 4
+
+
+def test_stale_value_is_served_while_one_refresh_runs():
+    cache = SingleFlightCache(ttl=0.05, stale_ttl=10)
+    cache.get("k", lambda: "old")
+    time.sleep(0.06)
+    release = threading.Event()
+
+    def refresh():
+        release.wait(2)
+        return "new"
+
+    assert cache.get("k", refresh) == "old"
+    assert cache.get("k", refresh) == "old"
+    assert cache.stats()["refreshes"] == 1
+    release.set()
+    wait_for(lambda: cache.stats()["in_flight"] == 0)
+    assert cache.get("k", refresh) == "new"
+
+
+def test_expired_value_is_reloaded():
+    cache = SingleFlightCache(ttl=0.01, stale_ttl=0.01)
+    cache.get("k", lambda: "old")
+    time.sleep(0.03)
+    assert cache.get("k", lambda: "new") == "new"
+
+
+def test_failed_loads_are_not_cached_and_failed_refreshes_keep_stale():
+    cache = SingleFlightCache(ttl=0.05, stale_ttl=10)
+
+    def broken():
+        raise RuntimeError("actor failed")
+
+    with pytest.raises(RuntimeError):
+        cache.get("k", broken)
+    assert cache.get("k", lambda: "ok") == "ok"
+
+    time.sleep(0.06)
+    assert cache.get("k", broken) == "ok"
+    wait_for(lambda: cache.stats()["in_flight"] == 0)
+    assert cache.get("k", broken) == "ok"
+    assert cache.stats()["load_errors"] == 2
+
+
+def test_oldest_entries_are_dropped_past_max_entries():
+    cache = SingleFlightCache(max_entries=2)
+    for key in "abc":
+        cache.get(key, lambda: key)
+    assert cache.stats()["entries"] == 2
+    assert cache.get("a", lambda: "reloaded") == "reloaded"
+
+
+def test_fetch_linkedin_jobs_normalizes_queries_and_returns_copies(job_sources, lazy_value):
+    runs = []
+    lazy_value(services.apify_client, object())
+    job_sources("linkedin", lambda query, location, rows, timeout, cancel: runs.append(query) or [{"title": query}])
+
+    jobs = services.fetch_linkedin_jobs("Data  Engineer", "Türkiye")
+    jobs.append({"title": "added by caller"})
+
+    assert [job["title"] for job in services.fetch_linkedin_jobs("data engineer ", "türkiye")] == ["Data  Engineer"]
+    assert runs == ["Data  Engineer"]
+    services.fetch_linkedin_jobs("data engineer", "Türkiye", use_cache=False)
+    assert len(runs) == 2
@@ -0,0 +1,129 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main, services
+from app.job_sources import (
+    BudgetExceeded, FixtureJobSource, JobSource, PartialResults, job_fingerprint, normalize_job
+)
+
+
+def test_normalize_job_maps_source_fields_onto_one_schema():
+    raw = {"jobId": "42", "jobTitle": "Data Engineer", "company": "Acme", "jobLocation": ["Pune", "India"],
+           "url": "https://naukri.example/42", "createdDate": "2024-05-01", "tagsAndSkills": "Spark, SQL,"}
+
+    job = normalize_job(raw, "naukri", fields={"postedAt": ("createdDate",)})
+
+    assert job == {
+        "id": "naukri:42", "source": "naukri", "title": "Data Engineer", "companyName": "Acme",
+        "location": "Pune, India", "link": "https://naukri.example/42", "postedAt": "2024-05-01",
+        "description": "", "skills": ["Spark", "SQL"],
+    }
+    # Normalizing twice changes nothing
+    assert normalize_job(job, "naukri") is job
+
+
+def test_one_posting_on_two_sites_has_one_fingerprint():
+    linkedin = normalize_job({"title": "Python Developer", "companyName": "Acme Inc.", "location": "Istanbul, Türkiye"},
+                             "linkedin")
+    naukri = normalize_job({"title": "python developer", "company": "ACME Inc", "location": "Istanbul"}, "naukri")
+
+    assert job_fingerprint(linkedin) == job_fingerprint(naukri)
+
+
+def test_sources_are_searched_concurrently_and_merged(job_sources):
+    def site(company):
+        def fetch(query, location, rows, timeout, cancel):
+            time.sleep(0.1)
+            return [{"id": query, "title": "Python Developer", "companyName": company, "location": "Istanbul"}]
+        return fetch
+
+    job_sources("linkedin", site("Acme"))
+    job_sources("naukri", site("ACME"))
+    job_sources("other", site("Elsewhere"), enabled=False)
+
+    started = time.perf_counter()
+    jobs, _ = asyncio.run(services.fetch_jobs_for_keywords(["python"]))
+
+    assert time.perf_counter() - started < 0.18
+    assert [(job["id"], job["sources"]) for job in jobs] == [("linkedin:python", ["linkedin", "naukri"])]
+    jobs, _ = asyncio.run(services.fetch_jobs_for_keywords(["python"], sources="other"))
+    assert [job["sources"] for job in jobs] == [["other"]]
+
+
+def test_fetch_jobs_rejects_unknown_sources(job_sources):
+    job_sources("linkedin", lambda query, location, rows, timeout, cancel: [])
+
+    response = TestClient(main.app).get("/fetch-jobs", params={"keywords": "python", "sources": "linkedin,monster"})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown job source: monster. Available: linkedin."
+
+
+def test_source_stops_searching_once_its_budget_is_spent(job_sources):
+    source = job_sources("linkedin", lambda query, location, rows, timeout, cancel: [{"id": n} for n in range(rows)],
+                         budget=0.002, cost_per_job=0.001)
+
+    assert len(source.search("python", rows=2)) == 2
+    with pytest.raises(BudgetExceeded):
+        source.search("python", rows=2)
+
+    stats = TestClient(main.app).get("/cache/stats").json()["job_sources"]["linkedin"]
+    assert (stats["searches"], stats["jobs"], stats["spent_usd"]) == (1, 2, 0.002)
+    assert stats["over_budget"] == 1
+
+
+def test_source_concurrency_limit_is_shared_by_every_search():
+    active = {"now": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def fetch(query, location, rows, timeout, cancel):
+        with lock:
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+        time.sleep(0.05)
+        with lock:
+            active["now"] -= 1
+        return []
+
+    source = JobSource("slow", fetch=fetch, concurrency=2)
+    threads = [threading.Thread(target=source.search, args=(f"q{n}",)) for n in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert active["peak"] == 2
+
+
+def test_timed_out_fetch_keeps_its_jobs_and_is_not_an_error():
+    def fetch(query, location, rows, timeout, cancel):
+        yield {"id": "1", "title": "Python Developer"}
+        raise PartialResults("Only 1 of 5 results")
+
+    source = JobSource("slow", fetch=fetch)
+    with pytest.raises(PartialResults) as raised:
+        source.search("python", rows=5)
+
+    assert [job["id"] for job in raised.value.jobs] == ["slow:1"]
+    assert source.stats()["errors"] == 0
+
+
+def test_fixture_source_matches_query_terms_and_location(tmp_path):
+    path = tmp_path / "jobs.jsonl"
+    path.write_text("\n".join(json.dumps(job) for job in [
+        {"id": "1", "title": "Senior Python Developer", "location": "Istanbul, Türkiye"},
+        {"id": "2", "title": "Developer", "skills": ["Python", "Django"], "location": "Ankara"},
+        {"id": "3", "title": "Java Developer", "location": "Istanbul"},
+        {"id": "4", "title": "Python Developer", "location": ""},
+        {"id": "5", "title": "Python Developer", "location": "Istanbul"},
+    ]))
+    source = FixtureJobSource("fixture", path=str(path))
+
+    assert [job["id"] for job in source.search("python developer", "Istanbul")] == \
+        ["fixture:1", "fixture:4", "fixture:5"]
+    assert [job["id"] for job in source.search("python developer", "Istanbul", rows=2)] == ["fixture:1", "fixture:4"]
@@ -0,0 +1,138 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main, services
+from app.cache import SingleFlightCache
+from app.job_index import JobIndex, job_key
+from app.job_sources import normalize_job
+from bench.fakes import FakeApifyClient
+
+
+@pytest.fixture
+def apify(monkeypatch, lazy_value):
+    """Installs a fake Apify client whose runs take `latency` seconds."""
+    monkeypatch.setattr(services, "APIFY_POLL_INTERVAL", 0.01)
+    monkeypatch.setattr(services, "job_search_cache", SingleFlightCache())
+    monkeypatch.setattr(services, "job_index", JobIndex(":memory:"))
+
+    def install(latency, error_rate=0.0):
+        client = FakeApifyClient(latency=latency, jitter=0, error_rate=error_rate, description_chars=60)
+        return lazy_value(services.apify_client, client)
+    return install
+
+
+def only_run(client):
+    [run] = client.runs.values()
+    return run
+
+
+def test_jobs_are_yielded_while_the_run_is_going(apify):
+    client = apify(0.4)
+
+    stream = services.stream_linkedin_jobs("python", rows=10)
+    first = next(stream)
+
+    assert only_run(client).status() == "RUNNING"
+    jobs = [first, *stream]
+    assert [job["id"] for job in jobs] == [client.make_job("python", "Türkiye", n)["id"] for n in range(10)]
+
+
+def test_closing_the_stream_aborts_the_run(apify):
+    client = apify(1.0)
+
+    stream = services.stream_linkedin_jobs("python", rows=10)
+    next(stream)
+    stream.close()
+
+    assert only_run(client).status() == "ABORTED"
+
+
+def test_timeout_before_any_job_raises_timeout_error(apify):
+    client = apify(2.0)
+
+    with pytest.raises(TimeoutError) as raised:
+        list(services.stream_linkedin_jobs("python", rows=10, timeout=0.1))
+
+    assert not isinstance(raised.value, services.PartialResults)
+    assert only_run(client).status() == "ABORTED"
+
+
+def test_timeout_after_some_jobs_yields_them_then_raises_partial_results(apify):
+    apify(0.5)
+    jobs = []
+
+    with pytest.raises(services.PartialResults):
+        for job in services.stream_linkedin_jobs("python", rows=10, timeout=0.25):
+            jobs.append(job)
+
+    assert 0 < len(jobs) < 10
+
+
+def test_failed_run_raises(apify):
+    apify(0.05, error_rate=1.0)
+
+    with pytest.raises(RuntimeError, match="FAILED"):
+        list(services.stream_linkedin_jobs("python", rows=10))
+
+
+def test_partial_search_is_returned_but_not_cached(apify, monkeypatch):
+    client = apify(0.5)
+    monkeypatch.setattr(services.job_sources.get("linkedin"), "timeout", 0.25)
+
+    jobs = services.fetch_linkedin_jobs("python", rows=10)
+    again = services.fetch_linkedin_jobs("python", rows=10)
+
+    assert 0 < len(jobs) < 10 and 0 < len(again) < 10
+    assert len(client.runs) == 2
+    assert services.job_index.stats()["jobs"] == 0
+
+
+def collect(keywords, **kwargs):
+    async def run():
+        return [event async for event in services.stream_jobs_for_keywords(keywords, **kwargs)]
+    return asyncio.run(run())
+
+
+def test_stream_sends_each_job_once_and_caches_completed_searches(apify):
+    client = apify(0.2)
+    shared = normalize_job(client.make_job("python", "Türkiye", 0), "linkedin")
+    services.job_search_cache.put(services.job_search_key("django", "Türkiye", 5), [shared])
+
+    events = collect(["python", "django"], rows=5)
+
+    done = {e["keyword"]: e for e in events if e["type"] == "keyword_done"}
+    assert done["python"]["jobs"] == 5 and not done["python"]["cached"]
+    assert done["django"] == {"type": "keyword_done", "keyword": "django", "source": "linkedin", "jobs": 1,
+                              "cached": True}
+    shared_events = [e["type"] for e in events if e.get("key") == job_key(shared)]
+    assert sorted(shared_events) == ["job", "match"]
+    assert len([e for e in events if e["type"] == "job"]) == 5
+    assert len(services.job_search_cache.peek(services.job_search_key("python", "Türkiye", 5))) == 5
+    assert len(client.runs) == 1
+
+
+def test_stream_marks_timed_out_searches_partial_without_caching(apify, monkeypatch):
+    apify(0.5)
+    monkeypatch.setattr(services.job_sources.get("linkedin"), "timeout", 0.25)
+
+    events = collect(["python"], rows=10)
+
+    done = events[-1]
+    assert done["type"] == "keyword_done" and done["partial"] is True
+    assert 0 < done["jobs"] == len([e for e in events if e["type"] == "job"]) < 10
+    assert services.job_search_cache.peek(services.job_search_key("python", "Türkiye", 10)) is None
+
+
+def test_fetch_jobs_stream_endpoint_sends_server_sent_events(apify):
+    apify(0.2)
+
+    with TestClient(main.app) as client:
+        response = client.get("/fetch-jobs", params={"keywords": "python, django", "stream": "true"})
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line.startswith("data: ")]
+    assert [e["type"] for e in events].count("job") == 10
+    assert events[-1] == {"type": "done", "jobs": 10, "failed": []}
@@ -0,0 +1,86 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main, services
+
+
+def test_titles_come_first_cleaned_and_deduplicated():
+    keywords = services.validate_keywords({
+        "titles": ["  Backend   Developer ", '"Python Developer"', "backend developer", "- Data Engineer."],
+        "technologies": ["Python", "python", "<b>SQL</b>", "1234", "Docker", "x" * 70],
+    })
+
+    assert keywords == ["Backend Developer", "Python Developer", "Data Engineer", "Python", "Docker"]
+
+
+def test_keyword_counts_are_capped():
+    keywords = services.validate_keywords({
+        "titles": [f"Engineer {n}" for n in range(8)],
+        "technologies": [f"Tech{n}" for n in range(20)],
+    })
+
+    assert keywords[:services.KEYWORDS_MAX_TITLES] == [f"Engineer {n}" for n in range(5)]
+    assert len(keywords) == services.KEYWORDS_MAX_TOTAL
+
+
+def test_plain_lists_are_split_by_title_words():
+    assert services.validate_keywords(["Python", "ML Engineer", "Django", "Full-Stack Developer"]) == \
+        ["ML Engineer", "Full-Stack Developer", "Python", "Django"]
+
+
+@pytest.mark.parametrize("answer", [
+    '{"titles": [], "technologies": ["Python"]}',
+    "Python, Django, SQL",
+    '"Software Engineer"',
+])
+def test_answers_without_a_usable_title_give_no_keywords(answer):
+    assert services.parse_keywords(answer) == []
+
+
+def test_parse_keywords_reads_fenced_json():
+    answer = '```json\n{"titles": ["Data Analyst"], "technologies": ["SQL"]}\n```'
+    assert services.parse_keywords(answer) == ["Data Analyst", "SQL"]
+
+
+def fake_gemini(monkeypatch, *answers):
+    """Gemini answers in turn; its keywords are used as they are (see test_skills for merging)."""
+    monkeypatch.setattr(services, "KEYWORDS_MODE", "llm")
+    calls = []
+
+    def ask(prompt, max_tokens=None, analyzer=None, schema=None, **kwargs):
+        calls.append((analyzer, max_tokens, schema))
+        return answers[len(calls) - 1]
+    monkeypatch.setattr(services, "ask_gemini", ask)
+    return calls
+
+
+def test_unusable_answer_is_repaired_once(monkeypatch):
+    calls = fake_gemini(monkeypatch, "Python, Django", json.dumps({"titles": ["Backend Developer"],
+                                                                   "technologies": ["Django"]}))
+
+    assert services.analyze_keywords("resume") == ["Backend Developer", "Django"]
+    assert calls == [("keywords", 400, services.KEYWORDS_SCHEMA), ("keywords_repair", 200, services.KEYWORDS_SCHEMA)]
+
+
+def test_failed_repair_gives_no_keywords(monkeypatch):
+    calls = fake_gemini(monkeypatch, "Python, Django", "still not json")
+
+    assert services.analyze_keywords("resume") == []
+    assert len(calls) == 2
+
+
+def test_fallback_messages_are_not_sent_for_repair(monkeypatch):
+    calls = fake_gemini(monkeypatch, services.GEMINI_UNAVAILABLE)
+
+    assert services.analyze_keywords("resume") == []
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize("stream", ["false", "true"])
+def test_fetch_jobs_rejects_blank_keywords(stream):
+    response = TestClient(main.app).get("/fetch-jobs", params={"keywords": " , ,", "stream": stream})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "keywords must name at least one search term."
@@ -0,0 +1,96 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import lazy, main, services
+from app.lazy import Lazy, LazyModule
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """An empty Lazy registry, with the PDF workers counted as started."""
+    fresh = {}
+    monkeypatch.setattr(lazy, "_registry", fresh)
+    monkeypatch.setattr(services, "_pdf_pool", object())
+    monkeypatch.setattr(services, "PDF_WORKERS", 0)
+    return fresh
+
+
+def test_concurrent_first_gets_build_the_value_once(registry):
+    builds = []
+
+    def build():
+        builds.append(1)
+        time.sleep(0.05)
+        return "client"
+
+    client = Lazy("client", build)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(client.get())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["client"] * 8
+    assert len(builds) == 1
+    assert client.loaded and lazy.status()["client"]["load_ms"] >= 50
+
+
+def test_a_failed_load_is_reported_and_retried(registry):
+    attempts = []
+
+    def build():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("no network")
+        return "client"
+
+    client = Lazy("client", build)
+
+    assert lazy.warm() == {"client": "no network"}
+    assert lazy.status()["client"] == {"loaded": False, "load_ms": None, "error": "no network"}
+    assert client.get() == "client"
+    assert lazy.status()["client"]["error"] is None
+
+
+def test_lazy_module_imports_on_first_attribute(registry):
+    loaded = []
+    module = LazyModule("json", on_load=loaded.append)
+
+    assert not module.loaded
+    assert module.dumps([1]) == "[1]"
+    module.loads("[]")
+    assert [m.__name__ for m in loaded] == ["json"]
+
+
+def test_ready_is_503_until_everything_is_loaded(registry):
+    Lazy("client", lambda: "client")
+    client = TestClient(main.app)
+
+    assert client.get("/health").json() == {"status": "ok"}
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["components"]["client"]["loaded"] is False
+
+    response = client.get("/ready", params={"warm": "true"})
+    assert response.status_code == 200
+    assert response.json()["ready"] is True
+    assert client.get("/ready").status_code == 200
+
+
+def test_importing_the_app_leaves_the_heavy_modules_unloaded():
+    script = ("import sys, app.main, app.mcp_server; "
+              "print(sorted(m for m in ('pymupdf', 'fitz', 'google.generativeai', 'apify_client', 'numpy', 'scipy') "
+              "if m in sys.modules))")
+    env = dict(os.environ, JOBS_WORKERS="0", PREWARM="0")
+    out = subprocess.run([sys.executable, "-c", script], cwd=Path(__file__).resolve().parent.parent,
+                         env=env, capture_output=True, text=True, check=True)
+
+    assert out.stdout.strip().splitlines()[-1] == "[]"
@@ -0,0 +1,125 @@
+import asyncio
+import json
+
+import pytest
+
+from app import mcp_server, services
+from app.telemetry import render_metrics
+
+
+@pytest.fixture
+def analyzers(monkeypatch):
+    """Replaces the analyzers with ones taking `delay` seconds that record cancellation."""
+    state = {"delay": 0.01, "cancelled": []}
+
+    def analyzer(name):
+        async def analyze(resume_text, *inputs):
+            try:
+                await asyncio.sleep(state["delay"])
+            except asyncio.CancelledError:
+                state["cancelled"].append(name)
+                raise
+            return [name] if name == "keywords" else f"{name} of {resume_text}"
+        return analyze
+
+    for step in services.ANALYSIS_STEPS:
+        monkeypatch.setitem(services.ANALYSIS_STEPS, step, (analyzer(step), services.ANALYSIS_STEPS[step][1]))
+    return state
+
+
+class FakeContext:
+    def __init__(self, session=None):
+        self._session = session
+        self.progress = []
+
+    @property
+    def session(self):
+        if self._session is None:
+            raise ValueError("Context is not available outside of a request")
+        return self._session
+
+    async def report_progress(self, progress, total=None, message=None):
+        self.progress.append((progress, total))
+
+
+def test_analyze_resume_full_returns_every_aspect_and_reports_progress(analyzers):
+    ctx = FakeContext()
+
+    results = asyncio.run(mcp_server.analyze_resume_full("cv", ctx=ctx))
+
+    assert results == {"summary": "summary of cv", "gaps": "gaps of cv", "roadmap": "roadmap of cv",
+                       "keywords": ["keywords"]}
+    assert ctx.progress == [(n, len(services.ANALYSIS_STEPS)) for n in range(1, 5)]
+
+
+def test_analyze_resume_text_shares_the_analysis_cache(analyzers):
+    first = asyncio.run(mcp_server.analyze_resume_text("cv", "keywords"))
+    analyzers["delay"] = 10
+    again = asyncio.run(asyncio.wait_for(mcp_server.analyze_resume_text("cv", "keywords"), 1))
+
+    assert json.loads(first) == json.loads(again) == ["keywords"]
+    assert asyncio.run(mcp_server.analyze_resume_text("cv", "tone")) == "Unknown aspect: tone"
+
+
+def test_cancelled_tool_call_cancels_its_analyzers(analyzers):
+    analyzers["delay"] = 10
+
+    async def cancel_soon():
+        task = asyncio.create_task(mcp_server.analyze_resume_full("cv"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_soon())
+
+    assert sorted(analyzers["cancelled"]) == ["gaps", "roadmap", "summary"]
+    assert 'mcp_tool_seconds_count{tool="analyze_resume_full",outcome="cancelled"}' in render_metrics()
+
+
+def test_each_session_runs_a_limited_number_of_calls(monkeypatch):
+    monkeypatch.setattr(mcp_server, "MCP_SESSION_CONCURRENCY", 2)
+    active = {"now": 0, "peak": 0}
+
+    @mcp_server.session_limited
+    async def tool(ctx=None):
+        active["now"] += 1
+        active["peak"] = max(active["peak"], active["now"])
+        await asyncio.sleep(0.02)
+        active["now"] -= 1
+
+    async def calls(*contexts):
+        await asyncio.gather(*(tool(ctx=ctx) for ctx in contexts for _ in range(4)))
+
+    class Session:
+        pass
+
+    asyncio.run(calls(FakeContext(Session())))
+    assert active["peak"] == 2
+    active["peak"] = 0
+    # Sessions don't share slots, and calls outside a request aren't limited
+    asyncio.run(calls(FakeContext(Session()), FakeContext(Session())))
+    assert active["peak"] == 4
+    active["peak"] = 0
+    asyncio.run(calls(FakeContext()))
+    assert active["peak"] == 4
+
+
+def test_job_recommendations_search_the_given_sources_and_rank(job_sources):
+    searched = []
+
+    def site(name):
+        def fetch(query, location, rows, timeout, cancel):
+            searched.append((name, rows))
+            return [{"id": "1", "title": f"{name} Python Developer", "location": location},
+                    {"id": "2", "title": f"{name} Chef", "location": location}]
+        return fetch
+
+    job_sources("linkedin", site("linkedin"))
+    job_sources("naukri", site("naukri"), enabled=False)
+
+    jobs = asyncio.run(mcp_server.get_job_recommendations("python", sources="naukri", resume_text="python developer"))
+
+    assert searched == [("naukri", services.JOB_RANK_CANDIDATES)]
+    assert [job["id"] for job in jobs] == ["naukri:1", "naukri:2"]
+    assert jobs[0]["score"] > jobs[1]["score"]
@@ -0,0 +1,84 @@
+import asyncio
+import hashlib
+import io
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.datastructures import UploadFile
+
+from app import main, services
+
+
+def test_extracts_every_page_in_order(make_pdf):
+    text, info = services.extract_pdf(make_pdf("first page", "second page"))
+
+    assert text.index("first page") < text.index("second page")
+    assert (info["pages"], info["pages_read"], info["truncated"]) == (2, 2, False)
+    assert set(info["timings_ms"]) == {"open", "extract", "join"}
+
+
+def test_page_and_character_budgets(make_pdf):
+    pdf = make_pdf(*(f"page {i} " + "x" * 50 for i in range(10)))
+
+    text, info = services.extract_pdf(pdf, max_pages=3)
+    assert "page 2" in text and "page 3" not in text
+    assert (info["pages_read"], info["truncated"]) == (3, True)
+
+    text, info = services.extract_pdf(pdf, max_chars=100)
+    assert len(text) == 100
+    assert info["truncated"] and info["pages_read"] == 2
+
+
+def test_large_files_are_read_in_parallel_in_page_order(make_pdf, tmp_path, monkeypatch):
+    monkeypatch.setattr(services, "PDF_PARALLEL_MIN_PAGES", 4)
+    path = tmp_path / "cv.pdf"
+    path.write_bytes(make_pdf(*(f"page-{i}" for i in range(9))))
+
+    text, info = services.extract_pdf(str(path))
+
+    assert [int(line.split("-")[1]) for line in text.split() if line.startswith("page-")] == list(range(9))
+    assert info["pages_read"] == 9
+
+
+def test_password_protected_pdfs_are_rejected(make_pdf):
+    with pytest.raises(ValueError, match="password"):
+        services.extract_pdf(make_pdf("secret", password="pw"))
+
+
+def test_paths_are_cached_by_content(make_pdf, tmp_path):
+    path = tmp_path / "cv.pdf"
+    path.write_bytes(make_pdf("old resume"))
+    assert "old resume" in services.extract_resume_text(str(path))
+
+    path.write_bytes(make_pdf("new resume"))
+    assert "new resume" in services.extract_resume_text(str(path))
+
+
+def test_spool_upload_hashes_and_caps_size(monkeypatch):
+    data = os.urandom(3000)
+    path, digest = asyncio.run(services.spool_upload(UploadFile(io.BytesIO(data)), chunk_size=1024))
+    try:
+        assert digest == hashlib.sha256(data).hexdigest()
+        with open(path, "rb") as f:
+            assert f.read() == data
+    finally:
+        os.unlink(path)
+
+    created = []
+    real_tempfile = services.tempfile.NamedTemporaryFile
+    monkeypatch.setattr(services.tempfile, "NamedTemporaryFile",
+                        lambda **kw: created.append(real_tempfile(**kw)) or created[-1])
+    with pytest.raises(services.PDFTooLarge):
+        asyncio.run(services.spool_upload(UploadFile(io.BytesIO(data)), max_bytes=2000, chunk_size=1024))
+    assert not os.path.exists(created[0].name)
+
+
+def test_analyze_resume_rejects_bad_and_oversized_uploads(monkeypatch):
+    client = TestClient(main.app)
+    response = client.post("/analyze-resume", files={"file": ("cv.pdf", b"not a pdf", "application/pdf")})
+    assert response.status_code == 400
+
+    monkeypatch.setattr(services, "PDF_MAX_BYTES", 100)
+    response = client.post("/analyze-resume", files={"file": ("cv.pdf", b"x" * 200, "application/pdf")})
+    assert response.status_code == 413
@@ -0,0 +1,54 @@
+import numpy as np
+from fastapi.testclient import TestClient
+
+from app import main, services
+from app.ranking import job_text, rank_jobs, score_jobs, vectorize
+
+RESUME = "Senior Python developer. Django, PostgreSQL, REST APIs and AWS."
+
+JOBS = [
+    {"id": "1", "title": "Marketing Manager", "description": "Brand campaigns and social media."},
+    {"id": "2", "title": "Python Developer", "description": "Django REST APIs on AWS with PostgreSQL."},
+    {"id": "3", "title": "Backend Engineer", "description": "Python services and SQL databases."},
+    {"id": "4", "title": "Nurse", "description": "Patient care in a busy ward."},
+]
+
+
+def test_most_similar_jobs_come_first():
+    ranked = rank_jobs(RESUME, JOBS, top_k=2)
+
+    assert [job["id"] for job in ranked] == ["2", "3"]
+    assert ranked[0]["score"] > ranked[1]["score"] > 0
+    assert "score" not in JOBS[1]
+
+
+def test_unrelated_jobs_score_zero_and_all_are_kept_below_top_k():
+    scores = score_jobs(RESUME, JOBS)
+    assert scores[3] == 0
+    assert len(rank_jobs(RESUME, JOBS, top_k=10)) == 4
+    assert rank_jobs(RESUME, [], top_k=3) == []
+
+
+def test_tokens_keep_language_names_whole():
+    a, b = vectorize(["c++ and c#", "c and"]).toarray()
+    assert not np.array_equal(a, b)
+
+
+def test_job_text_weights_title_and_joins_skill_lists():
+    text = job_text({"title": "Data Engineer", "skills": ["Spark", "SQL"], "salary": "secret"})
+    assert text.count("Data Engineer") == 3
+    assert text.count("Spark SQL") == 2
+    assert "secret" not in text
+
+
+def test_fetch_jobs_ranks_against_an_uploaded_resume(job_sources):
+    rows_requested = []
+    job_sources("linkedin", lambda keyword, location, rows, timeout, cancel: rows_requested.append(rows) or list(JOBS))
+    pdf = b"%PDF-resume"
+    services.analysis_cache.set(f"pdf:{services.resume_id_for(pdf)}", RESUME)
+
+    response = TestClient(main.app).get("/fetch-jobs", params={
+        "keywords": "python", "resume_id": services.resume_id_for(pdf), "top_k": 1})
+
+    assert rows_requested == [services.JOB_RANK_CANDIDATES]
+    assert [(job["id"], job["score"] > 0) for job in response.json()["linkedin"]] == [("linkedin:2", True)]
@@ -0,0 +1,163 @@
+import asyncio
+import threading
+import time
+
+from types import SimpleNamespace
+
+import pytest
+
+from app import services
+from app.rate_limit import ConcurrencyLimiter
+
+
+def gemini_response(text, output_tokens):
+    part = SimpleNamespace(text=text)
+    candidate = SimpleNamespace(finish_reason=1, content=SimpleNamespace(parts=[part]))
+    usage = SimpleNamespace(candidates_token_count=output_tokens)
+    return SimpleNamespace(candidates=[candidate], usage_metadata=usage, text=text)
+
+
+class FakeModel:
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+
+    async def generate_content_async(self, prompt, **kwargs):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        return gemini_response(f"answer to {prompt}", 10)
+
+
+def test_caps_in_flight_calls_across_threads():
+    limiter = ConcurrencyLimiter(max_in_flight=2)
+    peak = 0
+    active = 0
+    lock = threading.Lock()
+
+    def call():
+        nonlocal peak, active
+        with limiter.slot():
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.02)
+            with lock:
+                active -= 1
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert peak == 2
+    assert limiter.stats()["in_flight"] == 0
+
+
+def test_async_callers_are_served_first_come_first_served():
+    limiter = ConcurrencyLimiter(max_in_flight=1)
+    order = []
+
+    async def call(i):
+        async with limiter.slot_async():
+            order.append(i)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        tasks = []
+        for i in range(5):
+            tasks.append(asyncio.create_task(call(i)))
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    assert order == [0, 1, 2, 3, 4]
+
+
+def test_token_bucket_delays_calls_over_budget():
+    # 600 tokens per minute = 10 per second
+    limiter = ConcurrencyLimiter(max_in_flight=4, tokens_per_minute=600)
+    with limiter.slot(595):
+        pass
+    started = time.monotonic()
+    with limiter.slot(10):
+        pass
+    assert 0.3 < time.monotonic() - started < 1.5
+
+
+def test_refund_returns_unused_tokens():
+    limiter = ConcurrencyLimiter(max_in_flight=1, tokens_per_minute=600)
+    with limiter.slot(500) as usage:
+        usage["refund"] = 400
+    assert limiter.stats()["tokens_available"] >= 499
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    limiter = ConcurrencyLimiter(max_in_flight=1)
+
+    async def main():
+        async with limiter.slot_async():
+            waiter = asyncio.create_task(limiter.acquire_async())
+            await asyncio.sleep(0.01)
+            assert limiter.stats()["queued"] == 1
+            waiter.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+        stats = limiter.stats()
+        assert (stats["in_flight"], stats["queued"]) == (0, 0)
+        async with limiter.slot_async():
+            pass
+
+    asyncio.run(asyncio.wait_for(main(), 2))
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_waiter_short_of_tokens_wakes_when_a_slot_frees(use_async):
+    # B queues behind a full slot; when A leaves, the bucket is still short, and
+    # B must poll for tokens instead of waiting for a release that never comes
+    limiter = ConcurrencyLimiter(max_in_flight=1, tokens_per_minute=600)
+    limiter.acquire(590)
+    waited = []
+
+    def release_soon():
+        time.sleep(0.05)
+        limiter.release()
+
+    releaser = threading.Thread(target=release_soon)
+    releaser.start()
+    started = time.monotonic()
+    if use_async:
+        async def acquire():
+            await asyncio.wait_for(limiter.acquire_async(20), 3)
+        asyncio.run(acquire())
+    else:
+        limiter.acquire(20)
+    waited.append(time.monotonic() - started)
+    releaser.join()
+    limiter.release()
+
+    assert 0.5 < waited[0] < 2.5
+
+
+def test_ask_gemini_async_shares_the_limiter_and_refunds_unused_tokens(monkeypatch, lazy_value):
+    model = FakeModel()
+    limiter = ConcurrencyLimiter(max_in_flight=2, tokens_per_minute=60_000)
+    lazy_value(services.gemini_model, model)
+    monkeypatch.setattr(services, "gemini_limiter", limiter)
+
+    async def main():
+        return await asyncio.gather(*(services.ask_gemini_async(f"q{i}", 500) for i in range(6)))
+
+    answers = asyncio.run(main())
+
+    assert answers == [f"answer to q{i}" for i in range(6)]
+    assert model.peak == 2
+    # each call reserved ~500 output tokens but spent 10
+    assert limiter.stats()["tokens_available"] > 60_000 - 6 * 20
+
+
+def test_ask_gemini_async_without_a_key(lazy_value):
+    lazy_value(services.gemini_model, None)
+    assert asyncio.run(services.ask_gemini_async("hi")) == "Gemini API Key is missing."
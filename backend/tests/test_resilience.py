@@ -0,0 +1,148 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+import pytest
+
+from app import services
+from app.resilience import CircuitBreaker, CircuitOpen, DeadlineExceeded, RetryPolicy, deadline_scope, remaining
+
+
+class ServiceUnavailable(Exception):
+    code = 503
+
+
+class BadRequest(Exception):
+    code = 400
+
+
+def failing(*errors, result="ok"):
+    """An attempt function raising the given errors in turn, then returning result."""
+    calls = []
+
+    def attempt(timeout):
+        calls.append(timeout)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+    return attempt, calls
+
+
+def test_retryable_errors_are_retried_until_one_succeeds():
+    policy = RetryPolicy("test", retries=2, base_delay=0)
+    attempt, calls = failing(ServiceUnavailable(), TimeoutError())
+
+    assert policy.call(attempt) == "ok"
+    assert len(calls) == 3
+
+
+def test_a_rejected_request_is_neither_retried_nor_held_against_the_provider():
+    policy = RetryPolicy("test", retries=2, base_delay=0, breaker=CircuitBreaker("test", failures=1))
+    attempt, calls = failing(BadRequest("400 invalid argument"))
+
+    with pytest.raises(BadRequest):
+        policy.call(attempt)
+
+    assert len(calls) == 1
+    assert policy.breaker.stats() == {"state": "closed", "consecutive_failures": 0, "opened": 0}
+
+
+def test_breaker_fails_fast_while_open_then_lets_one_trial_through():
+    breaker = CircuitBreaker("test", failures=2, reset_after=0.05)
+    policy = RetryPolicy("test", retries=0, breaker=breaker)
+    attempt, calls = failing(ServiceUnavailable(), ServiceUnavailable())
+
+    for _ in range(2):
+        with pytest.raises(ServiceUnavailable):
+            policy.call(attempt)
+    with pytest.raises(CircuitOpen):
+        policy.call(attempt)
+    assert len(calls) == 2 and breaker.state == "open"
+
+    time.sleep(0.06)
+    assert breaker.state == "half_open"
+    assert policy.call(attempt) == "ok"
+    assert breaker.state == "closed"
+
+
+def test_deadline_caps_timeouts_and_ends_retries():
+    assert remaining(10) == 10
+    with deadline_scope(5):
+        assert 4 < remaining(10) <= 5
+        # An inner scope can only bring the deadline closer
+        with deadline_scope(60):
+            assert remaining(10) <= 5
+    with deadline_scope(0.01):
+        time.sleep(0.02)
+        with pytest.raises(DeadlineExceeded):
+            remaining(10)
+
+
+def test_a_timeout_cut_short_by_the_deadline_does_not_count_against_the_provider():
+    policy = RetryPolicy("test", timeout=10, retries=2, breaker=CircuitBreaker("test", failures=1))
+
+    async def slow(timeout):
+        await asyncio.sleep(1)
+
+    async def call():
+        with deadline_scope(0.05):
+            await policy.call_async(slow)
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(call())
+    assert policy.breaker.state == "closed"
+
+
+def test_the_attempt_timeout_starts_once_the_slot_is_held():
+    policy = RetryPolicy("test", timeout=0.1, retries=0)
+
+    @asynccontextmanager
+    async def slot():
+        # Local queueing longer than the provider's timeout
+        await asyncio.sleep(0.15)
+        yield {"held": True}
+
+    async def attempt(timeout, held):
+        await asyncio.sleep(0.01)
+        return held
+
+    assert asyncio.run(policy.call_async(attempt, slot=slot)) == {"held": True}
+    assert policy.breaker.stats()["consecutive_failures"] == 0
+
+
+def test_a_slow_attempt_is_hedged_and_the_first_answer_wins():
+    policy = RetryPolicy("test", timeout=5, retries=0, hedge_quantile=0.95)
+    for _ in range(policy.latencies.min_samples):
+        policy.latencies.add(0.01)
+    started = []
+
+    async def attempt(timeout):
+        started.append(timeout)
+        await asyncio.sleep(1 if len(started) == 1 else 0.01)
+        return len(started)
+
+    began = time.monotonic()
+    assert asyncio.run(policy.call_async(attempt, hedge=True)) == 2
+    assert time.monotonic() - began < 0.5
+
+
+def test_ask_gemini_async_retries_a_failed_attempt(monkeypatch, lazy_value):
+    class Response:
+        text = "answer"
+        candidates = []
+        usage_metadata = None
+
+    class Model:
+        calls = 0
+
+        async def generate_content_async(self, prompt, **kwargs):
+            Model.calls += 1
+            if Model.calls == 1:
+                raise ServiceUnavailable("503 overloaded")
+            return Response()
+
+    lazy_value(services.gemini_model, Model())
+    monkeypatch.setattr(services, "gemini_policy", RetryPolicy("gemini", retries=1, base_delay=0))
+
+    assert asyncio.run(services.ask_gemini_async("hi")) == "answer"
+    assert Model.calls == 2
@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+from app import cache, mcp_server, services
+
+
+@pytest.fixture(autouse=True)
+def resume_texts(monkeypatch):
+    fresh = cache.MemoryCache()
+    monkeypatch.setattr(services, "resume_texts", fresh)
+    return fresh
+
+
+@pytest.fixture
+def resume_pdf(tmp_path, make_pdf):
+    data = make_pdf("Jane Doe\nPython developer with Kubernetes experience")
+    path = tmp_path / "jane doe.pdf"
+    path.write_bytes(data)
+    return path, data
+
+
+def test_parse_pdf_file_returns_a_handle_keyed_by_content(resume_pdf):
+    path, data = resume_pdf
+
+    result = asyncio.run(mcp_server.parse_pdf_file(path.as_uri()))
+
+    assert result["resume"] == f"resume://{services.resume_id_for(data)}"
+    assert result["preview"].startswith("Jane Doe")
+    assert result["chars"] == len(mcp_server.resume_resource(services.resume_id_for(data)))
+    # The HTTP API knows the same resume by the same id
+    assert services.cached_resume_text(services.resume_id_for(data)).startswith("Jane Doe")
+
+
+def test_tools_accept_the_handle_in_place_of_the_text(resume_pdf, monkeypatch):
+    path, _ = resume_pdf
+    seen = []
+
+    async def step(aspect, text, *inputs):
+        seen.append(text)
+        return "ok"
+    monkeypatch.setattr(mcp_server, "run_analysis_step", step)
+
+    handle = asyncio.run(mcp_server.parse_pdf_file(str(path)))["resume"]
+    asyncio.run(mcp_server.analyze_resume_text(handle, "summary"))
+
+    assert seen[0].startswith("Jane Doe")
+    with pytest.raises(ValueError, match="Unknown or expired resume handle"):
+        asyncio.run(mcp_server.analyze_resume_text("resume://" + "0" * 64, "summary"))
+
+
+def test_handles_work_without_an_analysis_cache(resume_pdf, monkeypatch):
+    monkeypatch.setattr(services, "analysis_cache", cache.make_cache("none"))
+    path, _ = resume_pdf
+
+    handle = asyncio.run(mcp_server.parse_pdf_file(str(path)))["resume"]
+
+    assert mcp_server.resolve_resume_text(handle).startswith("Jane Doe")
+
+
+def test_text_in_the_analysis_cache_resolves_after_a_restart(resume_texts):
+    services.analysis_cache.set("pdf:abc", "cached text")
+
+    assert services.cached_resume_text("abc") == "cached text"
+    assert resume_texts.get("abc") == "cached text"
+
+
+def test_text_too_large_to_keep_is_an_error_not_a_dead_handle(resume_pdf, monkeypatch):
+    monkeypatch.setattr(services, "resume_texts", cache.MemoryCache(max_bytes=10))
+    monkeypatch.setattr(services, "analysis_cache", cache.make_cache("none"))
+    path, _ = resume_pdf
+
+    with pytest.raises(ValueError, match="too large to keep"):
+        asyncio.run(mcp_server.parse_pdf_file(str(path)))
+
+
+def test_parse_pdf_file_only_reads_allowed_pdfs(resume_pdf, tmp_path, monkeypatch):
+    path, data = resume_pdf
+    allowed = tmp_path / "allowed"
+    allowed.mkdir()
+    monkeypatch.setattr(mcp_server, "MCP_PDF_ROOTS", [str(allowed.resolve())])
+
+    with pytest.raises(ValueError, match="outside MCP_PDF_ROOTS"):
+        asyncio.run(mcp_server.parse_pdf_file(str(path)))
+    with pytest.raises(ValueError, match="No such file"):
+        asyncio.run(mcp_server.parse_pdf_file(str(allowed / "missing.pdf")))
+    (allowed / "big.pdf").write_bytes(data)
+    monkeypatch.setattr(mcp_server, "PDF_MAX_BYTES", len(data) - 1)
+    with pytest.raises(ValueError, match="exceeds"):
+        asyncio.run(mcp_server.parse_pdf_file(str(allowed / "big.pdf")))
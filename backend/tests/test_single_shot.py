@@ -0,0 +1,105 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main, services
+from app.streaming_json import ObjectStreamParser
+
+ANSWER = {"summary": 'Senior "Python" dev, {ok}', "gaps": "Kubernetes", "roadmap": "Learn Go",
+          "keywords": ["Python Developer", "Backend Engineer", "Django"]}
+
+
+def chunks_of(text, size=7):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def test_members_are_reported_as_soon_as_they_close():
+    parser = ObjectStreamParser()
+    seen = []
+    for chunk in chunks_of(json.dumps(ANSWER)):
+        members = parser.feed(chunk)
+        seen += [key for key, _ in members]
+        # Each member arrives before the object is finished
+        assert parser.done == (seen == list(ANSWER))
+    assert seen == list(ANSWER)
+    assert parser.done
+
+
+def test_strings_with_braces_commas_and_escapes_are_kept_whole():
+    parser = ObjectStreamParser()
+    members = [m for chunk in chunks_of(json.dumps(ANSWER), 3) for m in parser.feed(chunk)]
+    assert dict(members) == ANSWER
+
+
+@pytest.fixture
+def fake_stream(monkeypatch, lazy_value):
+    """Gemini is 'configured'; the streamed answer is whatever the test sets (keywords as Gemini gives them)."""
+    monkeypatch.setattr(services, "KEYWORDS_MODE", "llm")
+    calls = {"stream": 0, "fallback": []}
+    answer = {"chunks": chunks_of(json.dumps(ANSWER)), "error": None}
+
+    async def stream(prompt, schema, max_tokens=500, client=None):
+        calls["stream"] += 1
+        for chunk in answer["chunks"]:
+            yield chunk
+        if answer["error"]:
+            raise answer["error"]
+
+    def fallback(step):
+        async def analyze(resume_text, *inputs):
+            calls["fallback"].append(step)
+            return ["fallback keyword"] if step == "keywords" else f"{step} fallback"
+        return analyze
+
+    lazy_value(services.gemini_model, object())
+    monkeypatch.setattr(services, "stream_gemini_json", stream)
+    for step, (_, deps) in list(services.ANALYSIS_STEPS.items()):
+        monkeypatch.setitem(services.ANALYSIS_STEPS, step, (fallback(step), deps))
+    return calls, answer
+
+
+def run(resume_text="cv"):
+    async def collect():
+        return [event async for event in services.run_single_shot_analysis(resume_text)]
+    return asyncio.run(collect())
+
+
+def test_one_request_answers_every_step_and_is_cached(fake_stream):
+    calls, _ = fake_stream
+    events = run()
+
+    assert [(s, st) for s, st, _ in events][:4] == [(s, "processing") for s in services.ANALYSIS_STEPS]
+    assert {s: d for s, st, d in events if st == "complete"} == ANSWER
+    assert calls == {"stream": 1, "fallback": []}
+
+    again = run()
+    assert [st for _, st, _ in again] == ["complete"] * 4
+    assert calls["stream"] == 1
+
+
+def test_missing_fields_fall_back_to_their_own_prompts(fake_stream):
+    calls, answer = fake_stream
+    text = json.dumps(ANSWER)
+    answer["chunks"] = [text[:text.index('"roadmap"')]]
+    answer["error"] = RuntimeError("stream cut off")
+
+    completed = {s: d for s, st, d in run() if st == "complete"}
+
+    assert completed["summary"] == ANSWER["summary"]
+    assert completed["roadmap"] == "roadmap fallback"
+    assert sorted(calls["fallback"]) == ["keywords", "roadmap"]
+    # An incomplete single-shot answer is not cached as a whole
+    run()
+    assert calls["stream"] == 2
+
+
+def test_analyze_resume_single_shot_mode(fake_stream, make_pdf):
+    response = TestClient(main.app).post(
+        "/analyze-resume", files={"file": ("cv.pdf", make_pdf("Jane Doe"), "application/pdf")},
+        data={"mode": "single_shot"})
+
+    events = [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line]
+    assert events[-1]["step"] == "done"
+    assert {k: v for k, v in events[-1]["data"].items() if k != "resume_id"} == ANSWER
@@ -0,0 +1,124 @@
+import asyncio
+import json
+
+import pytest
+
+from app import mcp_server, services, skills
+
+RESUME = """Jane Doe
+Senior Python Developer
+
+Skills
+Python, Django, K8s, React Native, PostgreSQL
+
+Experience
+Built Django services on Kubernetes. Automated deployments with Docker.
+
+References
+Java and go-to person for React questions, says my manager
+"""
+
+
+def test_one_pass_finds_names_aliases_and_the_longest_phrase():
+    tokens = skills.TOKEN_RE.findall("Shipped React Native apps; ran K8s with ASP.NET Core and C++")
+    found = [value for _, _, value in skills.matcher.matches(tokens)]
+
+    assert found == [("React Native", "technology"), ("Kubernetes", "technology"),
+                     (".NET", "technology"), ("C++", "technology")]
+
+
+def test_case_sensitive_names_only_match_as_written():
+    assert skills.extract_keywords("Wrote services in Go")["technologies"] == ["Go"]
+    assert skills.extract_keywords("Ready to go the extra mile")["technologies"] == []
+
+
+def test_keywords_are_weighted_by_section_and_repetition():
+    ranked = {k.name: k for k in skills.rank_keywords(RESUME)}
+
+    # Titles named in the resume lead, then the ones its technologies point to, then technologies
+    assert skills.extract_keywords(RESUME)["titles"][0] == "Python Developer"
+    assert ranked["Python Developer"].mentions == 1
+    assert ranked["DevOps Engineer"].mentions == 0 and ranked["DevOps Engineer"].kind == "title"
+    # Skills (3.0) plus a repeat in experience (2.0 * REPEAT_DECAY)
+    assert ranked["Django"].score == 4.0 and ranked["Django"].mentions == 2
+    assert ranked["Kubernetes"].mentions == 2
+    # Nothing counts from the references
+    assert "Java" not in ranked and "React" not in ranked
+
+
+def test_merge_checks_suggestions_against_the_resume_and_completes_them():
+    suggested = {"titles": ["Backend Developer", "Senior Python Developer"],
+                 "technologies": ["k8s", "Rust", "Pydantic"]}
+
+    merged, dropped = skills.merge_keywords(suggested, RESUME)
+
+    # Aliases take the taxonomy name, unmentioned known technologies go, unknown ones stay
+    assert merged["technologies"][:2] == ["Kubernetes", "Pydantic"]
+    assert dropped == ["Rust"]
+    assert {"Django", "React Native", "PostgreSQL"} <= set(merged["technologies"])
+    assert merged["technologies"].count("Kubernetes") == 1
+    # "Python Developer" is already covered by "Senior Python Developer"
+    assert merged["titles"][:2] == ["Backend Developer", "Senior Python Developer"]
+    assert "Python Developer" not in merged["titles"]
+
+
+def fake_gemini(monkeypatch, answer):
+    calls = []
+
+    def ask(prompt, **kwargs):
+        calls.append(prompt)
+        return answer
+    monkeypatch.setattr(services, "ask_gemini", ask)
+    return calls
+
+
+@pytest.mark.parametrize("mode,titles,calls", [
+    ("merge", ["Backend Developer", "Python Developer"], 1),
+    ("llm", ["Backend Developer"], 1),
+    ("local", ["Python Developer"], 0),
+])
+def test_keywords_mode(monkeypatch, mode, titles, calls):
+    monkeypatch.setattr(services, "KEYWORDS_MODE", mode)
+    asked = fake_gemini(monkeypatch, json.dumps({"titles": ["Backend Developer"], "technologies": ["Rust"]}))
+
+    keywords = services.analyze_keywords(RESUME)
+
+    assert keywords[:len(titles)] == titles
+    assert ("Rust" in keywords) == (mode == "llm")
+    assert len(asked) == calls
+
+
+def test_local_keywords_stand_in_when_gemini_fails(monkeypatch):
+    fake_gemini(monkeypatch, services.GEMINI_UNAVAILABLE)
+
+    assert services.analyze_keywords(RESUME) == services.local_keywords(RESUME)
+    assert services.local_keywords(RESUME)[0] == "Python Developer"
+
+
+def test_analysis_streams_a_keywords_preview_before_any_step(monkeypatch):
+    def analyzer(step):
+        async def analyze(resume_text, *inputs):
+            return ["Gemini keyword"] if step == "keywords" else step
+        return analyze
+
+    for step, (_, deps) in list(services.ANALYSIS_STEPS.items()):
+        monkeypatch.setitem(services.ANALYSIS_STEPS, step, (analyzer(step), deps))
+
+    async def first_event():
+        events = services.analysis_events(RESUME, "r1")
+        try:
+            return await events.__anext__()
+        finally:
+            await events.aclose()
+
+    assert asyncio.run(first_event()) == {"step": "keywords", "status": "preview",
+                                          "data": services.local_keywords(RESUME)}
+
+
+def test_extract_keywords_tool(monkeypatch):
+    monkeypatch.setattr(services, "ask_gemini", None)
+
+    keywords = asyncio.run(mcp_server.extract_keywords(RESUME, limit=3))
+
+    assert keywords[0] == {"keyword": "Python Developer", "kind": "title", "score": 2.0, "mentions": 1}
+    assert len(keywords) == 3
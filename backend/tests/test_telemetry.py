@@ -0,0 +1,108 @@
+import asyncio
+import json
+import logging
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.telemetry import Counter, Histogram, JSONFormatter, current_span, parse_traceparent, span, traced
+
+
+def test_counter_renders_prometheus_text_with_escaped_labels():
+    requests = Counter("demo_total", "Demo requests.", ("route",))
+    requests.inc(route='/a"b')
+    requests.inc(2, route='/a"b')
+
+    assert requests.render() == [
+        "# HELP demo_total Demo requests.",
+        "# TYPE demo_total counter",
+        'demo_total{route="/a\\"b"} 3',
+    ]
+
+
+def test_histogram_buckets_are_cumulative():
+    latency = Histogram("demo_seconds", "Demo latency.", buckets=(0.1, 1))
+    for value in (0.05, 0.5, 5):
+        latency.observe(value)
+
+    lines = latency.render()
+    assert 'demo_seconds_bucket{le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{le="1"} 2' in lines
+    assert 'demo_seconds_bucket{le="+Inf"} 3' in lines
+    assert "demo_seconds_count 3" in lines
+    assert "demo_seconds_sum 5.55" in lines
+
+
+def test_spans_nest_and_follow_work_into_threads():
+    async def main():
+        with span("outer") as outer:
+            inner = await asyncio.to_thread(lambda: _in_span("inner"))
+            return outer, inner
+
+    def _in_span(name):
+        with span(name) as current:
+            return current
+
+    outer, inner = asyncio.run(main())
+    assert inner.trace_id == outer.trace_id
+    assert inner.parent_id == outer.span_id
+    assert current_span() is None
+
+
+def test_incoming_traceparent_is_continued():
+    header = "00-" + "a" * 32 + "-" + "b" * 16 + "-01"
+    with span("http", traceparent=header) as current:
+        assert (current.trace_id, current.parent_id) == ("a" * 32, "b" * 16)
+        assert current.traceparent().startswith("00-" + "a" * 32 + "-")
+    assert parse_traceparent("00-xyz-1-01") is None
+    assert parse_traceparent("00-" + "g" * 32 + "-" + "b" * 16 + "-01") is None
+
+
+@pytest.mark.parametrize("is_async", [False, True])
+def test_traced_records_outcome(is_async):
+    metric = Histogram("demo_call_seconds", "Demo calls.", ("outcome",))
+
+    if is_async:
+        @traced("demo", metric)
+        async def call(fail):
+            if fail:
+                raise ValueError("no")
+            return "ok"
+        invoke = lambda fail: asyncio.run(call(fail))
+    else:
+        @traced("demo", metric)
+        def call(fail):
+            if fail:
+                raise ValueError("no")
+            return "ok"
+        invoke = call
+
+    assert invoke(False) == "ok"
+    with pytest.raises(ValueError):
+        invoke(True)
+    text = "\n".join(metric.render())
+    assert 'demo_call_seconds_count{outcome="ok"} 1' in text
+    assert 'demo_call_seconds_count{outcome="error"} 1' in text
+
+
+def test_json_logs_carry_fields_and_trace_ids():
+    record = logging.LogRecord("jobrec.gemini", logging.INFO, __file__, 1, "gemini_call", None, None)
+    record.fields = {"latency_ms": 12}
+    record.trace_id, record.span_id = "t" * 32, "s" * 16
+
+    entry = json.loads(JSONFormatter().format(record))
+    assert entry["logger"] == "gemini"
+    assert (entry["event"], entry["latency_ms"], entry["trace_id"]) == ("gemini_call", 12, "t" * 32)
+
+
+def test_requests_are_timed_by_route_and_return_a_traceparent():
+    client = TestClient(main.app)
+    trace_id = "c" * 32
+    response = client.get("/analysis-jobs/some-id", headers={"traceparent": f"00-{trace_id}-{'d' * 16}-01"})
+
+    assert response.status_code == 404
+    assert response.headers["traceparent"].split("-")[1] == trace_id
+    metrics = client.get("/metrics").text
+    assert 'route="/analysis-jobs/{job_id}",status="404"' in metrics
+    assert "some-id" not in metrics
@@ -49,6 +49,7 @@ export default function Home() {
             currentStep={progress.currentStep}
             completedSteps={progress.completedSteps}
             isProcessing={progress.isProcessing}
+            partialText={progress.partialText}
           />
         )}
         
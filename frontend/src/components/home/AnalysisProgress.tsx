@@ -9,6 +9,7 @@ interface AnalysisProgressProps {
   currentStep: AnalysisStep | null;
   completedSteps: AnalysisStep[];
   isProcessing: boolean;
+  partialText?: Partial<Record<AnalysisStep, string>>;
 }
 
 const STEPS: { key: AnalysisStep; label: string; description: string }[] = [
@@ -18,7 +19,10 @@ const STEPS: { key: AnalysisStep; label: string; description: string }[] = [
   { key: "keywords", label: "Job Keywords", description: "Generating optimal job search terms" },
 ];
 
-export function AnalysisProgress({ currentStep, completedSteps, isProcessing }: AnalysisProgressProps) {
+// Characters of a running step's output shown under it
+const PREVIEW_CHARS = 240;
+
+export function AnalysisProgress({ currentStep, completedSteps, isProcessing, partialText = {} }: AnalysisProgressProps) {
   const containerRef = useRef<HTMLDivElement>(null);
   const stepRefs = useRef<Map<string, HTMLDivElement>>(new Map());
 
@@ -70,7 +74,9 @@ export function AnalysisProgress({ currentStep, completedSteps, isProcessing }:
         
         <div className="space-y-4">
           {STEPS.map((step, index) => {
-            const status = getStepStatus(step.key);
+            const partial = partialText[step.key];
+            // Concurrent steps stream at once; any step with output is running
+            const status = partial && !completedSteps.includes(step.key) ? "processing" : getStepStatus(step.key);
             
             return (
               <motion.div
@@ -131,9 +137,15 @@ export function AnalysisProgress({ currentStep, completedSteps, isProcessing }:
                       <span className="ml-2 text-xs opacity-70 animate-pulse">Processing...</span>
                     )}
                   </h4>
-                  <p className="text-sm text-muted-foreground truncate">
-                    {step.description}
-                  </p>
+                  {partial && status === "processing" ? (
+                    <p className="text-sm text-muted-foreground line-clamp-3 whitespace-pre-wrap break-words">
+                      {partial.length > PREVIEW_CHARS ? `…${partial.slice(-PREVIEW_CHARS)}` : partial}
+                    </p>
+                  ) : (
+                    <p className="text-sm text-muted-foreground truncate">
+                      {step.description}
+                    </p>
+                  )}
                 </div>
 
                 {/* Step Number */}
@@ -6,6 +6,8 @@ export interface AnalysisProgress {
   currentStep: AnalysisStep | null;
   completedSteps: AnalysisStep[];
   isProcessing: boolean;
+  /** Text generated so far for steps still running, from 'delta' events. */
+  partialText: Partial<Record<AnalysisStep, string>>;
 }
 
 export function useResumeAnalysis() {
@@ -18,6 +20,7 @@ export function useResumeAnalysis() {
     currentStep: null,
     completedSteps: [],
     isProcessing: false,
+    partialText: {},
   });
 
   const handleFileChange = (e: React.ChangeEvent<HTMLInputElement>) => {
@@ -33,12 +36,23 @@ export function useResumeAnalysis() {
         currentStep: event.step,
         isProcessing: true,
       }));
-    } else if (event.status === 'complete' && event.step !== 'done') {
+    } else if (event.status === 'delta' && typeof event.data === 'string') {
+      const text = event.data;
       setProgress(prev => ({
         ...prev,
-        completedSteps: [...prev.completedSteps, event.step],
-        isProcessing: false,
+        partialText: { ...prev.partialText, [event.step]: (prev.partialText[event.step] ?? "") + text },
       }));
+    } else if (event.status === 'complete' && event.step !== 'done') {
+      setProgress(prev => {
+        const partialText = { ...prev.partialText };
+        delete partialText[event.step];
+        return {
+          ...prev,
+          completedSteps: [...prev.completedSteps, event.step],
+          isProcessing: false,
+          partialText,
+        };
+      });
     }
   };
 
@@ -55,6 +69,7 @@ export function useResumeAnalysis() {
       currentStep: null,
       completedSteps: [],
       isProcessing: false,
+      partialText: {},
     });
 
     try {
@@ -76,6 +91,10 @@ export function useResumeAnalysis() {
 
   const handleGetJobs = async () => {
     if (!analysis) return;
+    if (analysis.keywords.length === 0) {
+      toast.error("No keywords were found in your resume to search jobs with.");
+      return;
+    }
 
     setFetchingJobs(true);
     try {
@@ -88,7 +107,7 @@ export function useResumeAnalysis() {
       console.log("Job titles for search:", jobTitles);
       console.log("Search query:", keywords);
       
-      const jobResults = await fetchJobs(keywords);
+      const jobResults = await fetchJobs(keywords, analysis.resume_id);
       console.log("Job results:", jobResults);
       setJobs(jobResults);
       toast.success("Job recommendations updated!");
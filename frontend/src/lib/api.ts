@@ -5,9 +5,11 @@ export interface AnalysisResponse {
   gaps: string;
   roadmap: string;
   keywords: string[];
+  resume_id?: string;
 }
 
 export interface Job {
+  id?: string;
   title: string;
   companyName?: string;
   location?: string;
@@ -15,23 +17,37 @@ export interface Job {
   url?: string;
   jobUrl?: string;
   applyUrl?: string;
+  postedAt?: string;
+  /** Preview only; GET /jobs/{id} returns the full posting. */
+  description?: string;
+  skills?: string[];
+  /** Job sources (e.g. linkedin, naukri) the posting was found on. */
+  sources?: string[];
+  matchedKeywords?: string[];
+  score?: number;
 }
 
 export interface JobsResponse {
   linkedin: Job[];
+  timed_out?: string[];
 }
 
 export type AnalysisStep = 'summary' | 'gaps' | 'roadmap' | 'keywords' | 'done';
 
 export interface StreamEvent {
   step: AnalysisStep;
-  status: 'processing' | 'complete';
+  /**
+   * 'delta' events carry partial text of a step while it is generated.
+   * A 'preview' event for keywords arrives first, from local matching before any model call.
+   */
+  status: 'processing' | 'delta' | 'preview' | 'complete';
   data?: string | string[] | AnalysisResponse;
 }
 
 /**
  * Analyzes a resume using streaming SSE to show progress step by step.
- * Each step (summary, gaps, roadmap, keywords) is processed sequentially.
+ * Summary, gaps and roadmap run concurrently on the server; keywords starts
+ * once the summary is ready. Events arrive in completion order.
  */
 export const analyzeResumeStream = async (
   file: File,
@@ -52,6 +68,7 @@ export const analyzeResumeStream = async (
   const reader = response.body?.getReader();
   const decoder = new TextDecoder();
   let finalResult: AnalysisResponse | null = null;
+  let buffer = "";
 
   if (!reader) {
     throw new Error("No response body");
@@ -61,8 +78,10 @@ export const analyzeResumeStream = async (
     const { done, value } = await reader.read();
     if (done) break;
 
-    const chunk = decoder.decode(value, { stream: true });
-    const lines = chunk.split('\n');
+    // Network chunks can end mid-event; keep the unfinished line for the next read
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split('\n');
+    buffer = lines.pop() ?? "";
 
     for (const line of lines) {
       if (line.startsWith('data: ')) {
@@ -87,8 +106,21 @@ export const analyzeResumeStream = async (
   return finalResult;
 };
 
-export const fetchJobs = async (keywords: string): Promise<JobsResponse> => {
-  const response = await fetch(`${API_URL}/fetch-jobs?keywords=${encodeURIComponent(keywords)}`);
+/**
+ * Searches jobs for comma-separated keywords. mode 'index' answers from the
+ * server's local job index where it has enough fresh matches ('live' always scrapes);
+ * sources names the job sites to search (the server's defaults when omitted).
+ */
+export const fetchJobs = async (
+  keywords: string,
+  resumeId?: string,
+  mode: 'live' | 'index' = 'live',
+  sources?: string[]
+): Promise<JobsResponse> => {
+  const params = new URLSearchParams({ keywords, mode });
+  if (resumeId) params.set("resume_id", resumeId);
+  if (sources?.length) params.set("sources", sources.join(","));
+  const response = await fetch(`${API_URL}/fetch-jobs?${params}`);
   
   if (!response.ok) {
     throw new Error("Failed to fetch jobs");